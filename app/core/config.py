@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import List
 import os
 
 PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,6 +16,65 @@ class Settings(BaseSettings):
     MODELO_TIPO_FILENAME: str = "modelo_svc_TIPO_final.joblib"
     VETORIZADOR_SEVERIDADE_FILENAME: str = "vetorizador_tfidf_SEVERIDADE_final.joblib"
     MODELO_SEVERIDADE_FILENAME: str = "modelo_svc_SEVERIDADE_tuned_final.joblib"
+    MODELS_MMAP_MODE: str = "r"
+    MODELS_USE_COMPACT: bool = False
+    MODELS_REGISTRY_HISTORY: int = 2
+    MODELS_WARMUP_TEXTS: List[str] = [
+        "Alagamento na Marginal Tietê causa lentidão.",
+        "Grande deslizamento de terra bloqueou a via principal. Risco de novas ocorrências.",
+        "Pequeno galho caído na calçada, sem risco.",
+    ]
+    ADMIN_TOKEN: str = ""
+
+    CLASSIFY_BATCH_MAX_ITEMS: int = 1000
+    CLASSIFY_STREAM_CHUNK_SIZE: int = 1000
+    CLASSIFY_STREAM_MAX_INFLIGHT: int = 2
+    CLASSIFY_STREAM_MAX_LINE_BYTES: int = 1024 * 1024
+    STEM_CACHE_SIZE: int = 50000
+    STEM_DICTIONARY_ENABLED: bool = True
+    STEM_DICTIONARY_FILENAME: str = "dicionario_radicais.joblib"
+    LINEAR_FAST_PATH_ENABLED: bool = True
+    LINEAR_FAST_PATH_MAX_BATCH: int = 256
+
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_ITEMS: int = 100000
+    PREDICTION_CACHE_TTL_SECONDS: float = 3600.0
+    PREDICTION_CACHE_SHARED_BACKEND: str = ""
+    PREDICTION_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    INFERENCE_THREAD_WORKERS: int = 4
+    INFERENCE_MAX_PENDING: int = 64
+    CLUSTERING_PROCESS_WORKERS: int = 2
+    CLUSTERING_PROCESS_MIN_ALERTS: int = 5000
+    CLUSTERING_PROCESS_START_METHOD: str = "spawn"
+    CLUSTERING_MAX_PENDING: int = 8
+
+    MICRO_BATCH_ENABLED: bool = True
+    MICRO_BATCH_WINDOW_MS: float = 2.0
+    MICRO_BATCH_MAX_SIZE: int = 64
+    MICRO_BATCH_MAX_QUEUE: int = 1024
+
+    CLUSTERING_ENGINE: str = "haversine_balltree"
+    CLUSTERING_TIME_WINDOW_SECONDS: float = 0.0
+    CLUSTERING_PARTITION_CELL_KM: float = 5.0
+    CLUSTERING_PARTITION_TARGET_ALERTS: int = 5000
+    CLUSTERING_PARTITION_THREADS: int = 0
+    CLUSTERING_CACHE_ENABLED: bool = True
+    CLUSTERING_CACHE_MAX_ITEMS: int = 16
+    CLUSTERING_CACHE_TTL_SECONDS: float = 300.0
+
+    INCREMENTAL_CLUSTERING_TTL_SECONDS: float = 6 * 3600.0
+    INCREMENTAL_CLUSTERING_MAX_ITEMS: int = 10000
+
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WORKERS: int = 0
+    WORKER_LIMIT_CONCURRENCY: int = 0
+    WORKER_NUMERIC_THREADS: int = 1
+    WORKER_GRACEFUL_TIMEOUT_SECONDS: float = 30.0
+
+    METRICS_ENABLED: bool = True
+    METRICS_SAMPLE_RATE: float = 1.0
 
     class Config:
         env_file = ".env"
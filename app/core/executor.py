@@ -0,0 +1,101 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import registro_metricas
+
+
+class ServicoSobrecarregadoError(Exception):
+    """Lançada quando a fila de um pool de execução está cheia (load-shedding)."""
+
+
+class PoolLimitado:
+    """
+    Envolve um executor (threads ou processos) com um limite de tarefas pendentes.
+    As tarefas são submetidas a partir do event loop, então o contador de pendentes
+    só é alterado por uma única thread e não precisa de lock.
+    """
+
+    def __init__(self, nome: str, criar_executor: Callable[[], Executor], max_pendentes: int):
+        self.nome = nome
+        self.max_pendentes = max_pendentes
+        self._criar_executor = criar_executor
+        self._executor: Optional[Executor] = None
+        self._pendentes = 0
+
+    @property
+    def pendentes(self) -> int:
+        return self._pendentes
+
+    def iniciar(self):
+        if self._executor is None:
+            self._executor = self._criar_executor()
+
+    def encerrar(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def executar(self, funcao: Callable, *args, **kwargs):
+        """Executa `funcao` fora do event loop, rejeitando imediatamente se o pool estiver saturado."""
+        if self._pendentes >= self.max_pendentes:
+            raise ServicoSobrecarregadoError(
+                f"Pool '{self.nome}' saturado ({self._pendentes} tarefas pendentes). Tente novamente em instantes."
+            )
+        self.iniciar()
+        self._pendentes += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(funcao, *args, **kwargs))
+        finally:
+            self._pendentes -= 1
+
+
+pool_inferencia = PoolLimitado(
+    "inferencia",
+    lambda: ThreadPoolExecutor(max_workers=settings.INFERENCE_THREAD_WORKERS, thread_name_prefix="inferencia"),
+    settings.INFERENCE_MAX_PENDING
+)
+
+pool_clustering = PoolLimitado(
+    "clustering",
+    lambda: ProcessPoolExecutor(
+        max_workers=settings.CLUSTERING_PROCESS_WORKERS,
+        mp_context=multiprocessing.get_context(settings.CLUSTERING_PROCESS_START_METHOD)
+    ),
+    settings.CLUSTERING_MAX_PENDING
+)
+
+
+registro_metricas.coletada(
+    "redalert_pool_pending_tasks",
+    "Tarefas pendentes em cada pool de execução.",
+    "gauge",
+    lambda: [({"pool": pool.nome}, pool.pendentes) for pool in (pool_inferencia, pool_clustering)]
+)
+
+
+def iniciar_pools():
+    pool_inferencia.iniciar()
+    pool_clustering.iniciar()
+
+
+def encerrar_pools():
+    pool_inferencia.encerrar()
+    pool_clustering.encerrar()
+
+
+async def executar_clustering(funcao: Callable, alertas, quantidade_alertas: Optional[int] = None):
+    """
+    Payloads pequenos rodam no pool de threads (custo de serialização entre processos
+    não compensa); payloads a partir de CLUSTERING_PROCESS_MIN_ALERTS vão para o pool de processos.
+    `quantidade_alertas` é necessário quando `alertas` não é uma lista (ex.: colunas).
+    """
+    if quantidade_alertas is None:
+        quantidade_alertas = len(alertas)
+    if quantidade_alertas >= settings.CLUSTERING_PROCESS_MIN_ALERTS:
+        return await pool_clustering.executar(funcao, alertas)
+    return await pool_inferencia.executar(funcao, alertas)
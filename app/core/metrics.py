@@ -0,0 +1,221 @@
+import bisect
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+# Etapas curtas (pré-processamento de um lote pequeno) ficam na casa de dezenas de microssegundos;
+# o DBSCAN de payloads grandes chega a dezenas de segundos.
+LIMITES_SEGUNDOS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+LIMITES_TAMANHO = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+AmostraColetada = Tuple[Dict[str, str], float]
+
+
+def _formatar_valor(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar_rotulo(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(pares: Iterable[Tuple[str, str]]) -> str:
+    pares = [f'{nome}="{_escapar_rotulo(valor)}"' for nome, valor in pares]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Metrica(ABC):
+    tipo = "untyped"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def exportar(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"] + self._linhas()
+
+    @abstractmethod
+    def _linhas(self) -> List[str]:
+        """Linhas de amostras no formato de exposição do Prometheus (sem HELP/TYPE)."""
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self._valores: Dict[tuple, float] = {}
+
+    def incrementar(self, *valores_rotulos: str, quantidade: float = 1.0):
+        with self._lock:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0.0) + quantidade
+
+    def _linhas(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nome}{_formatar_rotulos(zip(self.rotulos, chave))} {_formatar_valor(valor)}" for chave, valor in valores]
+
+
+class Histograma(Metrica):
+    """
+    Histograma com limites fixos. Cada observação custa uma busca binária nos limites e o
+    incremento de um balde sob lock; os baldes só são acumulados na exportação.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, descricao: str, limites: Sequence[float], rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self.limites = tuple(sorted(limites))
+        self._series: Dict[tuple, list] = {}
+
+    def observar(self, valor: float, *valores_rotulos: str):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def _linhas(self) -> List[str]:
+        with self._lock:
+            series = sorted((chave, (list(baldes), soma, total)) for chave, (baldes, soma, total) in self._series.items())
+        linhas = []
+        for chave, (baldes, soma, total) in series:
+            pares_rotulos = list(zip(self.rotulos, chave))
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (math.inf,), baldes):
+                acumulado += quantidade
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(pares_rotulos + [('le', _formatar_valor(limite))])} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_formatar_rotulos(pares_rotulos)} {_formatar_valor(soma)}")
+            linhas.append(f"{self.nome}_count{_formatar_rotulos(pares_rotulos)} {total}")
+        return linhas
+
+
+class MetricaColetada(Metrica):
+    """Métrica cujo valor é lido de outro componente (cache, pools, registro de modelos) no momento da coleta."""
+
+    def __init__(self, nome: str, descricao: str, tipo: str, coletar: Callable[[], Iterable[AmostraColetada]]):
+        super().__init__(nome, descricao)
+        self.tipo = tipo
+        self._coletar = coletar
+
+    def _linhas(self) -> List[str]:
+        return [f"{self.nome}{_formatar_rotulos(sorted(rotulos.items()))} {_formatar_valor(valor)}" for rotulos, valor in self._coletar()]
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: Dict[str, Metrica] = {}
+
+    def _registrar(self, metrica: Metrica) -> Metrica:
+        if metrica.nome in self._metricas:
+            raise ValueError(f"Métrica '{metrica.nome}' já registrada.")
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def contador(self, nome: str, descricao: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nome, descricao, rotulos))
+
+    def histograma(self, nome: str, descricao: str, limites: Sequence[float], rotulos: Sequence[str] = ()) -> Histograma:
+        return self._registrar(Histograma(nome, descricao, limites, rotulos))
+
+    def coletada(self, nome: str, descricao: str, tipo: str, coletar: Callable[[], Iterable[AmostraColetada]]) -> MetricaColetada:
+        return self._registrar(MetricaColetada(nome, descricao, tipo, coletar))
+
+    def exportar(self) -> str:
+        """Todas as métricas no formato texto de exposição do Prometheus (0.0.4)."""
+        linhas = []
+        for metrica in self._metricas.values():
+            try:
+                linhas.extend(metrica.exportar())
+            except Exception as e:
+                print(f"Aviso: falha ao coletar a métrica '{metrica.nome}': {e}")
+        return "\n".join(linhas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+duracao_etapas = registro_metricas.histograma(
+    "redalert_stage_duration_seconds",
+    "Duração de cada etapa do pipeline de classificação e de clustering (amostrada por METRICS_SAMPLE_RATE).",
+    LIMITES_SEGUNDOS,
+    rotulos=("stage",)
+)
+tamanho_lotes = registro_metricas.histograma(
+    "redalert_batch_size",
+    "Quantidade de itens por requisição ou lote, por origem.",
+    LIMITES_TAMANHO,
+    rotulos=("source",)
+)
+duracao_carregamento_modelos = registro_metricas.histograma(
+    "redalert_model_load_seconds",
+    "Duração do carregamento de cada artefato de modelo.",
+    LIMITES_SEGUNDOS,
+    rotulos=("artifact",)
+)
+
+
+def amostrar() -> bool:
+    """Decide se a operação atual terá as etapas cronometradas."""
+    if not settings.METRICS_ENABLED:
+        return False
+    taxa = settings.METRICS_SAMPLE_RATE
+    return taxa >= 1.0 or (taxa > 0.0 and random.random() < taxa)
+
+
+def observar_tamanho_lote(origem: str, quantidade: int):
+    if settings.METRICS_ENABLED:
+        tamanho_lotes.observar(quantidade, origem)
+
+
+def registrar_tempos_etapas(tempos_etapas: Dict[str, float]):
+    for etapa, segundos in tempos_etapas.items():
+        duracao_etapas.observar(segundos, etapa)
+
+
+class Cronometro:
+    """
+    Mede etapas consecutivas: `marcar(etapa)` atribui à etapa o tempo desde a marca anterior.
+    Os tempos ficam em `tempos` para que possam ser devolvidos de outro processo e registrados
+    no processo da API.
+    """
+
+    def __init__(self):
+        self.tempos: Dict[str, float] = {}
+        self._ultima_marca = time.perf_counter()
+
+    def reiniciar(self):
+        """Descarta o tempo desde a última marca (ex.: espera em fila que não pertence a nenhuma etapa)."""
+        self._ultima_marca = time.perf_counter()
+
+    def marcar(self, etapa: str):
+        agora = time.perf_counter()
+        self.tempos[etapa] = self.tempos.get(etapa, 0.0) + (agora - self._ultima_marca)
+        self._ultima_marca = agora
+
+    def registrar(self):
+        registrar_tempos_etapas(self.tempos)
+
+
+def iniciar_cronometro() -> Optional[Cronometro]:
+    """Um cronômetro para a operação atual, ou None se ela não foi amostrada."""
+    return Cronometro() if amostrar() else None
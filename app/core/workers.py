@@ -0,0 +1,45 @@
+"""
+Comunicação dos workers com o mestre do lançador (app/launcher.py).
+
+O mestre preenche este módulo antes do fork. Nos workers, `sob_lancador()` indica que o processo
+é um dos workers criados pelo mestre, cada um com sua própria memória, e `enviar_comando_mestre`
+pede ao mestre uma ação que precisa valer para todos eles (recarga e rollback dos modelos). Os
+comandos seguem por um pipe herdado no fork, uma linha JSON por comando.
+"""
+import json
+import os
+from typing import Optional
+
+QUANTIDADE_WORKERS = 1
+_descritor_comandos: Optional[int] = None
+
+# Escritas de até PIPE_BUF bytes num pipe são atômicas: comandos de workers diferentes não se misturam.
+TAMANHO_MAXIMO_COMANDO = 512
+
+
+def configurar_workers(quantidade_workers: int, descritor_comandos: int):
+    """Chamada pelo mestre antes de criar os workers."""
+    global QUANTIDADE_WORKERS, _descritor_comandos
+    QUANTIDADE_WORKERS = quantidade_workers
+    _descritor_comandos = descritor_comandos
+
+
+def nucleos_disponiveis() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def sob_lancador() -> bool:
+    return _descritor_comandos is not None
+
+
+def varios_workers() -> bool:
+    return sob_lancador() and QUANTIDADE_WORKERS > 1
+
+
+def enviar_comando_mestre(acao: str, **parametros):
+    dados = (json.dumps({"acao": acao, **parametros}) + "\n").encode("utf-8")
+    if len(dados) > TAMANHO_MAXIMO_COMANDO:
+        raise ValueError("Comando para o mestre excede o tamanho máximo.")
+    os.write(_descritor_comandos, dados)
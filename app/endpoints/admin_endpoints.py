@@ -0,0 +1,105 @@
+import secrets
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Response
+from typing import Annotated, Optional
+
+from app.core.config import settings
+from app.core.executor import ServicoSobrecarregadoError, pool_inferencia
+from app.core.workers import enviar_comando_mestre, sob_lancador
+from app.ml.model_loader import registro_modelos
+from app.models_schemas.schemas import EstadoModelosSchema, RecargaModelosInputSchema, VersaoModelosSchema, ErrorDetail
+
+def verificar_token_admin(x_admin_token: Annotated[Optional[str], Header()] = None):
+    """Exige o header X-Admin-Token. Sem ADMIN_TOKEN configurado, os endpoints de administração ficam desabilitados."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail={"error": "Forbidden", "message": "Endpoints de administração desabilitados: defina ADMIN_TOKEN para habilitá-los."}
+        )
+    if not (x_admin_token and secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN)):
+        raise HTTPException(
+            status_code=401,
+            detail={"error": "Unauthorized", "message": "Header 'X-Admin-Token' ausente ou inválido."}
+        )
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(verificar_token_admin)],
+    responses={
+        401: {"model": ErrorDetail, "description": "Token de administração ausente ou inválido."},
+        403: {"model": ErrorDetail, "description": "ADMIN_TOKEN não configurado: endpoints de administração desabilitados."}
+    }
+)
+
+@router.get(
+    "/models",
+    response_model=EstadoModelosSchema,
+    summary="Mostra a versão ativa dos modelos, o histórico disponível para rollback e as fontes em disco"
+)
+async def models_status_endpoint():
+    return registro_modelos.estado()
+
+@router.post(
+    "/models/reload",
+    response_model=EstadoModelosSchema,
+    status_code=202,
+    summary="Carrega, aquece e ativa uma nova versão dos modelos em segundo plano",
+    responses={
+        202: {"description": "Recarga iniciada. Acompanhe o andamento em GET /admin/models."},
+        400: {"model": ErrorDetail, "description": "Fonte de modelos inválida."},
+        409: {"model": ErrorDetail, "description": "Já existe uma recarga em andamento."}
+    }
+)
+async def models_reload_endpoint(payload: Annotated[RecargaModelosInputSchema, Body()] = RecargaModelosInputSchema()):
+    """
+    A versão atual continua atendendo as requisições até a nova versão estar carregada e aquecida;
+    a troca é atômica e requisições em andamento terminam na versão com que começaram.
+    Com o lançador (app/launcher.py), a recarga é feita pelo mestre, que substitui todos os workers.
+    """
+    if sob_lancador():
+        try:
+            registro_modelos.resolver_pasta_origem(payload.source)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail={"error": "Bad Request", "message": str(ve)})
+        enviar_comando_mestre("recarregar", origem=payload.source, forcar=payload.force)
+        return registro_modelos.estado()
+    try:
+        iniciada = registro_modelos.recarregar_em_segundo_plano(payload.source, payload.force)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail={"error": "Bad Request", "message": str(ve)})
+    if not iniciada:
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Conflict", "message": "Já existe uma recarga de modelos em andamento."}
+        )
+    return registro_modelos.estado()
+
+@router.post(
+    "/models/rollback",
+    response_model=VersaoModelosSchema,
+    summary="Reativa a versão anterior dos modelos",
+    responses={
+        202: {"description": "Com o lançador: rollback pedido ao mestre, que substitui todos os workers."},
+        409: {"model": ErrorDetail, "description": "Não há versão anterior disponível."},
+        503: {"model": ErrorDetail, "description": "Pool de inferência saturado; tente novamente (ver Retry-After)."}
+    }
+)
+async def models_rollback_endpoint(response: Response):
+    if sob_lancador():
+        historico = registro_modelos.estado()["history"]
+        if not historico:
+            raise HTTPException(status_code=409, detail={"error": "Conflict", "message": "Não há versão anterior para rollback."})
+        enviar_comando_mestre("reverter")
+        response.status_code = 202
+        return historico[0]
+    try:
+        versao = await pool_inferencia.executar(registro_modelos.reverter)
+    except LookupError as le:
+        raise HTTPException(status_code=409, detail={"error": "Conflict", "message": str(le)})
+    except ServicoSobrecarregadoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": str(e)},
+            headers={"Retry-After": "1"}
+        )
+    return versao.resumo()
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE_PROMETHEUS, registro_metricas
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get(
+    "/metrics",
+    response_class=Response,
+    summary="Métricas no formato de exposição do Prometheus",
+    responses={
+        200: {"description": "Métricas em texto (text/plain; version=0.0.4).", "content": {CONTENT_TYPE_PROMETHEUS: {}}},
+        404: {"description": "Métricas desabilitadas (METRICS_ENABLED=false)."}
+    }
+)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "Not Found", "message": "Métricas desabilitadas."}
+        )
+    return Response(content=registro_metricas.exportar(), media_type=CONTENT_TYPE_PROMETHEUS)
@@ -1,10 +1,56 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import Annotated
+from fastapi import APIRouter, HTTPException, Body, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Annotated, Optional
 
+from app.core.config import settings
+from app.core.metrics import Cronometro, iniciar_cronometro, observar_tamanho_lote
+from app.core.executor import pool_inferencia, executar_clustering, ServicoSobrecarregadoError
+from app.core.workers import varios_workers
 from app.models_schemas.schemas import RelatoInputSchema, PredicaoOutputSchema, ErrorDetail
-from app.services.classification_service import obter_predicoes_classificacao
-from app.models_schemas.schemas import ClusteringInput, ClusteringResponse, HotspotSummaryOutput, ClusteringResultItem, ErrorDetail
-from app.services.clustering_service import realizar_clustering_alertas
+from app.models_schemas.schemas import RelatosLoteInputSchema, PredicoesLoteOutputSchema, PredicaoLoteItemSchema
+from app.services.classification_service import obter_predicoes_classificacao, obter_predicoes_classificacao_lote
+from app.services.micro_batcher import micro_batcher_classificacao
+from app.services.bulk_classification import classificar_fluxo_ndjson, executar_com_retentativas, ler_linhas_fluxo, processar_bloco_ndjson
+from app.ml.model_loader import registro_modelos
+from app.models_schemas.schemas import ClusteringInput, ClusteringResponse, ErrorDetail
+from app.models_schemas.schemas import IncrementalClusteringInput, IncrementalClusteringDeltaResponse, IncrementalClusteringSnapshotResponse
+from app.services.clustering_service import (
+    PayloadClusteringInvalidoError, extrair_colunas_payload_clustering, gerar_resposta_clustering, gerar_resposta_clustering_cronometrada,
+    impressao_digital_alertas
+)
+from app.services.cache_clustering import EntradaCacheClustering, cache_clustering, etag_corresponde, gerar_etag, responder_do_cache
+from app.utils.serializacao_json import RespostaJsonRapida
+from app.services.incremental_clustering import estado_clustering_incremental, converter_timestamp_para_epoch
+
+class RespostaFluxoNdjson(StreamingResponse):
+    """
+    StreamingResponse que não escuta `receive` em paralelo à resposta: no /classify_stream o
+    próprio gerador lê o corpo da requisição enquanto escreve a saída, e a escuta de desconexão
+    do Starlette consumiria as mensagens do corpo.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _serializar_resposta(resposta: BaseModel, cronometro: Optional[Cronometro]) -> JSONResponse:
+    """
+    Serializa a resposta como o FastAPI faria a partir do response_model (mesmo JSON), para que o
+    tempo de serialização seja medido na etapa "response_serialization".
+    """
+    resposta_json = JSONResponse(content=jsonable_encoder(resposta))
+    if cronometro is not None:
+        cronometro.marcar("response_serialization")
+        cronometro.registrar()
+    return resposta_json
+
 
 router = APIRouter(
     prefix="/ia",
@@ -18,7 +64,8 @@ router = APIRouter(
     responses={
         200: {"description": "Classificação bem-sucedida"},
         400: {"model": ErrorDetail, "description": "Requisição inválida (ex: campo 'text' ausente ou vazio). O Pydantic geralmente retorna 422 para falhas de validação."},
-        500: {"model": ErrorDetail, "description": "Erro interno no servidor durante a classificação."}
+        500: {"model": ErrorDetail, "description": "Erro interno no servidor durante a classificação."},
+        503: {"model": ErrorDetail, "description": "Serviço sobrecarregado ou modelos indisponíveis. Tente novamente em instantes."}
     }
 )
 async def classify_text_endpoint(relato_input: Annotated[RelatoInputSchema, Body(
@@ -38,12 +85,22 @@ async def classify_text_endpoint(relato_input: Annotated[RelatoInputSchema, Body
     Recebe um texto de alerta (com seu ID) e retorna a classificação de severidade e tipo.
     """
     try:
-        resultados_predicao = obter_predicoes_classificacao(texto_original=relato_input.text)
+        if settings.MICRO_BATCH_ENABLED:
+            resultados_predicao = await micro_batcher_classificacao.classificar(relato_input.text)
+        else:
+            resultados_predicao = await pool_inferencia.executar(obter_predicoes_classificacao, texto_original=relato_input.text)
 
         return PredicaoOutputSchema(
             alertId=relato_input.alertId,
             classifiedSeverity=resultados_predicao["classifiedSeverity"],
-            classifiedType=resultados_predicao["classifiedType"]
+            classifiedType=resultados_predicao["classifiedType"],
+            modelVersion=resultados_predicao.get("modelVersion")
+        )
+    except ServicoSobrecarregadoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": str(e)},
+            headers={"Retry-After": "1"}
         )
     except RuntimeError as e:
         print(f"Erro de Runtime (modelos não carregados?): {e}")
@@ -59,61 +116,338 @@ async def classify_text_endpoint(relato_input: Annotated[RelatoInputSchema, Body
         )
     
 
+@router.post(
+    "/classify_batch",
+    response_model=PredicoesLoteOutputSchema,
+    summary="Classifica a severidade e o tipo de um lote de textos de alerta",
+    responses={
+        200: {"description": "Lote processado. Itens inválidos trazem o campo 'error' preenchido."},
+        400: {"model": ErrorDetail, "description": "A lista 'alertsToClassify' é obrigatória, não pode ser vazia nem exceder o tamanho máximo do lote."},
+        500: {"model": ErrorDetail, "description": "Erro interno no servidor durante a classificação."},
+        503: {"model": ErrorDetail, "description": "Serviço sobrecarregado ou modelos indisponíveis. Tente novamente em instantes."}
+    }
+)
+async def classify_batch_endpoint(payload: Annotated[RelatosLoteInputSchema, Body(
+                                description="Lista de alertas (ID e texto) a serem classificados.",
+                                examples=[
+                                    {
+                                        "alertsToClassify": [
+                                            {"alertId": 12345, "text": "Grande deslizamento de terra bloqueou a via principal no Morro da Esperança."},
+                                            {"alertId": 12346, "text": "Alagamento na Marginal Tietê causa lentidão."}
+                                        ]
+                                    }
+                                ]
+                            )]):
+    """
+    Recebe uma lista de alertas (com seus IDs) e retorna a classificação de severidade e tipo
+    de cada um, na mesma ordem da entrada. Itens inválidos são reportados individualmente
+    sem interromper o restante do lote.
+    """
+    observar_tamanho_lote("classify_batch", len(payload.alertsToClassify))
+    if len(payload.alertsToClassify) > settings.CLASSIFY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "Bad Request",
+                "message": f"A lista 'alertsToClassify' excede o limite de {settings.CLASSIFY_BATCH_MAX_ITEMS} itens por lote."
+            }
+        )
+
+    resultados = []
+    relatos_validos = []
+    for indice, item in enumerate(payload.alertsToClassify):
+        try:
+            relato = RelatoInputSchema.model_validate(item)
+        except ValidationError:
+            alert_id = item.get("alertId") if isinstance(item, dict) else None
+            resultados.append(PredicaoLoteItemSchema(
+                index=indice,
+                alertId=alert_id if isinstance(alert_id, int) and not isinstance(alert_id, bool) else None,
+                error=ErrorDetail(error="Bad Request", message="O campo 'text' e 'alertId' são obrigatórios ou inválido no item.")
+            ))
+            continue
+        resultado = PredicaoLoteItemSchema(index=indice, alertId=relato.alertId)
+        resultados.append(resultado)
+        relatos_validos.append((resultado, relato.text))
+
+    try:
+        predicoes = await pool_inferencia.executar(obter_predicoes_classificacao_lote, [texto for _, texto in relatos_validos])
+    except ServicoSobrecarregadoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": str(e)},
+            headers={"Retry-After": "1"}
+        )
+    except RuntimeError as e:
+        print(f"Erro de Runtime (modelos não carregados?): {e}")
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": str(e)}
+        )
+    except Exception as e:
+        print(f"Erro inesperado durante a classificação em lote: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "Internal Server Error", "message": "Erro ao processar a classificação do lote."}
+        )
+
+    cronometro = iniciar_cronometro()
+    for (resultado, _), predicao in zip(relatos_validos, predicoes):
+        resultado.classifiedSeverity = str(predicao["classifiedSeverity"])
+        resultado.classifiedType = str(predicao["classifiedType"])
+        resultado.modelVersion = predicao.get("modelVersion")
+
+    return _serializar_resposta(PredicoesLoteOutputSchema(results=resultados), cronometro)
+
+
+@router.post(
+    "/classify_stream",
+    response_class=RespostaFluxoNdjson,
+    summary="Classifica em fluxo um corpo NDJSON (um alerta por linha), para reclassificação em massa",
+    responses={
+        200: {
+            "description": "NDJSON na ordem da entrada: um registro 'result' ou 'error' por linha, 'progress' ao fim de cada bloco e 'summary' no final.",
+            "content": {"application/x-ndjson": {}}
+        },
+        503: {"model": ErrorDetail, "description": "Modelos indisponíveis."}
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}, "example": '{"alertId": 1, "text": "Alagamento na Marginal Tietê."}\n'}}
+        }
+    }
+)
+async def classify_stream_endpoint(
+    request: Request,
+    idField: Annotated[str, Query(description="Campo de cada linha com o identificador do alerta (devolvido na saída).")] = "alertId",
+    textField: Annotated[str, Query(description="Campo de cada linha com o texto a classificar.")] = "text"
+):
+    """
+    Lê o corpo incrementalmente e classifica em blocos de CLASSIFY_STREAM_CHUNK_SIZE linhas pelo
+    caminho vetorizado, sem carregar o corpo inteiro em memória. Linhas inválidas geram registros
+    de erro sem interromper o fluxo. Todas as linhas são classificadas pela versão dos modelos
+    ativa no início da requisição.
+    """
+    if registro_modelos.atual is None:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": "Modelos de classificação ou vetorizadores não foram carregados corretamente."}
+        )
+
+    async def executar_bloco(*argumentos):
+        return await executar_com_retentativas(pool_inferencia.executar, processar_bloco_ndjson, *argumentos)
+
+    return RespostaFluxoNdjson(
+        classificar_fluxo_ndjson(
+            ler_linhas_fluxo(request.stream()),
+            executar_bloco,
+            tamanho_bloco=settings.CLASSIFY_STREAM_CHUNK_SIZE,
+            max_blocos_em_andamento=settings.CLASSIFY_STREAM_MAX_INFLIGHT,
+            campo_id=idField,
+            campo_texto=textField
+        )
+    )
+
+
+# O corpo de /cluster_alerts é lido à mão (sem parâmetro pydantic), então o schema do
+# ClusteringInput e os modelos que ele referencia são registrados em components.schemas
+# pela aplicação (ver `app.main`).
+_ESQUEMA_CLUSTERING_INPUT = ClusteringInput.model_json_schema(ref_template="#/components/schemas/{model}")
+ESQUEMAS_OPENAPI_ADICIONAIS = {
+    **_ESQUEMA_CLUSTERING_INPUT.pop("$defs", {}),
+    ClusteringInput.__name__: _ESQUEMA_CLUSTERING_INPUT,
+}
+
+def _decodificar_payload_clustering(corpo: bytes):
+    colunas = extrair_colunas_payload_clustering(corpo)
+    impressao, hashes_alertas = impressao_digital_alertas(colunas)
+    return colunas, impressao, hashes_alertas
+
+
 @router.post(
     "/cluster_alerts",
     response_model=ClusteringResponse,
     summary="Agrupa alertas geograficamente para identificar hotspots",
     responses={
-        200: {"description": "Clustering realizado com sucesso."},
+        200: {"description": "Clustering realizado com sucesso. O cabeçalho ETag identifica o conjunto de alertas."},
+        304: {"description": "O conjunto de alertas (e a configuração do clustering) é o da ETag enviada em If-None-Match."},
         400: {"model": ErrorDetail, "description": "A lista 'alertsToCluster' é obrigatória e seus itens devem conter os campos requeridos."},
-        500: {"model": ErrorDetail, "description": "Falha no processo de clustering."}
+        500: {"model": ErrorDetail, "description": "Falha no processo de clustering."},
+        503: {"model": ErrorDetail, "description": "Serviço sobrecarregado ou modelos indisponíveis. Tente novamente em instantes."}
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": f"#/components/schemas/{ClusteringInput.__name__}"}}}
+        }
     }
 )
-async def cluster_alerts_endpoint_v2(payload: ClusteringInput):
+async def cluster_alerts_endpoint_v2(request: Request):
     """
     Recebe uma lista de alertas (com suas localizações e classificações de IA)
     e retorna os hotspots identificados e a atribuição de cluster para cada alerta.
+
+    O corpo (schema `ClusteringInput`) é decodificado direto em colunas numpy e a resposta
+    (schema `ClusteringResponse`) é serializada no próprio worker do clustering, sem criar um
+    modelo pydantic por alerta na entrada nem na saída.
+
+    A resposta traz uma ETag fraca com a impressão digital do conjunto de alertas (independente
+    da ordem). Com `If-None-Match` igual a ela, a resposta é 304, sem corpo. Conjuntos repetidos
+    são respondidos pelo cache de respostas, sem refazer o clustering.
+    """
+    corpo = await request.body()
+    cronometro = iniciar_cronometro()
+    try:
+        colunas, impressao, hashes_alertas = await pool_inferencia.executar(_decodificar_payload_clustering, corpo)
+        quantidade_alertas = len(colunas['alertId'])
+        observar_tamanho_lote("cluster_alerts", quantidade_alertas)
+        if cronometro is not None:
+            cronometro.marcar("request_parsing")
+
+        etag = gerar_etag(impressao)
+        if etag_corresponde(request.headers.get("if-none-match"), etag):
+            if cronometro is not None:
+                cronometro.registrar()
+            return Response(status_code=304, headers={"ETag": etag})
+
+        entrada_cache = cache_clustering.obter(impressao) if settings.CLUSTERING_CACHE_ENABLED else None
+        if entrada_cache is not None:
+            corpo_resposta = await pool_inferencia.executar(responder_do_cache, entrada_cache, colunas['alertId'], hashes_alertas)
+            if cronometro is not None:
+                cronometro.marcar("cache_response")
+        else:
+            if cronometro is None:
+                resposta = await executar_clustering(gerar_resposta_clustering, colunas, quantidade_alertas)
+            else:
+                resposta, tempos_etapas = await executar_clustering(gerar_resposta_clustering_cronometrada, colunas, quantidade_alertas)
+                cronometro.tempos.update(tempos_etapas)
+            if settings.CLUSTERING_CACHE_ENABLED:
+                cache_clustering.gravar(impressao, EntradaCacheClustering(hashes_alertas, resposta))
+            corpo_resposta = resposta.corpo
+        if cronometro is not None:
+            cronometro.registrar()
+
+        return RespostaJsonRapida(corpo_resposta, headers={"ETag": etag})
+
+    except PayloadClusteringInvalidoError as e:
+        raise RequestValidationError(e.erros)
+
+    except ServicoSobrecarregadoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": str(e)},
+            headers={"Retry-After": "1"}
+        )
+
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "Bad Request", "message": str(ve)}
+        )
+    
+    except Exception as e:
+        print(f"Erro crítico durante o clustering: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "Internal Server Error", "message": "Falha no processo de clustering."}
+        )
+
+
+
+def _exigir_worker_unico():
+    """O estado incremental fica na memória do processo: com vários workers, cada um teria o seu."""
+    if varios_workers():
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": "Conflict",
+                "message": "O clustering incremental guarda o estado na memória do worker e fica desabilitado com mais de um worker. Use WORKERS=1."
+            }
+        )
+
+
+@router.post(
+    "/cluster_alerts/incremental",
+    response_model=IncrementalClusteringDeltaResponse,
+    summary="Adiciona/remove alertas do clustering incremental e retorna apenas o que mudou",
+    responses={
+        200: {"description": "Atualização aplicada. A resposta traz os rótulos e hotspots alterados."},
+        400: {"model": ErrorDetail, "description": "Payload inválido ou acima do limite de itens por atualização."},
+        409: {"model": ErrorDetail, "description": "Desabilitado: a API roda com mais de um worker."},
+        500: {"model": ErrorDetail, "description": "Falha no processo de clustering."},
+        503: {"model": ErrorDetail, "description": "Serviço sobrecarregado. Tente novamente em instantes."}
+    }
+)
+async def cluster_alerts_incremental_endpoint(payload: IncrementalClusteringInput):
     """
-    if not payload.alertsToCluster:
+    Mantém os alertas ativos em memória: envie somente os alertas novos (ou atualizados) e os
+    encerrados. Alertas com `timestampReporte` mais antigo que INCREMENTAL_CLUSTERING_TTL_SECONDS
+    são expirados automaticamente. Apenas a vizinhança dos alertas alterados é reprocessada, e os
+    rótulos de cluster são estáveis entre atualizações.
+    """
+    _exigir_worker_unico()
+    if len(payload.alertsToAdd) + len(payload.alertIdsToRemove) > settings.INCREMENTAL_CLUSTERING_MAX_ITEMS:
         raise HTTPException(
             status_code=400,
             detail={
                 "error": "Bad Request",
-                "message": "A lista 'alertsToCluster' é obrigatória e não pode ser vazia."
+                "message": f"A atualização excede o limite de {settings.INCREMENTAL_CLUSTERING_MAX_ITEMS} itens. Divida-a em partes menores."
             }
         )
-    
-    for alerta in payload.alertsToCluster:
-        if not all([
-            hasattr(alerta, 'alertId'), hasattr(alerta, 'latitude'), hasattr(alerta, 'longitude'),
-            hasattr(alerta, 'severityIA'), hasattr(alerta, 'typeIA')
-        ]):
+    referencia_epoch = None
+    if payload.referenceTimestamp is not None:
+        referencia_epoch = converter_timestamp_para_epoch(payload.referenceTimestamp)
+        if referencia_epoch is None:
             raise HTTPException(
                 status_code=400,
-                detail={
-                    "error": "Bad Request",
-                    "message": "Itens em 'alertsToCluster' devem conter 'alertId', 'latitude', 'longitude', 'severityIA', e 'typeIA'."
-                }
+                detail={"error": "Bad Request", "message": "O campo 'referenceTimestamp' deve estar no formato ISO 8601."}
             )
 
     try:
-        clustering_results_list, hotspot_summaries_list_of_dicts = realizar_clustering_alertas(payload.alertsToCluster)        
-        hotspot_summaries_obj_list = [HotspotSummaryOutput(**data) for data in hotspot_summaries_list_of_dicts]
-
-        return ClusteringResponse(
-            clusteringResults=[ClusteringResultItem(**item) for item in clustering_results_list],
-            hotspotSummaries=hotspot_summaries_obj_list
+        return await pool_inferencia.executar(
+            estado_clustering_incremental.aplicar, payload.alertsToAdd, payload.alertIdsToRemove, referencia_epoch
         )
-    
-    except ValueError as ve:
+    except ServicoSobrecarregadoError as e:
         raise HTTPException(
-            status_code=400,
-            detail={"error": "Bad Request", "message": str(ve)}
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": str(e)},
+            headers={"Retry-After": "1"}
         )
-    
     except Exception as e:
-        print(f"Erro crítico durante o clustering: {e}")
+        print(f"Erro crítico durante o clustering incremental: {e}")
         raise HTTPException(
             status_code=500,
             detail={"error": "Internal Server Error", "message": "Falha no processo de clustering."}
         )
+
+
+@router.get(
+    "/cluster_alerts/incremental",
+    response_model=IncrementalClusteringSnapshotResponse,
+    summary="Retorna o estado completo do clustering incremental (para ressincronização)",
+    responses={
+        400: {"model": ErrorDetail, "description": "'referenceTimestamp' fora do formato ISO 8601."},
+        409: {"model": ErrorDetail, "description": "Desabilitado: a API roda com mais de um worker."}
+    }
+)
+async def cluster_alerts_incremental_snapshot_endpoint(
+    referenceTimestamp: Annotated[Optional[str], Query(description="Instante (ISO 8601) usado para expirar alertas antes do instantâneo. Padrão: agora.")] = None
+):
+    _exigir_worker_unico()
+    referencia_epoch = None
+    if referenceTimestamp is not None:
+        referencia_epoch = converter_timestamp_para_epoch(referenceTimestamp)
+        if referencia_epoch is None:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": "Bad Request", "message": "O parâmetro 'referenceTimestamp' deve estar no formato ISO 8601."}
+            )
+    try:
+        return await pool_inferencia.executar(estado_clustering_incremental.instantaneo, referencia_epoch)
+    except ServicoSobrecarregadoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Service Unavailable", "message": str(e)},
+            headers={"Retry-After": "1"}
+        )
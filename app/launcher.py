@@ -0,0 +1,267 @@
+"""
+Lançador de produção com vários workers que compartilham os modelos.
+
+`uvicorn --workers N` inicia cada worker do zero (spawn), e cada um carrega sua própria cópia
+dos artefatos. Aqui, o processo mestre carrega e aquece os modelos e os recursos de texto uma
+única vez, abre o socket e cria os workers com `fork`: as páginas dos modelos são compartilhadas
+copy-on-write. Antes do fork, `gc.freeze()` tira os objetos já carregados das varreduras do
+coletor de lixo, que senão tocariam os cabeçalhos de todos esses objetos e copiariam as páginas
+em cada worker.
+
+As bibliotecas numéricas (OpenBLAS, MKL, OpenMP) ficam limitadas a `WORKER_NUMERIC_THREADS`
+threads por worker, para N workers não disputarem os núcleos com N pools de threads de BLAS.
+
+Sinais do mestre:
+* SIGTERM/SIGINT: encerra os workers com SIGTERM (o uvicorn termina as requisições em andamento)
+  e, após `WORKER_GRACEFUL_TIMEOUT_SECONDS`, com SIGKILL;
+* SIGHUP: recarrega os modelos no mestre e, se os artefatos mudaram, substitui os workers um a
+  um: cada novo worker entra antes de um antigo sair, sem fechar o socket.
+`/admin/models/reload` e `/admin/models/rollback` chegam ao mestre pelo pipe de comandos
+(app/core/workers.py) e têm o mesmo efeito, valendo para todos os workers. Workers que terminam
+inesperadamente são recriados; se morrem logo após iniciar (ex.: erro no startup), a recriação
+espera cada vez mais, até `ESPERA_MAXIMA_RECRIACAO_SEGUNDOS`.
+
+Uso: python -m app.launcher
+"""
+import os
+
+from app.core.config import settings
+
+# Antes de importar numpy/scipy/scikit-learn: as bibliotecas leem essas variáveis ao iniciar.
+VARIAVEIS_THREADS_NUMERICAS = (
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS",
+)
+for _variavel in VARIAVEIS_THREADS_NUMERICAS:
+    os.environ.setdefault(_variavel, str(settings.WORKER_NUMERIC_THREADS))
+
+import gc
+import json
+import select
+import signal
+import socket
+import time
+from typing import Callable, Dict, List
+
+import uvicorn
+from threadpoolctl import threadpool_limits
+
+from app.core.workers import configurar_workers, nucleos_disponiveis
+from app.main import app
+from app.ml.model_loader import load_all_models, registro_modelos
+from app.utils.text_processor import inicializar_recursos_texto
+
+INTERVALO_SUPERVISAO_SEGUNDOS = 0.5
+# Um worker que termina antes desse tempo conta como falha seguida para o backoff da recriação.
+VIDA_MINIMA_WORKER_SEGUNDOS = 10.0
+ESPERA_MAXIMA_RECRIACAO_SEGUNDOS = 30.0
+
+
+def quantidade_workers() -> int:
+    """`settings.WORKERS`, ou um worker por núcleo disponível se for 0."""
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    return nucleos_disponiveis()
+
+
+def _executar_worker(sock: socket.socket, descritor_leitura_comandos: int):
+    """Corpo do processo filho: serve a aplicação no socket herdado e termina sem voltar ao mestre."""
+    codigo_saida = 0
+    try:
+        os.close(descritor_leitura_comandos)
+        for sinal in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sinal, signal.SIG_DFL)
+        # O SIGHUP é do mestre; um SIGHUP para o grupo de processos (ex.: terminal fechado) não derruba os workers.
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        config = uvicorn.Config(
+            app,
+            limit_concurrency=settings.WORKER_LIMIT_CONCURRENCY or None,
+            timeout_graceful_shutdown=int(settings.WORKER_GRACEFUL_TIMEOUT_SECONDS) or None,
+        )
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException as e:
+        print(f"Worker {os.getpid()} encerrado com erro: {e}")
+        codigo_saida = 1
+    finally:
+        os._exit(codigo_saida)
+
+
+class Mestre:
+    """Cria e supervisiona os workers (fork) que compartilham o socket e os modelos carregados."""
+
+    def __init__(self, sock: socket.socket, n_workers: int):
+        self.sock = sock
+        self.n_workers = n_workers
+        self._workers: Dict[int, float] = {}
+        self._parando = set()
+        self._encerrar = False
+        self._recarregar = False
+        self._falhas_seguidas = 0
+        self._proxima_criacao = 0.0
+        self._leitura_comandos, escrita_comandos = os.pipe()
+        os.set_blocking(self._leitura_comandos, False)
+        self._comandos_pendentes = b""
+        configurar_workers(n_workers, escrita_comandos)
+
+    def _criar_worker(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            _executar_worker(self.sock, self._leitura_comandos)
+        self._workers[pid] = time.monotonic()
+        print(f"Worker {pid} iniciado.")
+        return pid
+
+    def _coletar_encerrados(self) -> List[int]:
+        encerrados = []
+        while self._workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            iniciado_em = self._workers.pop(pid, None)
+            if iniciado_em is None:
+                continue
+            encerrados.append(pid)
+            if pid in self._parando or self._encerrar:
+                continue
+            print(f"Worker {pid} terminou (status {status}).")
+            agora = time.monotonic()
+            if agora - iniciado_em < VIDA_MINIMA_WORKER_SEGUNDOS:
+                self._falhas_seguidas += 1
+                espera = min(INTERVALO_SUPERVISAO_SEGUNDOS * 2 ** self._falhas_seguidas, ESPERA_MAXIMA_RECRIACAO_SEGUNDOS)
+                self._proxima_criacao = agora + espera
+                print(f"{self._falhas_seguidas} falhas seguidas logo após o início; próximo worker em {espera:.1f} s.")
+            else:
+                self._falhas_seguidas = 0
+        return encerrados
+
+    def _parar_workers(self, pids: List[int]):
+        """SIGTERM nos workers e espera até o prazo de encerramento gracioso; depois, SIGKILL."""
+        self._parando.update(pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        prazo = time.monotonic() + settings.WORKER_GRACEFUL_TIMEOUT_SECONDS + 5.0
+        restantes = set(pids)
+        while restantes and time.monotonic() < prazo:
+            restantes -= set(self._coletar_encerrados())
+            restantes &= set(self._workers)
+            if restantes:
+                time.sleep(0.05)
+        for pid in restantes:
+            print(f"Worker {pid} não encerrou no prazo; enviando SIGKILL.")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while restantes & set(self._workers):
+            restantes -= set(self._coletar_encerrados())
+            time.sleep(0.05)
+        self._parando.difference_update(pids)
+
+    def _trocar_modelos(self, descricao: str, trocar: Callable[[], object]):
+        """Troca a versão dos modelos no mestre e, se ela mudou, substitui os workers um a um."""
+        print(f"{descricao}.")
+        versao_anterior = registro_modelos.atual
+        try:
+            trocar()
+        except Exception as e:
+            print(f"Erro CRÍTICO ao trocar os modelos no mestre: {e}. Mantendo a versão atual.")
+            return
+        if registro_modelos.atual is versao_anterior:
+            print("Versão dos modelos inalterada; os workers foram mantidos.")
+            return
+        gc.collect()
+        gc.freeze()
+        for pid in list(self._workers):
+            if self._encerrar:
+                return
+            self._criar_worker()
+            self._parar_workers([pid])
+
+    def _ler_comandos(self) -> List[dict]:
+        """Comandos completos (uma linha JSON cada) enviados pelos workers desde a última leitura."""
+        while True:
+            try:
+                dados = os.read(self._leitura_comandos, 65536)
+            except BlockingIOError:
+                break
+            if not dados:
+                break
+            self._comandos_pendentes += dados
+        *linhas, self._comandos_pendentes = self._comandos_pendentes.split(b"\n")
+        comandos = []
+        for linha in linhas:
+            try:
+                comandos.append(json.loads(linha))
+            except ValueError:
+                print(f"Comando inválido ignorado: {linha!r}")
+        return comandos
+
+    def _executar_comando(self, comando: dict):
+        acao = comando.get("acao")
+        if acao == "recarregar":
+            origem = comando.get("origem", registro_modelos.ORIGEM_RAIZ)
+            self._trocar_modelos(
+                f"Recarga dos modelos de '{origem}' pedida por um worker",
+                lambda: registro_modelos.recarregar(origem, bool(comando.get("forcar")))
+            )
+        elif acao == "reverter":
+            self._trocar_modelos("Rollback dos modelos pedido por um worker", registro_modelos.reverter)
+        else:
+            print(f"Comando desconhecido ignorado: {comando}")
+
+    def executar(self):
+        def pedir_encerramento(sinal, frame):
+            self._encerrar = True
+
+        def pedir_recarga(sinal, frame):
+            self._recarregar = True
+
+        signal.signal(signal.SIGTERM, pedir_encerramento)
+        signal.signal(signal.SIGINT, pedir_encerramento)
+        signal.signal(signal.SIGHUP, pedir_recarga)
+
+        for _ in range(self.n_workers):
+            self._criar_worker()
+        while not self._encerrar:
+            if self._recarregar:
+                self._recarregar = False
+                self._trocar_modelos("SIGHUP recebido: recarregando os modelos", registro_modelos.recarregar)
+            self._coletar_encerrados()
+            while not self._encerrar and len(self._workers) < self.n_workers and time.monotonic() >= self._proxima_criacao:
+                self._criar_worker()
+            prontos, _, _ = select.select([self._leitura_comandos], [], [], INTERVALO_SUPERVISAO_SEGUNDOS)
+            if prontos:
+                for comando in self._ler_comandos():
+                    if self._encerrar:
+                        break
+                    self._executar_comando(comando)
+
+        print(f"Encerrando {len(self._workers)} workers...")
+        self._parar_workers(list(self._workers))
+        self.sock.close()
+        print("Mestre encerrado.")
+
+
+def main():
+    threadpool_limits(settings.WORKER_NUMERIC_THREADS)
+    print(f"Mestre {os.getpid()}: carregando modelos e recursos de texto antes de criar os workers.")
+    load_all_models()
+    inicializar_recursos_texto()
+    if registro_modelos.atual is None:
+        print("ALERTA: Um ou mais modelos/vetorizadores não foram carregados corretamente!")
+    gc.collect()
+    gc.freeze()
+
+    sock = uvicorn.Config(app, host=settings.SERVER_HOST, port=settings.SERVER_PORT).bind_socket()
+    n_workers = quantidade_workers()
+    print(f"Servindo em http://{settings.SERVER_HOST}:{settings.SERVER_PORT} com {n_workers} workers.")
+    Mestre(sock, n_workers).executar()
+
+
+if __name__ == "__main__":
+    main()
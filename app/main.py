@@ -3,20 +3,31 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
 
-from app.endpoints import predict_endpoints
-from app.ml.model_loader import load_all_models, ml_models
+from app.endpoints import predict_endpoints, admin_endpoints, metrics_endpoints
+from app.ml.model_loader import load_all_models, registro_modelos
 from app.core.config import settings
+from app.utils.text_processor import inicializar_recursos_texto
+from app.core.executor import iniciar_pools, encerrar_pools
+from app.services.micro_batcher import micro_batcher_classificacao
+from app.services.particionamento_clustering import encerrar_pools_particoes
 
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI):
     print("Aplicativo iniciando... Carregando modelos de ML.")
     load_all_models()
-    if not all(ml_models.values()):
+    inicializar_recursos_texto()
+    if registro_modelos.atual is None:
         print("ALERTA: Um ou mais modelos/vetorizadores não foram carregados corretamente!")
     else:
         print("Modelos carregados. Aplicativo pronto.")
+    iniciar_pools()
+    if settings.MICRO_BATCH_ENABLED:
+        micro_batcher_classificacao.iniciar()
     yield
     print("Aplicativo encerrando.")
+    await micro_batcher_classificacao.encerrar()
+    encerrar_pools()
+    encerrar_pools_particoes()
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -32,7 +43,21 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         content={"error": "Bad Request", "message": "O campo 'text' e 'alertId' são obrigatórios ou inválido na requisição."},
     )
 
+_gerar_openapi_padrao = app.openapi
+
+def gerar_openapi():
+    """OpenAPI do FastAPI mais os schemas de corpos lidos à mão (`ESQUEMAS_OPENAPI_ADICIONAIS`)."""
+    esquema = _gerar_openapi_padrao()
+    esquemas = esquema.setdefault("components", {}).setdefault("schemas", {})
+    for nome, definicao in predict_endpoints.ESQUEMAS_OPENAPI_ADICIONAIS.items():
+        esquemas.setdefault(nome, definicao)
+    return esquema
+
+app.openapi = gerar_openapi
+
 app.include_router(predict_endpoints.router)
+app.include_router(admin_endpoints.router)
+app.include_router(metrics_endpoints.router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,92 @@
+"""
+Formato compacto dos artefatos de modelo.
+
+O `vocabulary_` dos TfidfVectorizer é um dict Python com milhares de strings; cada worker
+mantém a sua cópia e, como o contador de referências dos objetos é escrito a cada acesso,
+as páginas não continuam compartilhadas após o fork. No formato compacto o vocabulário vira
+dois arrays numpy (termos ordenados e colunas), que o joblib grava alinhados no arquivo e
+que podem ser carregados com `mmap_mode='r'`, compartilhando as páginas entre processos.
+
+Gere os artefatos compactos (ao lado dos originais, em `settings.MODELS_DIR`) com:
+    python -m app.ml.compact_artifacts
+"""
+import os
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator
+
+import joblib
+import numpy as np
+
+from app.core.config import settings
+
+SUFIXO_ARTEFATO_COMPACTO = ".compact.joblib"
+
+
+def caminho_artefato_compacto(caminho_artefato: str) -> str:
+    raiz, _ = os.path.splitext(caminho_artefato)
+    return raiz + SUFIXO_ARTEFATO_COMPACTO
+
+
+class VocabularioCompacto(Mapping):
+    """Mapeamento termo -> coluna apoiado em arrays numpy ordenados (busca binária)."""
+
+    def __init__(self, termos: np.ndarray, colunas: np.ndarray):
+        self.termos = termos
+        self.colunas = colunas
+
+    @classmethod
+    def de_dicionario(cls, vocabulario: Dict[str, int]) -> "VocabularioCompacto":
+        termos = np.array(sorted(vocabulario))
+        colunas = np.array([vocabulario[termo] for termo in termos.tolist()], dtype=np.int32)
+        return cls(termos, colunas)
+
+    def __getitem__(self, termo: str) -> int:
+        posicao = int(np.searchsorted(self.termos, termo))
+        if posicao < len(self.termos) and self.termos[posicao] == termo:
+            return int(self.colunas[posicao])
+        raise KeyError(termo)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.termos.tolist())
+
+    def __len__(self) -> int:
+        return len(self.termos)
+
+
+def compactar_artefato(artefato):
+    """Substitui o vocabulário em dict de um vetorizador pela versão compacta (no próprio objeto)."""
+    vocabulario = getattr(artefato, "vocabulary_", None)
+    if isinstance(vocabulario, dict):
+        artefato.vocabulary_ = VocabularioCompacto.de_dicionario(vocabulario)
+    return artefato
+
+
+def compilar_artefatos_compactos(pasta_modelos: str, nomes_arquivos: Iterable[str]) -> Dict[str, str]:
+    """Gera a versão compacta de cada artefato. Retorna {arquivo original: arquivo compacto}."""
+    gerados = {}
+    for nome_arquivo in nomes_arquivos:
+        caminho = os.path.join(pasta_modelos, nome_arquivo)
+        artefato = compactar_artefato(joblib.load(caminho))
+        caminho_compacto = caminho_artefato_compacto(caminho)
+        # Sem compressão: arrays comprimidos não podem ser mapeados em memória.
+        joblib.dump(artefato, caminho_compacto, compress=0)
+        gerados[caminho] = caminho_compacto
+    return gerados
+
+
+if __name__ == "__main__":
+    # Importa pelo nome do pacote para que o pickle referencie app.ml.compact_artifacts, e não __main__.
+    from app.ml.compact_artifacts import compilar_artefatos_compactos
+    from app.ml.model_loader import ARTEFATOS_MODELOS
+
+    for original, compacto in compilar_artefatos_compactos(settings.MODELS_DIR, ARTEFATOS_MODELOS.values()).items():
+        print(f"{os.path.basename(original)} -> {os.path.basename(compacto)}")
+
+    textos_verificacao = ["alag rua princip", "desliz terr bloque via", "arvor cai fiac risc incendi", ""]
+    for chave in ("vetorizador_tipo", "vetorizador_severidade"):
+        caminho = os.path.join(settings.MODELS_DIR, ARTEFATOS_MODELOS[chave])
+        original = joblib.load(caminho)
+        compacto = joblib.load(caminho_artefato_compacto(caminho), mmap_mode="r")
+        if (original.transform(textos_verificacao) != compacto.transform(textos_verificacao)).nnz:
+            raise SystemExit(f"ERRO: o artefato compacto de '{chave}' diverge do original.")
+    print("Artefatos compactos verificados.")
@@ -0,0 +1,163 @@
+"""
+Dicionário de radicais pré-calculado (palavra -> radical RSLP).
+
+O `RSLPStemmer` do NLTK é Python puro, com várias passadas de regras por palavra. O dicionário
+guarda o radical de cada palavra conhecida (já normalizada como em `preprocessar_tokens`) e a
+lista de stopwords num artefato joblib ao lado dos modelos. No startup, os arrays do artefato
+viram um dict: uma busca binária escalar no numpy custaria tanto quanto o próprio RSLP (~4 us
+por palavra), o dict ~0,05 us. Com o lançador (app/launcher.py), o dict é montado no mestre antes
+do fork e compartilhado pelos workers. Palavras fora do dicionário vão para o stemmer RSLP.
+
+As palavras vêm dos vocabulários dos vetorizadores e dos léxicos: cada radical é combinado com
+terminações comuns do português (`SUFIXOS_PORTUGUES`), como "alag" -> "alagada", "alagamento".
+Somam-se as palavras de arquivos de texto (ex.: o corpus de treino) e dos textos de aquecimento,
+cujos radicais também recebem as terminações. Cada palavra guarda o radical que o RSLP calcula
+para ela, então formas que não existem em português só ocupam espaço. Gere o dicionário (em `settings.MODELS_DIR`) com:
+    python -m app.ml.dicionario_radicais [--corpus arquivo ...]
+"""
+import os
+from typing import Iterable, List, Optional, Set
+
+import joblib
+import numpy as np
+
+from app.core.config import settings
+
+VERSAO_FORMATO_DICIONARIO = 1
+# Os arrays têm largura fixa (a da maior palavra): palavras mais longas (ex.: trechos base64 no
+# corpus) ficam de fora e, se aparecerem, vão para o stemmer RSLP.
+TAMANHO_MAXIMO_PALAVRA = 32
+
+
+class DicionarioRadicais:
+    """
+    Radicais RSLP de palavras ASCII. No artefato, palavras e radicais são arrays ordenados de
+    bytes (os radicais em UTF-8: algumas regras do RSLP produzem acentos); as consultas usam
+    um dict montado a partir deles.
+    """
+
+    def __init__(self, palavras: np.ndarray, radicais: np.ndarray, stopwords: np.ndarray):
+        self.palavras = palavras
+        self.radicais = radicais
+        self.stopwords = stopwords
+        self._radical_por_palavra = dict(zip(
+            (palavra.decode('ascii') for palavra in palavras.tolist()),
+            (radical.decode('utf-8') for radical in radicais.tolist())
+        ))
+
+    def __len__(self) -> int:
+        return len(self.palavras)
+
+    def radical(self, palavra: str) -> Optional[str]:
+        """Radical da palavra, ou None se ela não estiver no dicionário."""
+        return self._radical_por_palavra.get(palavra)
+
+    @classmethod
+    def construir(cls, palavras: Iterable[str], stopwords: Iterable[str], stemmer) -> "DicionarioRadicais":
+        stopwords = sorted(set(stopwords))
+        palavras = sorted(palavra for palavra in set(palavras) - set(stopwords) if len(palavra) <= TAMANHO_MAXIMO_PALAVRA)
+        return cls(
+            np.array([palavra.encode('ascii') for palavra in palavras], dtype=bytes),
+            np.array([stemmer.stem(palavra).encode('utf-8') for palavra in palavras], dtype=bytes),
+            np.array(stopwords, dtype=str),
+        )
+
+    def salvar(self, caminho: str):
+        # Só arrays numpy (sem classes no pickle) e sem compressão.
+        joblib.dump(
+            {"versao_formato": VERSAO_FORMATO_DICIONARIO, "palavras": self.palavras, "radicais": self.radicais, "stopwords": self.stopwords},
+            caminho,
+            compress=0
+        )
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "DicionarioRadicais":
+        dados = joblib.load(caminho)
+        if dados.get("versao_formato") != VERSAO_FORMATO_DICIONARIO:
+            raise ValueError(f"Formato do dicionário de radicais não suportado: {dados.get('versao_formato')!r}.")
+        return cls(dados["palavras"], dados["radicais"], dados["stopwords"])
+
+
+def caminho_dicionario_radicais() -> str:
+    return os.path.join(settings.MODELS_DIR, settings.STEM_DICTIONARY_FILENAME)
+
+
+def carregar_dicionario_radicais() -> Optional[DicionarioRadicais]:
+    """O dicionário de `settings.MODELS_DIR`, ou None se o arquivo não existir ou for inválido."""
+    caminho = caminho_dicionario_radicais()
+    if not os.path.exists(caminho):
+        return None
+    try:
+        dicionario = DicionarioRadicais.carregar(caminho)
+    except Exception as e:
+        print(f"Aviso: falha ao carregar o dicionário de radicais '{caminho}': {e}. Usando o stemmer RSLP.")
+        return None
+    print(f"Dicionário de radicais carregado: {len(dicionario)} palavras, {len(dicionario.stopwords)} stopwords.")
+    return dicionario
+
+
+# Terminações de flexão (gênero, número, particípios, tempos verbais) e de derivação.
+SUFIXOS_PORTUGUES = (
+    "", "a", "o", "e", "s", "as", "os", "es", "r", "m", "ar", "er", "ir", "am", "em", "ei", "ou", "iu",
+    "ada", "ado", "adas", "ados", "ida", "ido", "idas", "idos", "ando", "endo", "indo", "ndo",
+    "ava", "avam", "ia", "iam", "aram", "eram", "iram", "ias", "io", "ios",
+    "amento", "amentos", "imento", "imentos", "cao", "coes", "ao", "oes", "agem", "agens",
+    "eiro", "eira", "eiros", "eiras", "ente", "entes", "ante", "antes", "oso", "osa", "osos", "osas",
+    "ivel", "iveis", "al", "ais", "ura", "uras", "idade", "idades", "mente", "inha", "inho",
+    "ica", "ico", "icas", "icos", "do", "da", "dos", "das",
+)
+
+
+def radicais_dos_modelos(pasta_modelos: str) -> Set[str]:
+    """Termos (unigramas de todos os n-gramas) dos vocabulários dos vetorizadores e palavras dos léxicos."""
+    from app.ml.lexicons import LEXICOS_SEVERIDADE
+
+    radicais = {palavra for lexico in LEXICOS_SEVERIDADE.values() for palavra in lexico}
+    for nome_arquivo in (settings.VETORIZADOR_TIPO_FILENAME, settings.VETORIZADOR_SEVERIDADE_FILENAME):
+        vetorizador = joblib.load(os.path.join(pasta_modelos, nome_arquivo))
+        for termo in vetorizador.vocabulary_:
+            radicais.update(termo.split())
+    return radicais
+
+
+def palavras_derivadas(radicais: Iterable[str]) -> Set[str]:
+    """Cada radical ASCII combinado com cada terminação de `SUFIXOS_PORTUGUES`."""
+    return {
+        radical + sufixo
+        for radical in radicais if radical.isascii() and radical.isalpha()
+        for sufixo in SUFIXOS_PORTUGUES
+    }
+
+
+def textos_do_arquivo(caminho: str) -> List[str]:
+    with open(caminho, encoding="utf-8", errors="ignore") as arquivo:
+        return [arquivo.read()]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.utils import text_processor
+
+    parser = argparse.ArgumentParser(description="Gera o dicionário de radicais pré-calculado.")
+    parser.add_argument("--corpus", nargs="*", default=[], help="Arquivos de texto adicionais (ex.: o corpus de treino em CSV ou JSONL).")
+    parser.add_argument("--saida", default=caminho_dicionario_radicais())
+    args = parser.parse_args()
+
+    stemmer = text_processor.obter_stemmer_rslp()
+    stopwords = text_processor.carregar_stopwords_nltk()
+    textos = list(settings.MODELS_WARMUP_TEXTS)
+    for caminho in args.corpus:
+        textos += textos_do_arquivo(caminho)
+    palavras_corpus = {palavra for texto in textos for palavra in text_processor.normalizar_palavras(texto)} - stopwords
+    radicais = radicais_dos_modelos(settings.MODELS_DIR) | {stemmer.stem(palavra) for palavra in palavras_corpus}
+    palavras = palavras_corpus | palavras_derivadas(radicais)
+
+    DicionarioRadicais.construir(palavras, stopwords, stemmer).salvar(args.saida)
+    dicionario = DicionarioRadicais.carregar(args.saida)
+    if set(dicionario.stopwords.tolist()) != stopwords or any(
+        dicionario.radical(palavra) != stemmer.stem(palavra)
+        for palavra in palavras if palavra not in stopwords and len(palavra) <= TAMANHO_MAXIMO_PALAVRA
+    ):
+        raise SystemExit("ERRO: o dicionário gerado diverge do stemmer RSLP.")
+    print(f"{args.saida}: {len(dicionario)} palavras, {len(dicionario.stopwords)} stopwords, {os.path.getsize(args.saida) / 1024:.0f} KiB. Verificado.")
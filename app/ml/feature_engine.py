@@ -0,0 +1,206 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.utils.sparsefuncs_fast import inplace_csr_row_normalize_l1, inplace_csr_row_normalize_l2
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.metrics import Cronometro
+from app.ml.compact_artifacts import VocabularioCompacto
+from app.utils.text_processor import contar_lexicos
+
+# Parâmetros que definem a tokenização/análise de um vetorizador. Se forem iguais nos dois
+# vetorizadores, o texto pode ser analisado uma única vez para ambos.
+PARAMETROS_ANALISADOR = (
+    'input', 'encoding', 'decode_error', 'strip_accents', 'lowercase', 'preprocessor',
+    'tokenizer', 'analyzer', 'token_pattern', 'stop_words', 'ngram_range'
+)
+
+
+def _parametros_analisador(vetorizador) -> tuple:
+    return tuple(getattr(vetorizador, parametro, None) for parametro in PARAMETROS_ANALISADOR)
+
+
+class MotorFeatures:
+    """
+    Gera as features dos modelos de tipo e de severidade analisando cada texto uma única vez.
+
+    Os termos do texto são contados contra um índice único (termo -> coluna no vocabulário de
+    tipo, coluna no vocabulário de severidade) e recebem o idf e a normalização do
+    TfidfTransformer de cada vetorizador direto nos buffers CSR, o que mantém os valores idênticos
+    aos de `vetorizador.transform`. As colunas de léxico são escritas diretamente na matriz CSR de
+    severidade, no mesmo layout que `hstack([tfidf, csr_matrix(lexicos)])` produzia.
+
+    Com os artefatos compactos (`VocabularioCompacto`), o índice em dict não é montado (ele
+    ocuparia em cada worker a memória que o formato compacto economiza): os termos do lote são
+    buscados de uma vez nos arrays ordenados do vocabulário.
+    """
+
+    def __init__(self, vetorizador_tipo, vetorizador_severidade, indice_lexicos: Dict[str, Tuple[int, ...]], quantidade_lexicos: int):
+        self.vetorizador_tipo = vetorizador_tipo
+        self.vetorizador_severidade = vetorizador_severidade
+        self.indice_lexicos = indice_lexicos
+        self.quantidade_lexicos = quantidade_lexicos
+        self.analise_compartilhada = _parametros_analisador(vetorizador_tipo) == _parametros_analisador(vetorizador_severidade)
+
+        self.n_features_tipo = len(vetorizador_tipo.vocabulary_)
+        self.n_features_severidade = len(vetorizador_severidade.vocabulary_)
+
+        self.vocabularios_compactos = all(
+            isinstance(vetorizador.vocabulary_, VocabularioCompacto) for vetorizador in (vetorizador_tipo, vetorizador_severidade)
+        )
+
+        if self.analise_compartilhada:
+            self._analisador = vetorizador_tipo.build_analyzer()
+        if self.analise_compartilhada and not self.vocabularios_compactos:
+            indice: Dict[str, List[int]] = {}
+            for termo, coluna in vetorizador_tipo.vocabulary_.items():
+                indice.setdefault(termo, [-1, -1])[0] = int(coluna)
+            for termo, coluna in vetorizador_severidade.vocabulary_.items():
+                indice.setdefault(termo, [-1, -1])[1] = int(coluna)
+            self.indice_termos = {termo: (colunas[0], colunas[1]) for termo, colunas in indice.items()}
+
+    def transformar(self, textos_processados: Sequence[str], cronometro: Optional[Cronometro] = None):
+        """
+        Retorna (features_tipo, features_severidade_com_lexicos), ambas CSR com uma linha por texto.
+        Com um `cronometro`, marca as etapas "type_tfidf" (inclui a contagem de termos compartilhada)
+        e "severity_features".
+        """
+        features_tipo, features_tfidf_severidade, features_lexico = self.transformar_partes(textos_processados, cronometro)
+        features_severidade = self.anexar_colunas_lexico(features_tfidf_severidade, features_lexico)
+        if cronometro is not None:
+            cronometro.marcar("severity_features")
+        return features_tipo, features_severidade
+
+    def transformar_partes(self, textos_processados: Sequence[str], cronometro: Optional[Cronometro] = None):
+        """
+        Retorna (features_tipo, features_tfidf_severidade, features_lexico): as duas matrizes TF-IDF
+        em CSR e as contagens de léxico densas (uma coluna por léxico), sem montar a matriz de
+        severidade combinada.
+        """
+        if self.analise_compartilhada:
+            contagens_tipo, contagens_severidade = self._contar_termos(textos_processados)
+            features_tipo = self._aplicar_tfidf(self.vetorizador_tipo, contagens_tipo)
+            if cronometro is not None:
+                cronometro.marcar("type_tfidf")
+            features_tfidf_severidade = self._aplicar_tfidf(self.vetorizador_severidade, contagens_severidade)
+        else:
+            features_tipo = self.vetorizador_tipo.transform(textos_processados)
+            if cronometro is not None:
+                cronometro.marcar("type_tfidf")
+            features_tfidf_severidade = self.vetorizador_severidade.transform(textos_processados)
+
+        features_lexico = np.array(
+            [contar_lexicos(texto, self.indice_lexicos, self.quantidade_lexicos) for texto in textos_processados],
+            dtype=np.float64
+        ).reshape(len(textos_processados), self.quantidade_lexicos)
+        if cronometro is not None:
+            cronometro.marcar("severity_features")
+        return features_tipo, features_tfidf_severidade.tocsr(), features_lexico
+
+    def _contar_termos(self, textos_processados: Sequence[str]) -> Tuple[csr_matrix, csr_matrix]:
+        if self.vocabularios_compactos:
+            return self._contar_termos_compactos(textos_processados)
+        indptr_tipo, colunas_tipo, valores_tipo = [0], [], []
+        indptr_severidade, colunas_severidade, valores_severidade = [0], [], []
+        indice_termos = self.indice_termos
+
+        for texto in textos_processados:
+            contagem_termos: Dict[Tuple[int, int], int] = {}
+            for termo in self._analisador(texto):
+                colunas = indice_termos.get(termo)
+                if colunas is not None:
+                    contagem_termos[colunas] = contagem_termos.get(colunas, 0) + 1
+            for (coluna_tipo, coluna_severidade), contagem in contagem_termos.items():
+                if coluna_tipo >= 0:
+                    colunas_tipo.append(coluna_tipo)
+                    valores_tipo.append(contagem)
+                if coluna_severidade >= 0:
+                    colunas_severidade.append(coluna_severidade)
+                    valores_severidade.append(contagem)
+            indptr_tipo.append(len(colunas_tipo))
+            indptr_severidade.append(len(colunas_severidade))
+
+        return (
+            self._matriz_contagens(self.vetorizador_tipo, valores_tipo, colunas_tipo, indptr_tipo, self.n_features_tipo),
+            self._matriz_contagens(self.vetorizador_severidade, valores_severidade, colunas_severidade, indptr_severidade, self.n_features_severidade),
+        )
+
+    def _contar_termos_compactos(self, textos_processados: Sequence[str]) -> Tuple[csr_matrix, csr_matrix]:
+        termos_por_texto = [self._analisador(texto) for texto in textos_processados]
+        linhas = np.repeat(np.arange(len(textos_processados), dtype=np.int32), [len(termos) for termos in termos_por_texto])
+        termos = np.array([termo for termos in termos_por_texto for termo in termos], dtype=str)
+        return tuple(
+            self._matriz_contagens_compacta(vetorizador, linhas, termos, len(textos_processados), n_features)
+            for vetorizador, n_features in ((self.vetorizador_tipo, self.n_features_tipo), (self.vetorizador_severidade, self.n_features_severidade))
+        )
+
+    @staticmethod
+    def _matriz_contagens_compacta(vetorizador, linhas: np.ndarray, termos: np.ndarray, n_linhas: int, n_features: int) -> csr_matrix:
+        vocabulario = vetorizador.vocabulary_
+        posicoes = np.minimum(np.searchsorted(vocabulario.termos, termos), len(vocabulario.termos) - 1)
+        no_vocabulario = vocabulario.termos[posicoes] == termos
+        # Chaves linha * n_features + coluna: o np.unique conta as repetições e já as deixa na ordem da CSR.
+        chaves, contagens = np.unique(
+            linhas[no_vocabulario].astype(np.int64) * n_features + vocabulario.colunas[posicoes[no_vocabulario]],
+            return_counts=True
+        )
+        indptr = np.zeros(n_linhas + 1, dtype=np.int32)
+        np.cumsum(np.bincount(chaves // n_features, minlength=n_linhas), out=indptr[1:])
+        valores = np.ones(len(chaves), dtype=vetorizador.dtype) if vetorizador.binary else contagens.astype(vetorizador.dtype)
+        return csr_matrix((valores, (chaves % n_features).astype(np.int32), indptr), shape=(n_linhas, n_features))
+
+    @staticmethod
+    def _matriz_contagens(vetorizador, valores, colunas, indptr, n_features) -> csr_matrix:
+        # Mesmo layout do CountVectorizer: CSR no dtype do vetorizador com índices ordenados por linha.
+        matriz = csr_matrix(
+            (np.asarray(valores, dtype=np.intc), np.asarray(colunas, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, n_features),
+            dtype=vetorizador.dtype
+        )
+        matriz.sort_indices()
+        if vetorizador.binary:
+            matriz.data.fill(1)
+        return matriz
+
+    @staticmethod
+    def _aplicar_tfidf(vetorizador, contagens: csr_matrix) -> csr_matrix:
+        """
+        Mesmas operações de `TfidfTransformer.transform` (com os parâmetros públicos do vetorizador:
+        `sublinear_tf`, `use_idf`/`idf_` e `norm`), feitas no lugar sobre os buffers da CSR de
+        contagens, sem a validação de entrada do scikit-learn (que domina o custo em lotes pequenos).
+        """
+        if contagens.dtype not in (np.float64, np.float32):
+            contagens = contagens.astype(np.float64)
+        if vetorizador.sublinear_tf:
+            np.log(contagens.data, contagens.data)
+            contagens.data += 1.0
+        if vetorizador.use_idf:
+            contagens.data *= vetorizador.idf_[contagens.indices]
+        if vetorizador.norm == 'l2':
+            inplace_csr_row_normalize_l2(contagens)
+        elif vetorizador.norm == 'l1':
+            inplace_csr_row_normalize_l1(contagens)
+        return contagens
+
+    def anexar_colunas_lexico(self, features_tfidf: csr_matrix, features_lexico: np.ndarray) -> csr_matrix:
+        """Matriz de severidade combinada: TF-IDF seguido das colunas de léxico, escrita direto nos buffers CSR."""
+        n_linhas, n_colunas_tfidf = features_tfidf.shape
+        linhas_lexico, colunas_lexico = np.nonzero(features_lexico)
+        nnz_tfidf_por_linha = np.diff(features_tfidf.indptr)
+        nnz_lexico_por_linha = np.bincount(linhas_lexico, minlength=n_linhas)
+        inicio_lexico_por_linha = np.concatenate(([0], np.cumsum(nnz_lexico_por_linha)))
+
+        indptr = features_tfidf.indptr.astype(np.int64) + inicio_lexico_por_linha
+        dados = np.empty(indptr[-1], dtype=np.float64)
+        indices = np.empty(indptr[-1], dtype=np.int32)
+
+        linhas_tfidf = np.repeat(np.arange(n_linhas), nnz_tfidf_por_linha)
+        posicoes_tfidf = np.arange(features_tfidf.nnz) + inicio_lexico_por_linha[:-1][linhas_tfidf]
+        dados[posicoes_tfidf] = features_tfidf.data
+        indices[posicoes_tfidf] = features_tfidf.indices
+
+        posicao_na_linha = np.arange(len(linhas_lexico)) - inicio_lexico_por_linha[:-1][linhas_lexico]
+        posicoes_lexico = indptr[:-1][linhas_lexico] + nnz_tfidf_por_linha[linhas_lexico] + posicao_na_linha
+        dados[posicoes_lexico] = features_lexico[linhas_lexico, colunas_lexico]
+        indices[posicoes_lexico] = n_colunas_tfidf + colunas_lexico
+
+        return csr_matrix((dados, indices, indptr), shape=(n_linhas, n_colunas_tfidf + self.quantidade_lexicos))
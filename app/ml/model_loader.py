@@ -1,25 +1,259 @@
+import hashlib
 import joblib
 import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
 from app.core.config import settings
+from app.core.metrics import duracao_carregamento_modelos, registro_metricas
+from app.ml.compact_artifacts import caminho_artefato_compacto
 
 MODELS_PATH = settings.MODELS_DIR
 
-ml_models = {}
+ARTEFATOS_MODELOS = {
+    'vetorizador_tipo': settings.VETORIZADOR_TIPO_FILENAME,
+    'modelo_tipo': settings.MODELO_TIPO_FILENAME,
+    'vetorizador_severidade': settings.VETORIZADOR_SEVERIDADE_FILENAME,
+    'modelo_severidade': settings.MODELO_SEVERIDADE_FILENAME,
+}
 
-def load_all_models():
-    """Carrega todos os modelos e vetorizadores na inicialização."""
-    if not ml_models: # Carregar apenas uma vez
-        print(f"Carregando modelos e vetorizadores da pasta: {MODELS_PATH}...")
+_callbacks_troca_modelos: List[Callable[[Optional[str], str], None]] = []
+
+def registrar_callback_troca_modelos(callback: Callable[[Optional[str], str], None]):
+    """Registra uma função chamada com (versao_anterior, versao_nova) sempre que a versão ativa dos modelos muda."""
+    _callbacks_troca_modelos.append(callback)
+
+def resolver_caminhos_artefatos(pasta_modelos: str = MODELS_PATH) -> Dict[str, str]:
+    """Caminho de cada artefato, preferindo o formato compacto quando habilitado e disponível."""
+    caminhos = {}
+    for chave, nome_arquivo in ARTEFATOS_MODELOS.items():
+        caminho = os.path.join(pasta_modelos, nome_arquivo)
+        caminho_compacto = caminho_artefato_compacto(caminho)
+        if settings.MODELS_USE_COMPACT and os.path.exists(caminho_compacto):
+            caminho = caminho_compacto
+        caminhos[chave] = caminho
+    return caminhos
+
+def calcular_versao_artefatos(caminhos_artefatos: Dict[str, str]) -> str:
+    """Identifica o conjunto de artefatos pelo hash do conteúdo dos arquivos."""
+    hash_artefatos = hashlib.sha256()
+    for caminho in caminhos_artefatos.values():
+        hash_artefatos.update(os.path.basename(caminho).encode('utf-8'))
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+                hash_artefatos.update(bloco)
+    return hash_artefatos.hexdigest()[:12]
+
+def _rss_atual_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/statm') as statm:
+            paginas_residentes = int(statm.read().split()[1])
+        return paginas_residentes * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def carregar_artefato(caminho: str) -> tuple:
+    """Carrega um artefato com joblib (mapeando os arrays numpy em memória, se configurado) e mede tempo e RSS."""
+    rss_antes = _rss_atual_mb()
+    inicio = time.perf_counter()
+    artefato = joblib.load(caminho, mmap_mode=settings.MODELS_MMAP_MODE or None)
+    estatisticas = {
+        'arquivo': os.path.basename(caminho),
+        'segundos': time.perf_counter() - inicio,
+        'rssMb': _rss_atual_mb(),
+    }
+    estatisticas['deltaRssMb'] = (estatisticas['rssMb'] - rss_antes) if rss_antes is not None and estatisticas['rssMb'] is not None else None
+    return artefato, estatisticas
+
+class VersaoModelos:
+    """
+    Conjunto imutável de artefatos carregados de uma pasta. `derivados` guarda objetos
+    construídos a partir dos artefatos (ex.: motor de features), preenchidos no aquecimento.
+    """
+
+    def __init__(self, versao: str, origem: str, modelos: Dict[str, object], estatisticas_carregamento: Dict[str, dict]):
+        self.versao = versao
+        self.origem = origem
+        self.modelos = modelos
+        self.estatisticas_carregamento = estatisticas_carregamento
+        self.carregada_em = datetime.now(timezone.utc).isoformat()
+        self.derivados: Dict[str, object] = {}
+
+    def resumo(self) -> dict:
+        return {
+            "version": self.versao,
+            "source": self.origem,
+            "loadedAt": self.carregada_em,
+            "loadSeconds": round(sum(estatisticas['segundos'] for estatisticas in self.estatisticas_carregamento.values()), 4),
+        }
+
+
+class RegistroModelos:
+    """
+    Registro versionado dos modelos em `settings.MODELS_DIR`. A raiz da pasta e cada
+    subpasta que contenha os quatro artefatos são fontes de versões.
+
+    O caminho de predição lê apenas `registro.atual` (uma leitura de atributo, atômica no
+    CPython) e usa essa referência do início ao fim da requisição. Carregar, aquecer e trocar
+    a versão ativa acontece fora do caminho quente; o lock serializa somente recargas e rollbacks.
+    """
+
+    ORIGEM_RAIZ = "."
+
+    def __init__(self, pasta_modelos: str, max_historico: int):
+        self.pasta_modelos = pasta_modelos
+        self.max_historico = max_historico
+        self._atual: Optional[VersaoModelos] = None
+        self._historico: List[VersaoModelos] = []
+        self._lock_troca = threading.Lock()
+        self._aquecimento: Optional[Callable[[VersaoModelos], None]] = None
+        self._recarga_em_andamento: Optional[threading.Thread] = None
+        self.ultimo_erro: Optional[str] = None
+
+    @property
+    def atual(self) -> Optional[VersaoModelos]:
+        return self._atual
+
+    def definir_aquecimento(self, funcao_aquecimento: Callable[[VersaoModelos], None]):
+        """Função executada sobre uma versão recém-carregada antes de ela se tornar ativa."""
+        self._aquecimento = funcao_aquecimento
+
+    def resolver_pasta_origem(self, origem: str) -> str:
+        if origem == self.ORIGEM_RAIZ:
+            return self.pasta_modelos
+        if not origem or origem != os.path.basename(origem) or origem in ("..", "."):
+            raise ValueError(f"Origem de modelos inválida: '{origem}'. Informe o nome de uma subpasta de MODELS_DIR.")
+        pasta = os.path.join(self.pasta_modelos, origem)
+        if not os.path.isdir(pasta):
+            raise ValueError(f"Pasta de modelos '{origem}' não encontrada em {self.pasta_modelos}.")
+        return pasta
+
+    def listar_origens_disponiveis(self) -> List[str]:
+        origens = []
+        candidatas = [self.ORIGEM_RAIZ] + sorted(
+            nome for nome in os.listdir(self.pasta_modelos) if os.path.isdir(os.path.join(self.pasta_modelos, nome))
+        )
+        for origem in candidatas:
+            pasta = self.pasta_modelos if origem == self.ORIGEM_RAIZ else os.path.join(self.pasta_modelos, origem)
+            if all(os.path.exists(os.path.join(pasta, nome_arquivo)) for nome_arquivo in ARTEFATOS_MODELOS.values()):
+                origens.append(origem)
+        return origens
+
+    def carregar_versao(self, origem: str = ORIGEM_RAIZ) -> VersaoModelos:
+        caminhos_artefatos = resolver_caminhos_artefatos(self.resolver_pasta_origem(origem))
+        return self._carregar_artefatos(origem, caminhos_artefatos, calcular_versao_artefatos(caminhos_artefatos))
+
+    def _carregar_artefatos(self, origem: str, caminhos_artefatos: Dict[str, str], versao: str) -> VersaoModelos:
+        modelos = {}
+        estatisticas_carregamento = {}
+        for chave, caminho in caminhos_artefatos.items():
+            modelos[chave], estatisticas_carregamento[chave] = carregar_artefato(caminho)
+            estatisticas = estatisticas_carregamento[chave]
+            duracao_carregamento_modelos.observar(estatisticas['segundos'], chave)
+            rss = f"{estatisticas['rssMb']:.1f} MB (+{estatisticas['deltaRssMb']:.1f} MB)" if estatisticas['rssMb'] is not None else "indisponível"
+            print(f"  {estatisticas['arquivo']}: {estatisticas['segundos'] * 1000:.1f} ms, RSS {rss}")
+        return VersaoModelos(versao, origem, modelos, estatisticas_carregamento)
+
+    def recarregar(self, origem: str = ORIGEM_RAIZ, forcar: bool = False) -> VersaoModelos:
+        """
+        Carrega, aquece e ativa a versão da `origem`. Se o hash dos arquivos for o da versão ativa
+        (e sem `forcar`), retorna antes de carregar os artefatos.
+        """
+        with self._lock_troca:
+            caminhos_artefatos = resolver_caminhos_artefatos(self.resolver_pasta_origem(origem))
+            versao = calcular_versao_artefatos(caminhos_artefatos)
+            atual = self._atual
+            if atual is not None and atual.versao == versao and not forcar:
+                print(f"Artefatos inalterados (versão {versao}). Recarga ignorada.")
+                return atual
+            print(f"Carregando modelos e vetorizadores de '{origem}' em {self.pasta_modelos}...")
+            nova_versao = self._carregar_artefatos(origem, caminhos_artefatos, versao)
+            if self._aquecimento is not None:
+                self._aquecimento(nova_versao)
+            self._ativar(nova_versao, guardar_atual_no_historico=True)
+            print(f"Modelos e vetorizadores carregados com sucesso (versão {nova_versao.versao}).")
+            return nova_versao
+
+    def recarregar_em_segundo_plano(self, origem: str = ORIGEM_RAIZ, forcar: bool = False) -> bool:
+        """Dispara `recarregar` em uma thread. Retorna False se já houver uma recarga em andamento."""
+        self.resolver_pasta_origem(origem)
+        if self.recarga_em_andamento:
+            return False
+
+        def executar_recarga():
+            try:
+                self.recarregar(origem, forcar)
+                self.ultimo_erro = None
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                print(f"Erro CRÍTICO ao recarregar modelos de '{origem}': {e}")
+
+        self._recarga_em_andamento = threading.Thread(target=executar_recarga, name="recarga-modelos", daemon=True)
+        self._recarga_em_andamento.start()
+        return True
+
+    @property
+    def recarga_em_andamento(self) -> bool:
+        return self._recarga_em_andamento is not None and self._recarga_em_andamento.is_alive()
+
+    def reverter(self) -> VersaoModelos:
+        """Reativa a versão anterior (mantida carregada no histórico)."""
+        with self._lock_troca:
+            if not self._historico:
+                raise LookupError("Não há versão anterior para rollback.")
+            versao_anterior = self._historico.pop()
+            self._ativar(versao_anterior, guardar_atual_no_historico=False)
+            print(f"Rollback para a versão {versao_anterior.versao} ('{versao_anterior.origem}').")
+            return versao_anterior
+
+    def _ativar(self, nova_versao: VersaoModelos, guardar_atual_no_historico: bool):
+        anterior = self._atual
+        self._atual = nova_versao
+        if anterior is not None and guardar_atual_no_historico:
+            self._historico.append(anterior)
+            while len(self._historico) > self.max_historico:
+                self._historico.pop(0)
+        versao_anterior = anterior.versao if anterior is not None else None
+        if versao_anterior != nova_versao.versao:
+            for callback in _callbacks_troca_modelos:
+                callback(versao_anterior, nova_versao.versao)
+
+    def estado(self) -> dict:
+        return {
+            "active": self._atual.resumo() if self._atual is not None else None,
+            "history": [versao.resumo() for versao in reversed(self._historico)],
+            "availableSources": self.listar_origens_disponiveis(),
+            "reloadInProgress": self.recarga_em_andamento,
+            "lastReloadError": self.ultimo_erro,
+        }
+
+
+registro_modelos = RegistroModelos(MODELS_PATH, settings.MODELS_REGISTRY_HISTORY)
+
+registro_metricas.coletada(
+    "redalert_model_info",
+    "Versão dos modelos ativa (valor sempre 1).",
+    "gauge",
+    lambda: [({"version": registro_modelos.atual.versao, "source": registro_modelos.atual.origem}, 1)] if registro_modelos.atual is not None else []
+)
+
+def obter_versao_modelos() -> Optional[str]:
+    atual = registro_modelos.atual
+    return atual.versao if atual is not None else None
+
+def load_all_models(forcar_recarga: bool = False) -> Dict[str, object]:
+    """
+    Carrega todos os modelos e vetorizadores da raiz de MODELS_DIR, se ainda não houver versão
+    ativa (ou se a recarga for forçada). Chamada no startup da aplicação (lifespan), não na
+    importação do módulo. Retorna os artefatos da versão ativa.
+    """
+    if registro_modelos.atual is None or forcar_recarga:
         try:
-            ml_models['vetorizador_tipo'] = joblib.load(os.path.join(MODELS_PATH, settings.VETORIZADOR_TIPO_FILENAME))
-            ml_models['modelo_tipo'] = joblib.load(os.path.join(MODELS_PATH, settings.MODELO_TIPO_FILENAME))
-            ml_models['vetorizador_severidade'] = joblib.load(os.path.join(MODELS_PATH, settings.VETORIZADOR_SEVERIDADE_FILENAME))
-            ml_models['modelo_severidade'] = joblib.load(os.path.join(MODELS_PATH, settings.MODELO_SEVERIDADE_FILENAME))
-            print("Modelos e vetorizadores carregados com sucesso.")
+            registro_modelos.recarregar()
         except FileNotFoundError as e:
             print(f"Erro CRÍTICO: Arquivo de modelo não encontrado. Verifique os caminhos e nomes de arquivo nas configurações e na pasta '{MODELS_PATH}'. Detalhes: {e}")
         except Exception as e:
             print(f"Erro CRÍTICO ao carregar modelos: {e}")
-    return ml_models
-
-load_all_models()
+    atual = registro_modelos.atual
+    return atual.modelos if atual is not None else {}
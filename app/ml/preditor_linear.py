@@ -0,0 +1,67 @@
+from typing import Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+
+try:
+    from sklearn.linear_model._base import LinearClassifierMixin
+except ImportError:  # módulo privado do scikit-learn: se mudar de lugar, as predições usam model.predict
+    LinearClassifierMixin = None
+
+
+class PreditorLinear:
+    """
+    Predição de um classificador linear (LinearSVC, LogisticRegression...) pela função de decisão
+    calculada diretamente, `X @ coef_.T + intercept_`, seguida do argmax (ou do sinal, no caso
+    binário), como em `LinearClassifierMixin.predict`, mas sem a validação de entrada do
+    scikit-learn a cada chamada.
+
+    As últimas colunas do modelo podem vir como uma matriz densa à parte (`extras`, ex.: as
+    contagens de léxico da severidade), sem montar a CSR combinada: cada valor não nulo é somado
+    na mesma ordem em que o produto esparso da CSR combinada o somaria, então os scores são
+    idênticos aos de `decision_function`.
+    """
+
+    def __init__(self, modelo, n_colunas_esparsas: int):
+        pesos = np.ascontiguousarray(np.asarray(modelo.coef_, dtype=np.float64).T)
+        self.pesos_esparsos = pesos[:n_colunas_esparsas]
+        self.pesos_extras = pesos[n_colunas_esparsas:]
+        self.intercepto = np.asarray(modelo.intercept_, dtype=np.float64)
+        self.classes = np.asarray(modelo.classes_)
+
+    @classmethod
+    def para_modelo(cls, modelo, n_colunas_esparsas: int, n_colunas_extras: int = 0) -> Optional["PreditorLinear"]:
+        """
+        O preditor do `modelo`, ou None se ele não usar a predição linear padrão do scikit-learn
+        ou não tiver `n_colunas_esparsas + n_colunas_extras` features. Também None se a versão
+        instalada do scikit-learn não expuser `LinearClassifierMixin` no módulo esperado.
+        """
+        if LinearClassifierMixin is None:
+            return None
+        tipo_modelo = type(modelo)
+        if not (
+            isinstance(modelo, LinearClassifierMixin)
+            and tipo_modelo.predict is LinearClassifierMixin.predict
+            and tipo_modelo.decision_function is LinearClassifierMixin.decision_function
+            and hasattr(modelo, 'coef_') and not issparse(modelo.coef_)
+            and modelo.coef_.shape[1] == n_colunas_esparsas + n_colunas_extras
+        ):
+            return None
+        return cls(modelo, n_colunas_esparsas)
+
+    def decisao(self, features: csr_matrix, extras: Optional[np.ndarray] = None) -> np.ndarray:
+        scores = np.asarray(features @ self.pesos_esparsos)
+        if extras is not None:
+            for coluna in range(extras.shape[1]):
+                linhas = np.flatnonzero(extras[:, coluna])
+                if linhas.size:
+                    scores[linhas] += extras[linhas, coluna, None] * self.pesos_extras[coluna]
+        return scores + self.intercepto
+
+    def prever(self, features: csr_matrix, extras: Optional[np.ndarray] = None) -> np.ndarray:
+        scores = self.decisao(features, extras)
+        if scores.shape[1] == 1:
+            indices = (scores[:, 0] > 0).astype(int)
+        else:
+            indices = scores.argmax(axis=1)
+        return self.classes[indices]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, List, Optional
 
 class RelatoInputSchema(BaseModel):
     alertId: int
@@ -9,6 +9,7 @@ class PredicaoOutputSchema(BaseModel):
     alertId: int
     classifiedSeverity: str
     classifiedType: str
+    modelVersion: Optional[str] = None
 
 class AlertItemForClustering(BaseModel):
     alertId: int
@@ -17,6 +18,7 @@ class AlertItemForClustering(BaseModel):
     severityIA: str
     typeIA: str
     timestampReporte: Optional[str] = None 
+    regionKey: Optional[str] = Field(None, description="Região (ex.: cidade ou cliente) do alerta. Alertas de regiões diferentes nunca formam o mesmo cluster em /ia/cluster_alerts.")
 
 class ClusteringInput(BaseModel):
     alertsToCluster: List[AlertItemForClustering] = Field(..., min_items=1)
@@ -41,6 +43,59 @@ class ClusteringResponse(BaseModel):
     clusteringResults: List[ClusteringResultItem]
     hotspotSummaries: List[HotspotSummaryOutput]
 
+class IncrementalClusteringInput(BaseModel):
+    alertsToAdd: List[AlertItemForClustering] = Field(default_factory=list, description="Alertas novos ou atualizados (um 'alertId' já ativo é substituído).")
+    alertIdsToRemove: List[int] = Field(default_factory=list, description="Alertas encerrados antes da expiração.")
+    referenceTimestamp: Optional[str] = Field(None, description="Instante (ISO 8601) usado para expirar alertas por 'timestampReporte'. Padrão: agora.")
+
+class IncrementalHotspotOutput(HotspotSummaryOutput):
+    hotspotId: str
+
+class IncrementalClusteringDeltaResponse(BaseModel):
+    stateVersion: int
+    activeAlerts: int
+    changedLabels: List[ClusteringResultItem]
+    removedAlertIds: List[int]
+    updatedHotspots: List[IncrementalHotspotOutput]
+    removedHotspotIds: List[str]
+
+class IncrementalClusteringSnapshotResponse(BaseModel):
+    stateVersion: int
+    activeAlerts: int
+    clusteringResults: List[ClusteringResultItem]
+    hotspots: List[IncrementalHotspotOutput]
+
 class ErrorDetail(BaseModel):
     error: str
-    message: str
\ No newline at end of file
+    message: str
+
+class RelatosLoteInputSchema(BaseModel):
+    alertsToClassify: List[Any] = Field(..., min_length=1, description="Lista de objetos com 'alertId' e 'text'. Itens inválidos são reportados individualmente.")
+
+class PredicaoLoteItemSchema(BaseModel):
+    index: int
+    alertId: Optional[int] = None
+    classifiedSeverity: Optional[str] = None
+    classifiedType: Optional[str] = None
+    modelVersion: Optional[str] = None
+    error: Optional[ErrorDetail] = None
+
+class PredicoesLoteOutputSchema(BaseModel):
+    results: List[PredicaoLoteItemSchema]
+
+class RecargaModelosInputSchema(BaseModel):
+    source: str = Field(".", description="Subpasta de MODELS_DIR com os artefatos da nova versão ('.' para a raiz).")
+    force: bool = Field(False, description="Ativa a versão mesmo que os artefatos sejam idênticos aos da versão ativa.")
+
+class VersaoModelosSchema(BaseModel):
+    version: str
+    source: str
+    loadedAt: str
+    loadSeconds: float
+
+class EstadoModelosSchema(BaseModel):
+    active: Optional[VersaoModelosSchema] = None
+    history: List[VersaoModelosSchema]
+    availableSources: List[str]
+    reloadInProgress: bool
+    lastReloadError: Optional[str] = None
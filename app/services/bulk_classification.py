@@ -0,0 +1,310 @@
+"""
+Classificação em massa de alertas em NDJSON (um objeto JSON por linha), para reclassificar o
+histórico após um retreino.
+
+A entrada é lida incrementalmente e processada em blocos de tamanho fixo pelo caminho
+vetorizado de `obter_predicoes_classificacao_lote`; a saída é NDJSON na mesma ordem da
+entrada, com um registro por linha (`result` ou `error`) e registros `progress` ao fim de cada
+bloco. A memória fica limitada a alguns blocos em processamento.
+
+Uso pela linha de comando (os blocos são distribuídos entre processos, um por núcleo):
+    python -m app.services.bulk_classification historico.ndjson -o reclassificado.ndjson
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executor import ServicoSobrecarregadoError
+from app.ml.model_loader import VersaoModelos, load_all_models
+from app.services.classification_service import _obter_versao_ativa, obter_predicoes_classificacao_lote
+from app.utils.text_processor import inicializar_recursos_texto
+
+# Linhas acima do limite de tamanho chegam como None e viram registros de erro.
+LinhaNdjson = Optional[bytes]
+
+
+def _serializar(registro: dict) -> str:
+    return json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+def registro_erro(numero_linha: Optional[int], mensagem: str, campo_id: str = "alertId", id_alerta: Any = None, erro: str = "Bad Request") -> dict:
+    return {"type": "error", "line": numero_linha, campo_id: id_alerta, "error": {"error": erro, "message": mensagem}}
+
+
+def registro_progresso(contadores: dict, tipo: str = "progress") -> dict:
+    return {"type": tipo, **contadores}
+
+
+def novos_contadores() -> dict:
+    return {"linesRead": 0, "classified": 0, "errors": 0}
+
+
+def somar_contadores(total: dict, parcial: dict):
+    for chave, valor in parcial.items():
+        total[chave] += valor
+
+
+def _interpretar_linha(linha: LinhaNdjson, campo_id: str, campo_texto: str) -> Tuple[Any, Optional[str], Optional[str]]:
+    """Retorna (id, texto, mensagem de erro)."""
+    if linha is None:
+        return None, None, f"Linha excede o limite de {settings.CLASSIFY_STREAM_MAX_LINE_BYTES} bytes."
+    try:
+        objeto = json.loads(linha)
+    except (ValueError, UnicodeDecodeError):
+        return None, None, "Linha não é um JSON válido."
+    if not isinstance(objeto, dict):
+        return None, None, "Cada linha deve ser um objeto JSON."
+    id_alerta = objeto.get(campo_id)
+    if isinstance(id_alerta, (dict, list)):
+        id_alerta = None
+    texto = objeto.get(campo_texto)
+    if not isinstance(texto, str) or not texto:
+        return id_alerta, None, f"O campo '{campo_texto}' é obrigatório e deve ser um texto não vazio."
+    return id_alerta, texto, None
+
+
+def processar_bloco_ndjson(
+    linhas: List[LinhaNdjson],
+    primeira_linha: int,
+    campo_id: str = "alertId",
+    campo_texto: str = "text",
+    versao_modelos: Optional[VersaoModelos] = None
+) -> Tuple[List[str], dict]:
+    """
+    Classifica um bloco de linhas NDJSON (numeradas a partir de `primeira_linha`) e retorna as
+    linhas de saída já serializadas, na ordem da entrada, e os contadores do bloco. Linhas em
+    branco são ignoradas. O cache de predições não é usado: numa reclassificação em massa quase
+    todos os textos são inéditos e só ocupariam o cache do serviço.
+    """
+    contadores = novos_contadores()
+    saida: List[Optional[str]] = []
+    validos: List[Tuple[int, int, Any, str]] = []
+
+    for numero_linha, linha in enumerate(linhas, start=primeira_linha):
+        if linha is not None and not linha.strip():
+            continue
+        contadores["linesRead"] += 1
+        id_alerta, texto, mensagem_erro = _interpretar_linha(linha, campo_id, campo_texto)
+        if mensagem_erro is not None:
+            contadores["errors"] += 1
+            saida.append(_serializar(registro_erro(numero_linha, mensagem_erro, campo_id, id_alerta)))
+        else:
+            validos.append((len(saida), numero_linha, id_alerta, texto))
+            saida.append(None)
+
+    if validos:
+        predicoes = obter_predicoes_classificacao_lote([texto for _, _, _, texto in validos], versao_modelos, usar_cache=False)
+        for (posicao, numero_linha, id_alerta, _), predicao in zip(validos, predicoes):
+            saida[posicao] = _serializar({
+                "type": "result",
+                "line": numero_linha,
+                campo_id: id_alerta,
+                "classifiedType": predicao["classifiedType"],
+                "classifiedSeverity": predicao["classifiedSeverity"],
+                "modelVersion": predicao["modelVersion"],
+            })
+        contadores["classified"] += len(validos)
+
+    return saida, contadores
+
+
+def _excede_limite(linha: bytes) -> bool:
+    return len(linha) > settings.CLASSIFY_STREAM_MAX_LINE_BYTES
+
+
+def ler_linhas_arquivo(arquivo) -> Iterator[LinhaNdjson]:
+    """Linhas de um arquivo binário, sem o terminador; linhas acima do limite viram None."""
+    for linha in arquivo:
+        linha = linha.rstrip(b"\r\n")
+        yield None if _excede_limite(linha) else linha
+
+
+async def ler_linhas_fluxo(fluxo: AsyncIterator[bytes]) -> AsyncIterator[LinhaNdjson]:
+    """
+    Separa em linhas um corpo recebido em pedaços. Uma linha maior que o limite é descartada
+    enquanto chega (sem acumular em memória) e produzida como None.
+    """
+    pendente = bytearray()
+    descartando = False
+    async for pedaco in fluxo:
+        inicio = 0
+        while True:
+            fim = pedaco.find(b"\n", inicio)
+            if fim == -1:
+                if not descartando:
+                    pendente += pedaco[inicio:]
+                    if _excede_limite(pendente):
+                        descartando = True
+                        pendente.clear()
+                break
+            if descartando:
+                descartando = False
+                yield None
+            else:
+                pendente += pedaco[inicio:fim]
+                yield None if _excede_limite(pendente) else bytes(pendente.rstrip(b"\r"))
+                pendente.clear()
+            inicio = fim + 1
+    if descartando:
+        yield None
+    elif pendente:
+        yield bytes(pendente.rstrip(b"\r"))
+
+
+async def classificar_fluxo_ndjson(
+    linhas: AsyncIterator[LinhaNdjson],
+    executar_bloco: Callable[..., Awaitable[Tuple[List[str], dict]]],
+    tamanho_bloco: int,
+    max_blocos_em_andamento: int,
+    campo_id: str = "alertId",
+    campo_texto: str = "text"
+) -> AsyncIterator[str]:
+    """
+    Agrupa as linhas em blocos, processa até `max_blocos_em_andamento` blocos ao mesmo tempo
+    com `executar_bloco` e produz a saída NDJSON na ordem da entrada, seguida de um registro
+    `progress` por bloco e de um `summary` no final. Todos os blocos usam a versão dos modelos
+    ativa no início do fluxo.
+    """
+    versao_modelos = _obter_versao_ativa()
+    inicio = time.perf_counter()
+    totais = novos_contadores()
+    em_andamento: deque = deque()
+
+    async def emitir_bloco():
+        saida, contadores = await em_andamento.popleft()
+        somar_contadores(totais, contadores)
+        return "".join(saida) + _serializar(registro_progresso(totais))
+
+    try:
+        bloco: List[LinhaNdjson] = []
+        primeira_linha = 1
+        async for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= tamanho_bloco:
+                em_andamento.append(asyncio.ensure_future(executar_bloco(bloco, primeira_linha, campo_id, campo_texto, versao_modelos)))
+                primeira_linha += len(bloco)
+                bloco = []
+                while len(em_andamento) >= max_blocos_em_andamento:
+                    yield await emitir_bloco()
+        if bloco:
+            em_andamento.append(asyncio.ensure_future(executar_bloco(bloco, primeira_linha, campo_id, campo_texto, versao_modelos)))
+        while em_andamento:
+            yield await emitir_bloco()
+        yield _serializar(registro_progresso(
+            {**totais, "modelVersion": versao_modelos.versao, "seconds": round(time.perf_counter() - inicio, 3)}, tipo="summary"
+        ))
+    except Exception as e:
+        # O status HTTP já foi enviado: a falha é informada como último registro do fluxo.
+        print(f"Erro durante a classificação em fluxo: {e}")
+        yield _serializar(registro_erro(None, "Falha ao processar o fluxo; linhas seguintes não foram classificadas.", campo_id, erro="Internal Server Error"))
+    finally:
+        for tarefa in em_andamento:
+            tarefa.cancel()
+
+
+async def executar_com_retentativas(executar: Callable[..., Awaitable], *args, tentativas: int = 50, espera_s: float = 0.05):
+    """Numa classificação em massa, pool saturado significa esperar a vez, não rejeitar o fluxo."""
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return await executar(*args)
+        except ServicoSobrecarregadoError:
+            if tentativa == tentativas:
+                raise
+            await asyncio.sleep(espera_s * min(tentativa, 10))
+
+
+# --- Linha de comando ------------------------------------------------------------------------
+
+def _inicializar_processo_cli():
+    load_all_models()
+    inicializar_recursos_texto()
+
+
+def _processar_bloco_cli(linhas: List[LinhaNdjson], primeira_linha: int, campo_id: str, campo_texto: str) -> Tuple[List[str], dict]:
+    return processar_bloco_ndjson(linhas, primeira_linha, campo_id, campo_texto)
+
+
+def _blocos(linhas: Iterable[LinhaNdjson], tamanho_bloco: int) -> Iterator[Tuple[List[LinhaNdjson], int]]:
+    bloco, primeira_linha = [], 1
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= tamanho_bloco:
+            yield bloco, primeira_linha
+            primeira_linha += len(bloco)
+            bloco = []
+    if bloco:
+        yield bloco, primeira_linha
+
+
+def main(argumentos: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Classifica em massa um arquivo NDJSON de alertas.")
+    parser.add_argument("entrada", help="Arquivo NDJSON de entrada ('-' para stdin).")
+    parser.add_argument("-o", "--saida", default="-", help="Arquivo NDJSON de saída ('-' para stdout).")
+    parser.add_argument("--bloco", type=int, default=settings.CLASSIFY_STREAM_CHUNK_SIZE, help="Linhas por bloco.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos de classificação (1 = no próprio processo).")
+    parser.add_argument("--campo-id", default="alertId")
+    parser.add_argument("--campo-texto", default="text")
+    parser.add_argument("--metodo-inicio", default="spawn", choices=multiprocessing.get_all_start_methods())
+    args = parser.parse_args(argumentos)
+
+    entrada = sys.stdin.buffer if args.entrada == "-" else open(args.entrada, "rb")
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8")
+    blocos = _blocos(ler_linhas_arquivo(entrada), max(1, args.bloco))
+    totais = novos_contadores()
+    inicio = time.perf_counter()
+
+    def registrar(resultado: Tuple[List[str], dict]):
+        linhas_saida, contadores = resultado
+        saida.writelines(linhas_saida)
+        somar_contadores(totais, contadores)
+        decorrido = time.perf_counter() - inicio
+        print(
+            f"\r{totais['linesRead']} linhas, {totais['classified']} classificadas, {totais['errors']} erros "
+            f"({totais['linesRead'] / decorrido:.0f} linhas/s)", end="", file=sys.stderr, flush=True
+        )
+
+    try:
+        if args.workers <= 1:
+            _inicializar_processo_cli()
+            for bloco, primeira_linha in blocos:
+                registrar(_processar_bloco_cli(bloco, primeira_linha, args.campo_id, args.campo_texto))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=args.workers,
+                mp_context=multiprocessing.get_context(args.metodo_inicio),
+                initializer=_inicializar_processo_cli
+            ) as executor:
+                # No máximo 2 blocos por processo em andamento: a leitura acompanha a escrita.
+                em_andamento: deque = deque()
+                for bloco, primeira_linha in blocos:
+                    em_andamento.append(executor.submit(_processar_bloco_cli, bloco, primeira_linha, args.campo_id, args.campo_texto))
+                    if len(em_andamento) >= 2 * args.workers:
+                        registrar(em_andamento.popleft().result())
+                while em_andamento:
+                    registrar(em_andamento.popleft().result())
+    finally:
+        if entrada is not sys.stdin.buffer:
+            entrada.close()
+        if saida is not sys.stdout:
+            saida.close()
+        else:
+            saida.flush()
+
+    print(file=sys.stderr)
+    print(json.dumps(registro_progresso(
+        {**totais, "seconds": round(time.perf_counter() - inicio, 3)}, tipo="summary"
+    ), ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    # Importa pelo nome do pacote para que os processos filhos encontrem as funções dos blocos.
+    from app.services.bulk_classification import main as main_pacote
+    main_pacote()
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import registro_metricas
+from app.services.clustering_service import RespostaClustering, montar_resposta_clustering, serializar_resultados_clustering
+
+
+class EntradaCacheClustering(NamedTuple):
+    # Hash de cada alerta, na ordem da requisição que gerou a resposta.
+    hashes_alertas: np.ndarray
+    resposta: RespostaClustering
+
+
+class CacheClustering:
+    """
+    Cache LRU com TTL das respostas de `/ia/cluster_alerts`, indexado pela impressão digital do
+    conjunto de alertas (`impressao_digital_alertas`). Como a impressão não depende da ordem, um
+    mesmo conjunto em outra ordem também é respondido pelo cache (ver `responder_do_cache`).
+    """
+
+    def __init__(self, max_itens: int, ttl_segundos: float, relogio: Callable[[], float] = time.monotonic):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._relogio = relogio
+        self._entradas: "OrderedDict[str, Tuple[float, EntradaCacheClustering]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._contadores = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def obter(self, impressao: str) -> Optional[EntradaCacheClustering]:
+        agora = self._relogio()
+        with self._lock:
+            entrada = self._entradas.get(impressao)
+            if entrada is not None:
+                expira_em, valor = entrada
+                if expira_em > agora:
+                    self._entradas.move_to_end(impressao)
+                    self._contadores["hits"] += 1
+                    return valor
+                del self._entradas[impressao]
+                self._contadores["expirations"] += 1
+            self._contadores["misses"] += 1
+        return None
+
+    def gravar(self, impressao: str, valor: EntradaCacheClustering):
+        with self._lock:
+            self._entradas[impressao] = (self._relogio() + self.ttl_segundos, valor)
+            self._entradas.move_to_end(impressao)
+            while len(self._entradas) > self.max_itens:
+                self._entradas.popitem(last=False)
+                self._contadores["evictions"] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            estatisticas = dict(self._contadores)
+            estatisticas["tamanho"] = len(self._entradas)
+        consultas = estatisticas["hits"] + estatisticas["misses"]
+        estatisticas["hitRate"] = estatisticas["hits"] / consultas if consultas else 0.0
+        return estatisticas
+
+
+def responder_do_cache(entrada: EntradaCacheClustering, alert_ids, hashes_alertas: np.ndarray) -> bytes:
+    """
+    Corpo da resposta para uma requisição com o mesmo conjunto de alertas da entrada. Na mesma
+    ordem, são os bytes guardados; em outra ordem, os rótulos são reordenados pelos hashes dos
+    alertas (alertas idênticos são intercambiáveis) e só `clusteringResults` é serializado de novo.
+    """
+    if np.array_equal(hashes_alertas, entrada.hashes_alertas):
+        return entrada.resposta.corpo
+    rotulos = np.empty_like(entrada.resposta.rotulos)
+    rotulos[np.argsort(hashes_alertas, kind='stable')] = entrada.resposta.rotulos[np.argsort(entrada.hashes_alertas, kind='stable')]
+    return montar_resposta_clustering(serializar_resultados_clustering(alert_ids, rotulos), entrada.resposta.json_hotspots)
+
+
+def gerar_etag(impressao: str) -> str:
+    # Fraca: o mesmo conjunto em outra ordem tem a mesma ETag, com uma resposta equivalente.
+    return f'W/"{impressao}"'
+
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca do cabeçalho If-None-Match com a ETag (aceita listas e "*")."""
+    if not if_none_match:
+        return False
+    remover_prefixo_fraco = lambda valor: valor[2:] if valor.startswith("W/") else valor
+    candidatas = [candidata.strip() for candidata in if_none_match.split(",")]
+    return "*" in candidatas or remover_prefixo_fraco(etag) in {remover_prefixo_fraco(candidata) for candidata in candidatas}
+
+
+cache_clustering = CacheClustering(
+    max_itens=settings.CLUSTERING_CACHE_MAX_ITEMS,
+    ttl_segundos=settings.CLUSTERING_CACHE_TTL_SECONDS
+)
+
+registro_metricas.coletada(
+    "redalert_clustering_cache_hits_total",
+    "Requisições de /ia/cluster_alerts respondidas pelo cache de respostas.",
+    "counter",
+    lambda: [({}, cache_clustering.estatisticas()["hits"])]
+)
+registro_metricas.coletada(
+    "redalert_clustering_cache_misses_total",
+    "Consultas ao cache de respostas de /ia/cluster_alerts sem resultado.",
+    "counter",
+    lambda: [({}, cache_clustering.estatisticas()["misses"])]
+)
+registro_metricas.coletada(
+    "redalert_clustering_cache_evictions_total",
+    "Respostas de /ia/cluster_alerts removidas do cache por falta de espaço.",
+    "counter",
+    lambda: [({}, cache_clustering.estatisticas()["evictions"])]
+)
+registro_metricas.coletada(
+    "redalert_clustering_cache_entries",
+    "Respostas de /ia/cluster_alerts no cache.",
+    "gauge",
+    lambda: [({}, cache_clustering.estatisticas()["tamanho"])]
+)
@@ -1,57 +1,197 @@
+from typing import List, Optional, Tuple
+
 import numpy as np
-from scipy.sparse import hstack, csr_matrix
+from scipy.sparse import csr_matrix, identity, vstack
 
-from app.utils.text_processor import preprocessar_texto, contar_palavras_lexico
+from app.utils.text_processor import preprocessar_texto, construir_indice_lexicos, inicializar_recursos_texto
 from app.ml.lexicons import LEXICOS_SEVERIDADE
-from app.ml.model_loader import ml_models
+from app.ml.model_loader import ARTEFATOS_MODELOS, VersaoModelos, registro_modelos
+from app.ml.feature_engine import MotorFeatures
+from app.ml.preditor_linear import PreditorLinear
+from app.core.config import settings
+from app.core.metrics import Cronometro, iniciar_cronometro, observar_tamanho_lote
+from app.services.prediction_cache import cache_predicoes, gerar_chave_cache
 
 ORDEM_LEXICOS_SEVERIDADE = ['critica', 'alta', 'media', 'baixa']
+INDICE_LEXICOS_SEVERIDADE = construir_indice_lexicos(LEXICOS_SEVERIDADE, ORDEM_LEXICOS_SEVERIDADE)
+
+def _obter_versao_ativa() -> VersaoModelos:
+    versao_modelos = registro_modelos.atual
+    if versao_modelos is None or any(versao_modelos.modelos.get(chave) is None for chave in ARTEFATOS_MODELOS):
+        raise RuntimeError("Modelos de classificação ou vetorizadores não foram carregados corretamente.")
+    return versao_modelos
 
 def obter_predicoes_classificacao(texto_original: str) -> dict:
     """
     Processa o texto de um alerta e retorna as classificações de tipo e severidade.
     """
-    if not ml_models.get('vetorizador_tipo') or \
-       not ml_models.get('modelo_tipo') or \
-       not ml_models.get('vetorizador_severidade') or \
-       not ml_models.get('modelo_severidade'):
-        raise RuntimeError("Modelos de classificação ou vetorizadores não foram carregados corretamente.")
+    return obter_predicoes_classificacao_lote([texto_original])[0]
+
+def obter_predicoes_classificacao_lote(
+    textos_originais: List[str],
+    versao_modelos: Optional[VersaoModelos] = None,
+    usar_cache: bool = True
+) -> List[dict]:
+    """
+    Processa um lote de textos de alerta e retorna as classificações de tipo e severidade
+    na mesma ordem da entrada. Cada vetorizador e cada modelo é executado uma única vez
+    sobre a matriz esparsa com todas as linhas do lote. Textos já classificados com a mesma
+    versão dos modelos são respondidos pelo cache de predições.
+
+    A versão ativa do registro é lida uma única vez, então todo o lote é servido pela mesma
+    versão mesmo que uma recarga troque os modelos no meio da requisição. `versao_modelos`
+    fixa a versão (ex.: a mesma em todos os blocos de um processamento em massa) e
+    `usar_cache=False` ignora o cache de predições.
+    """
+    if versao_modelos is None:
+        versao_modelos = _obter_versao_ativa()
 
-    texto_processado = preprocessar_texto(texto_original)
-
-    vetorizador_tipo = ml_models['vetorizador_tipo']
-    modelo_tipo = ml_models['modelo_tipo']
-    
-    features_tfidf_tipo = vetorizador_tipo.transform([texto_processado])
-    predicao_tipo_array = modelo_tipo.predict(features_tfidf_tipo)
-    tipo_predito = predicao_tipo_array[0]
-
-    vetorizador_severidade = ml_models['vetorizador_severidade']
-    modelo_severidade = ml_models['modelo_severidade']
-
-    features_tfidf_severidade = vetorizador_severidade.transform([texto_processado])
-    
-    features_lexico_severidade_lista = []
-    for nome_lex in ORDEM_LEXICOS_SEVERIDADE:
-        lista_palavras = LEXICOS_SEVERIDADE[nome_lex] 
-        features_lexico_severidade_lista.append(
-            contar_palavras_lexico(texto_processado, lista_palavras)
+    if not textos_originais:
+        return []
+
+    if not usar_cache or not settings.PREDICTION_CACHE_ENABLED:
+        return _classificar_textos(textos_originais, versao_modelos)
+
+    chaves = [gerar_chave_cache(texto, versao_modelos.versao) for texto in textos_originais]
+    resultados = [cache_predicoes.obter(chave) for chave in chaves]
+
+    textos_pendentes = {}
+    for chave, texto, resultado in zip(chaves, textos_originais, resultados):
+        if resultado is None:
+            textos_pendentes.setdefault(chave, texto)
+
+    if textos_pendentes:
+        predicoes_por_chave = dict(zip(textos_pendentes, _classificar_textos(list(textos_pendentes.values()), versao_modelos)))
+        for chave, predicao in predicoes_por_chave.items():
+            cache_predicoes.gravar(chave, predicao)
+        resultados = [
+            resultado if resultado is not None else dict(predicoes_por_chave[chave])
+            for chave, resultado in zip(chaves, resultados)
+        ]
+
+    return resultados
+
+def _obter_motor_features(versao_modelos: VersaoModelos) -> MotorFeatures:
+    """Motor de features da versão, normalmente criado no aquecimento da versão."""
+    motor = versao_modelos.derivados.get('motor_features')
+    if motor is None:
+        motor = MotorFeatures(
+            versao_modelos.modelos['vetorizador_tipo'],
+            versao_modelos.modelos['vetorizador_severidade'],
+            INDICE_LEXICOS_SEVERIDADE,
+            len(ORDEM_LEXICOS_SEVERIDADE)
         )
-    
-    features_lexico_severidade_array = np.array([features_lexico_severidade_lista]) 
-    
-    features_combinadas_severidade = hstack([
-        features_tfidf_severidade, 
-        csr_matrix(features_lexico_severidade_array)
-    ])
-    
-    predicao_severidade_array = modelo_severidade.predict(features_combinadas_severidade)
-    severidade_predita = predicao_severidade_array[0]
-    
-    return {
-        "alertId": None,
-        "classifiedType": tipo_predito,
-        "classifiedSeverity": severidade_predita
-    }
-
-print("a")
+        versao_modelos.derivados['motor_features'] = motor
+    return motor
+
+def _obter_preditores_lineares(versao_modelos: VersaoModelos) -> Tuple[Optional[PreditorLinear], Optional[PreditorLinear]]:
+    """
+    Preditores lineares (tipo, severidade) da versão, normalmente criados e conferidos no
+    aquecimento. Cada um é None se o modelo não for linear ou se o caminho rápido estiver desligado.
+    """
+    if 'preditores_lineares' not in versao_modelos.derivados:
+        preditores = (None, None)
+        if settings.LINEAR_FAST_PATH_ENABLED:
+            motor = _obter_motor_features(versao_modelos)
+            preditores = (
+                PreditorLinear.para_modelo(versao_modelos.modelos['modelo_tipo'], motor.n_features_tipo),
+                PreditorLinear.para_modelo(versao_modelos.modelos['modelo_severidade'], motor.n_features_severidade, motor.quantidade_lexicos),
+            )
+        versao_modelos.derivados['preditores_lineares'] = preditores
+    return versao_modelos.derivados['preditores_lineares']
+
+def _prever(
+    versao_modelos: VersaoModelos,
+    textos_processados: List[str],
+    cronometro: Optional[Cronometro] = None,
+    usar_preditores_lineares: bool = True
+) -> Tuple[np.ndarray, np.ndarray]:
+    motor = _obter_motor_features(versao_modelos)
+    # Em lotes grandes o custo é dominado pelas features, e o ganho do caminho linear some no ruído.
+    limite_lote = settings.LINEAR_FAST_PATH_MAX_BATCH
+    if usar_preditores_lineares and limite_lote and len(textos_processados) > limite_lote:
+        usar_preditores_lineares = False
+    preditor_tipo, preditor_severidade = _obter_preditores_lineares(versao_modelos) if usar_preditores_lineares else (None, None)
+
+    features_tipo, features_tfidf_severidade, features_lexico = motor.transformar_partes(textos_processados, cronometro)
+    features_combinadas_severidade = None
+    if preditor_severidade is None:
+        features_combinadas_severidade = motor.anexar_colunas_lexico(features_tfidf_severidade, features_lexico)
+        if cronometro is not None:
+            cronometro.marcar("severity_features")
+
+    if preditor_tipo is not None:
+        predicoes_tipo = preditor_tipo.prever(features_tipo)
+    else:
+        predicoes_tipo = versao_modelos.modelos['modelo_tipo'].predict(features_tipo)
+    if cronometro is not None:
+        cronometro.marcar("type_predict")
+
+    if preditor_severidade is not None:
+        predicoes_severidade = preditor_severidade.prever(features_tfidf_severidade, features_lexico)
+    else:
+        predicoes_severidade = versao_modelos.modelos['modelo_severidade'].predict(features_combinadas_severidade)
+    if cronometro is not None:
+        cronometro.marcar("severity_predict")
+    return predicoes_tipo, predicoes_severidade
+
+def _classificar_textos(textos_originais: List[str], versao_modelos: VersaoModelos) -> List[dict]:
+    observar_tamanho_lote("model_inference", len(textos_originais))
+    cronometro = iniciar_cronometro()
+
+    textos_processados = [preprocessar_texto(texto) for texto in textos_originais]
+    if cronometro is not None:
+        cronometro.marcar("preprocessing")
+
+    predicoes_tipo, predicoes_severidade = _prever(versao_modelos, textos_processados, cronometro)
+    if cronometro is not None:
+        cronometro.registrar()
+
+    return [
+        {
+            "alertId": None,
+            "classifiedType": str(tipo_predito),
+            "classifiedSeverity": str(severidade_predita),
+            "modelVersion": versao_modelos.versao
+        }
+        for tipo_predito, severidade_predita in zip(predicoes_tipo, predicoes_severidade)
+    ]
+
+def _preditores_lineares_conferem(versao_modelos: VersaoModelos) -> bool:
+    """
+    Confere a função de decisão dos preditores lineares contra `decision_function` em uma linha
+    por feature (cada coluna de TF-IDF e de léxico isolada, o que cobre todos os pesos e o
+    intercepto), e as predições nos textos de aquecimento.
+    """
+    motor = _obter_motor_features(versao_modelos)
+    preditor_tipo, preditor_severidade = _obter_preditores_lineares(versao_modelos)
+    if preditor_tipo is not None:
+        features_tipo = identity(motor.n_features_tipo, format='csr')
+        if not np.allclose(preditor_tipo.decisao(features_tipo), versao_modelos.modelos['modelo_tipo'].decision_function(features_tipo)):
+            return False
+    if preditor_severidade is not None:
+        n_features, n_lexicos = motor.n_features_severidade, motor.quantidade_lexicos
+        features_tfidf = vstack([identity(n_features, format='csr'), csr_matrix((n_lexicos, n_features))], format='csr')
+        features_lexico = np.vstack([np.zeros((n_features, n_lexicos)), np.eye(n_lexicos)])
+        decisao_modelo = versao_modelos.modelos['modelo_severidade'].decision_function(motor.anexar_colunas_lexico(features_tfidf, features_lexico))
+        if not np.allclose(preditor_severidade.decisao(features_tfidf, features_lexico), decisao_modelo):
+            return False
+    textos_processados = [preprocessar_texto(texto) for texto in settings.MODELS_WARMUP_TEXTS]
+    predicoes_rapidas = _prever(versao_modelos, textos_processados)
+    predicoes_modelos = _prever(versao_modelos, textos_processados, usar_preditores_lineares=False)
+    return all(np.array_equal(rapida, modelo) for rapida, modelo in zip(predicoes_rapidas, predicoes_modelos))
+
+def aquecer_versao_modelos(versao_modelos: VersaoModelos):
+    """
+    Prepara o motor de features e executa textos de exemplo numa versão antes de ativá-la.
+    Os preditores lineares só ficam ativos se reproduzirem a função de decisão dos modelos
+    (ver `_preditores_lineares_conferem`).
+    """
+    inicializar_recursos_texto()
+    _obter_motor_features(versao_modelos)
+    if any(_obter_preditores_lineares(versao_modelos)) and not _preditores_lineares_conferem(versao_modelos):
+        print(f"Aviso: o caminho linear diverge dos modelos da versão {versao_modelos.versao}; usando model.predict.")
+        versao_modelos.derivados['preditores_lineares'] = (None, None)
+    _classificar_textos(settings.MODELS_WARMUP_TEXTS, versao_modelos)
+
+registro_modelos.definir_aquecimento(aquecer_versao_modelos)
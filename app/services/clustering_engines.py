@@ -0,0 +1,236 @@
+"""
+Motores de clustering (DBSCAN) intercambiáveis, escolhidos por `settings.CLUSTERING_ENGINE`.
+
+* `haversine_balltree`: DBSCAN do scikit-learn com métrica haversine sobre uma ball tree.
+* `grade_projetada`: projeção equiretangular para coordenadas métricas locais e uma grade
+  uniforme de células com lado eps. Os pares candidatos vêm apenas de células vizinhas e a
+  distância é testada pela corda entre os vetores unitários dos pontos (equivalente ao teste
+  haversine, sem trigonometria por par). Não guarda listas de vizinhança: os pares são gerados
+  em blocos, em duas passagens (contagem de vizinhos e depois união dos componentes).
+
+Os dois motores retornam rótulos no mesmo formato de `DBSCAN.labels_`, inclusive a numeração:
+clusters numerados pela ordem do seu menor ponto core e pontos de borda no cluster de menor
+rótulo entre os vizinhos, como no `dbscan_inner` do scikit-learn.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, Tuple, Type
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN
+
+from app.core.config import settings
+
+R_TERRA_KM = 6371.0088
+
+
+class MotorClustering(ABC):
+    """Interface de um motor de clustering geográfico com semântica de DBSCAN."""
+
+    nome: str = ""
+
+    def __init__(self, eps_km: float, min_amostras: int):
+        self.eps_km = eps_km
+        self.min_amostras = min_amostras
+
+    @abstractmethod
+    def rotular(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """Rótulo de cluster de cada ponto (graus decimais); -1 para ruído."""
+
+
+class MotorHaversineBallTree(MotorClustering):
+    nome = "haversine_balltree"
+
+    def rotular(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        coordenadas_rad = np.radians(np.column_stack((latitudes, longitudes)))
+        db = DBSCAN(
+            eps=self.eps_km / R_TERRA_KM,
+            min_samples=self.min_amostras,
+            metric='haversine',
+            algorithm='ball_tree'
+        ).fit(coordenadas_rad)
+        return db.labels_
+
+
+class MotorGradeProjetada(MotorClustering):
+    nome = "grade_projetada"
+
+    # Margem sobre eps no lado das células: a projeção plana só decide quais células comparar,
+    # então uma folga pequena garante que nenhum par dentro de eps fique em células não vizinhas.
+    FOLGA_CELULA = 1.01
+    # Acima desta latitude a projeção equiretangular degenera; usa o motor haversine.
+    LATITUDE_MAXIMA_PROJECAO = 80.0
+    # Pares candidatos avaliados por bloco (limita a memória temporária).
+    PARES_POR_BLOCO = 1_000_000
+    # Até este número de pares vizinhos, os pares da 1ª passagem são reaproveitados na 2ª em vez
+    # de recalculados; acima dele (ex.: áreas muito densas) são gerados de novo.
+    MAX_PARES_REAPROVEITADOS = 5_000_000
+    # Células vizinhas "para frente": cada par de células é visitado uma única vez.
+    DESLOCAMENTOS_CELULAS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+    def rotular(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        n_pontos = len(latitudes)
+        if n_pontos == 0:
+            return np.empty(0, dtype=np.int64)
+        if np.abs(latitudes).max() > self.LATITUDE_MAXIMA_PROJECAO:
+            return MotorHaversineBallTree(self.eps_km, self.min_amostras).rotular(latitudes, longitudes)
+
+        lat_rad, lon_rad = np.radians(latitudes), np.radians(longitudes)
+        cos_lat = np.cos(lat_rad)
+        vetores_unitarios = np.column_stack((cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)))
+        corda_eps = 2.0 * np.sin(0.5 * self.eps_km / R_TERRA_KM)
+
+        # Equiretangular com o menor cos(lat) do conjunto: as distâncias projetadas não superam as
+        # reais, então pontos a até eps ficam em células vizinhas.
+        lon_relativa = np.remainder(lon_rad - lon_rad[0] + np.pi, 2 * np.pi) - np.pi
+        x_km = R_TERRA_KM * lon_relativa * cos_lat.min()
+        y_km = R_TERRA_KM * lat_rad
+        lado_celula = self.eps_km * self.FOLGA_CELULA
+        celulas_x = np.floor((x_km - x_km.min()) / lado_celula).astype(np.int64)
+        celulas_y = np.floor((y_km - y_km.min()) / lado_celula).astype(np.int64) + 1
+        del lat_rad, lon_rad, cos_lat, lon_relativa, x_km, y_km
+
+        pares_vizinhos = self._gerador_pares_vizinhos(vetores_unitarios, celulas_x, celulas_y, corda_eps * corda_eps)
+
+        # 1ª passagem: apenas a contagem de vizinhos (incluindo o próprio ponto) define os cores.
+        contagem_vizinhos = np.ones(n_pontos, dtype=np.int64)
+        pares_guardados, quantidade_guardada = [], 0
+        for origens, destinos in pares_vizinhos():
+            contagem_vizinhos += np.bincount(origens, minlength=n_pontos) + np.bincount(destinos, minlength=n_pontos)
+            if pares_guardados is not None:
+                pares_guardados.append((origens, destinos))
+                quantidade_guardada += len(origens)
+                if quantidade_guardada > self.MAX_PARES_REAPROVEITADOS:
+                    pares_guardados = None
+        if pares_guardados is not None:
+            pares_vizinhos = lambda: iter(pares_guardados)
+        eh_core = contagem_vizinhos >= self.min_amostras
+        indices_core = np.flatnonzero(eh_core)
+        rotulos = np.full(n_pontos, -1, dtype=np.int64)
+        if indices_core.size == 0:
+            return rotulos
+
+        # 2ª passagem: componentes dos cores por união incremental (cada componente representado pela
+        # menor posição core, ou seja, pelo menor índice) e arestas core-borda. As arestas não são
+        # guardadas: um ponto de borda tem menos de min_amostras vizinhos, então as core-borda são poucas.
+        posicao_core = np.full(n_pontos, -1, dtype=np.int64)
+        posicao_core[indices_core] = np.arange(indices_core.size)
+        componente = np.arange(indices_core.size)
+        ligacoes_borda_core, ligacoes_borda_ponto = [], []
+        for origens, destinos in pares_vizinhos():
+            core_origem, core_destino = eh_core[origens], eh_core[destinos]
+            ambos = core_origem & core_destino
+            if ambos.any():
+                componente = self._unir_componentes(
+                    componente, componente[posicao_core[origens[ambos]]], componente[posicao_core[destinos[ambos]]]
+                )
+            for core, outro, ligacao in ((origens, destinos, core_origem & ~core_destino), (destinos, origens, core_destino & ~core_origem)):
+                ligacoes_borda_core.append(core[ligacao])
+                ligacoes_borda_ponto.append(outro[ligacao])
+
+        # Rótulos numerados pela ordem do menor índice core de cada componente.
+        _, rotulo_da_raiz = np.unique(componente, return_inverse=True)
+        rotulos[indices_core] = rotulo_da_raiz
+
+        # Borda: o menor rótulo entre os cores vizinhos (o primeiro cluster que a alcança no sklearn).
+        pontos_borda = np.concatenate(ligacoes_borda_ponto)
+        if pontos_borda.size:
+            rotulos_borda = np.full(n_pontos, np.iinfo(np.int64).max, dtype=np.int64)
+            np.minimum.at(rotulos_borda, pontos_borda, rotulos[np.concatenate(ligacoes_borda_core)])
+            bordas = np.unique(pontos_borda)
+            rotulos[bordas] = rotulos_borda[bordas]
+        return rotulos
+
+    @staticmethod
+    def _unir_componentes(componente: np.ndarray, raizes_a: np.ndarray, raizes_b: np.ndarray) -> np.ndarray:
+        """Une os componentes ligados pelas arestas (raizes_a, raizes_b); a nova raiz é a menor posição do grupo."""
+        distintas = raizes_a != raizes_b
+        if not distintas.any():
+            return componente
+        nos, arestas = np.unique(np.concatenate((raizes_a[distintas], raizes_b[distintas])), return_inverse=True)
+        n_arestas = int(distintas.sum())
+        grafo = coo_matrix(
+            (np.ones(n_arestas, dtype=np.int8), (arestas[:n_arestas], arestas[n_arestas:])), shape=(len(nos), len(nos))
+        ).tocsr()
+        _, grupos = connected_components(grafo, directed=False)
+        # `nos` é crescente: a primeira ocorrência de cada grupo é a sua menor raiz.
+        _, primeira_ocorrencia = np.unique(grupos, return_index=True)
+        nova_raiz = np.arange(len(componente))
+        nova_raiz[nos] = nos[primeira_ocorrencia[grupos]]
+        return nova_raiz[componente]
+
+    def _gerador_pares_vizinhos(self, vetores_unitarios, celulas_x, celulas_y, corda_eps_quadrado):
+        """
+        Retorna uma função que percorre, em blocos, todos os pares (i, j), i != j, com distância
+        até eps, cada par uma única vez. Pode ser chamada mais de uma vez (uma por passagem).
+        """
+        largura = int(celulas_y.max()) + 2
+        chaves = celulas_x * largura + celulas_y
+        ordem = np.argsort(chaves, kind='stable')
+        vetores_ordenados = vetores_unitarios[ordem]
+        chaves_celulas, inicios_celulas, tamanhos_celulas = np.unique(chaves[ordem], return_index=True, return_counts=True)
+        del chaves
+        if len(ordem) < np.iinfo(np.int32).max:
+            ordem = ordem.astype(np.int32)
+
+        pares_celulas = []
+        for dx, dy in self.DESLOCAMENTOS_CELULAS:
+            alvos = chaves_celulas + dx * largura + dy
+            posicoes = np.minimum(np.searchsorted(chaves_celulas, alvos), len(chaves_celulas) - 1)
+            celulas_a = np.flatnonzero(chaves_celulas[posicoes] == alvos)
+            pares_celulas.append((dx == 0 and dy == 0, celulas_a, posicoes[celulas_a]))
+
+        def percorrer() -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+            for mesma_celula, celulas_a, celulas_b in pares_celulas:
+                for ia, ib in self._pares_candidatos(inicios_celulas, tamanhos_celulas, celulas_a, celulas_b):
+                    if mesma_celula:
+                        distintos = ia < ib
+                        ia, ib = ia[distintos], ib[distintos]
+                    diferenca = vetores_ordenados[ia] - vetores_ordenados[ib]
+                    dentro = np.einsum('ij,ij->i', diferenca, diferenca) <= corda_eps_quadrado
+                    yield ordem[ia[dentro]], ordem[ib[dentro]]
+
+        return percorrer
+
+    def _pares_candidatos(self, inicios, tamanhos, celulas_a, celulas_b) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Produto cartesiano dos pontos de cada par de células, em blocos de até PARES_POR_BLOCO pares."""
+        n_a, n_b = tamanhos[celulas_a], tamanhos[celulas_b]
+        pares_por_celula = n_a * n_b
+        acumulado = np.cumsum(pares_por_celula)
+        inicio_bloco = 0
+        while inicio_bloco < len(celulas_a):
+            base = acumulado[inicio_bloco - 1] if inicio_bloco else 0
+            fim_bloco = max(inicio_bloco + 1, int(np.searchsorted(acumulado, base + self.PARES_POR_BLOCO, side='right')))
+            bloco = slice(inicio_bloco, fim_bloco)
+            quantidade = pares_por_celula[bloco]
+            par_da_linha = np.repeat(np.arange(fim_bloco - inicio_bloco), quantidade)
+            deslocamento = np.arange(int(quantidade.sum())) - np.repeat(np.cumsum(quantidade) - quantidade, quantidade)
+            n_b_linha = n_b[bloco][par_da_linha]
+            yield (
+                inicios[celulas_a[bloco]][par_da_linha] + deslocamento // n_b_linha,
+                inicios[celulas_b[bloco]][par_da_linha] + deslocamento % n_b_linha,
+            )
+            inicio_bloco = fim_bloco
+
+
+MOTORES_CLUSTERING: Dict[str, Type[MotorClustering]] = {
+    MotorHaversineBallTree.nome: MotorHaversineBallTree,
+    MotorGradeProjetada.nome: MotorGradeProjetada,
+}
+
+
+def criar_motor_clustering(nome: str, eps_km: float, min_amostras: int) -> MotorClustering:
+    try:
+        return MOTORES_CLUSTERING[nome](eps_km, min_amostras)
+    except KeyError:
+        raise ValueError(
+            f"Motor de clustering desconhecido: '{nome}'. Opções: {', '.join(MOTORES_CLUSTERING)}."
+        ) from None
+
+
+def obter_motor_clustering(eps_km: float, min_amostras: int) -> MotorClustering:
+    """Motor configurado em `settings.CLUSTERING_ENGINE`."""
+    return criar_motor_clustering(settings.CLUSTERING_ENGINE, eps_km, min_amostras)
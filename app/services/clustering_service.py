@@ -1,15 +1,17 @@
+import hashlib
 import numpy as np
 import pandas as pd
-from sklearn.cluster import DBSCAN
-from sklearn.metrics.pairwise import haversine_distances
-from collections import Counter
-from typing import List, Dict, Tuple
+from typing import List, Dict, NamedTuple, Optional, Tuple
 from datetime import datetime, timezone
+from pydantic import ValidationError
 
-from app.models_schemas.schemas import AlertItemForClustering
-from app.utils.cluster_utils import calcular_distribuicao_percentual, obter_item_predominante
+from app.core.config import settings
+from app.core.metrics import Cronometro
+from app.models_schemas.schemas import AlertItemForClustering, ClusteringInput, HotspotSummaryOutput
+from app.services.clustering_engines import R_TERRA_KM, obter_motor_clustering
+from app.services.particionamento_clustering import rotular_particionado
+from app.utils.serializacao_json import carregar_json, serializar_json
 
-R_TERRA_KM = 6371.0088
 DBSCAN_EPS_KM = 0.200
 DBSCAN_MIN_SAMPLES = 4
 REFINEMENT_MIN_ALERTS_FOR_HOTSPOT = 3
@@ -18,127 +20,268 @@ REFINEMENT_PORC_ALTA_EM_MEDIA = 0.25
 DEFAULT_HOTSPOT_RADIUS_KM_SINGLE_POINT = 0.05
 
 
+# Campos (e ordem) de `HotspotSummaryOutput` na resposta; os demais campos dos hotspots são internos.
+CAMPOS_HOTSPOT_RESPOSTA = tuple(HotspotSummaryOutput.model_fields)
+
+TIPOS_HOTSPOT_ALTA_OU_MEDIA = ('ALAGAMENTO', 'RISCO_DESLIZAMENTO', 'DESLIZAMENTO_OCORRIDO')
+
+# Campos de cada alerta que entram na impressão digital do conjunto (todos os que afetam a resposta).
+CAMPOS_IMPRESSAO_DIGITAL = ('alertId', 'latitude', 'longitude', 'severityIA', 'typeIA', 'timestampReporte', 'regionKey')
+
+
+class RespostaClustering(NamedTuple):
+    corpo: bytes
+    # clusterLabel de cada alerta, na ordem da entrada.
+    rotulos: np.ndarray
+    # Lista `hotspotSummaries` já serializada (não depende da ordem dos alertas na resposta).
+    json_hotspots: bytes
+
+
+def _distancias_haversine_km(lat_rad: np.ndarray, lon_rad: np.ndarray, lat_ref_rad: np.ndarray, lon_ref_rad: np.ndarray) -> np.ndarray:
+    """Distância haversine ponto a ponto (mesma fórmula de `haversine_distances`), em km."""
+    sen_dlat = np.sin(0.5 * (lat_rad - lat_ref_rad))
+    sen_dlon = np.sin(0.5 * (lon_rad - lon_ref_rad))
+    a = sen_dlat * sen_dlat + np.cos(lat_rad) * np.cos(lat_ref_rad) * sen_dlon * sen_dlon
+    return 2.0 * np.arcsin(np.sqrt(a)) * R_TERRA_KM
+
+
 def refinar_e_caracterizar_hotspots_para_api(
     df_alertas_com_cluster_ids: pd.DataFrame,
     config_refinamento: dict
 ) -> List[Dict]:
-    
-    hotspots_formatados = []
-    ids_clusters_unicos = df_alertas_com_cluster_ids['cluster_id_dbscan'].unique()
-    hotspot_output_id_counter = 0
-
+    """
+    Agrupa os alertas por (cluster DBSCAN, tipo) e transforma cada grupo que atende às regras de
+    severidade em um hotspot. Os grupos são formados uma única vez (factorize + ordenação estável)
+    e as contagens, severidades predominantes, raios e timestamps são agregados por grupo, sem
+    refiltrar o DataFrame para cada cluster. A ordem dos hotspots é a dos clusters por primeira
+    aparição e, dentro de cada cluster, a dos tipos por primeira aparição.
+    """
     min_alertas_para_hotspot_refinado = config_refinamento.get("MIN_ALERTAS_PARA_HOTSPOT_REFINADO", 3)
     porc_severidade_predominante = config_refinamento.get("PORCENTAGEM_PARA_SEVERIDADE_PREDOMINANTE", 0.50)
     porc_alta_em_media = config_refinamento.get("PORCENTAGEM_ALTA_EM_MEDIA_PARA_HOTSPOT", 0.25)
 
-    for id_cluster_dbscan_bruto in ids_clusters_unicos:
-        if id_cluster_dbscan_bruto == -1: continue
-
-        alertas_do_geocluster_bruto = df_alertas_com_cluster_ids[df_alertas_com_cluster_ids['cluster_id_dbscan'] == id_cluster_dbscan_bruto]
-        
-        if len(alertas_do_geocluster_bruto) < min_alertas_para_hotspot_refinado: continue
-
-        tipos_presentes_no_geocluster = alertas_do_geocluster_bruto['typeIA'].unique()
-
-        for tipo_candidato_hotspot in tipos_presentes_no_geocluster:
-            alertas_deste_tipo_especifico = alertas_do_geocluster_bruto[alertas_do_geocluster_bruto['typeIA'] == tipo_candidato_hotspot]
-
-            if len(alertas_deste_tipo_especifico) < min_alertas_para_hotspot_refinado: continue
-            
-            dist_sev_tipo = calcular_distribuicao_percentual(alertas_deste_tipo_especifico['severityIA'])
-            sev_pred_tipo_tupla = obter_item_predominante(alertas_deste_tipo_especifico['severityIA'], porc_severidade_predominante)
-            sev_pred_tipo = sev_pred_tipo_tupla[0] if sev_pred_tipo_tupla else "N/A"
-
-            forma_hotspot = False
-            dominant_severity_final = sev_pred_tipo
-
-            if tipo_candidato_hotspot == 'OUTRO_PERIGO':
-                if sev_pred_tipo == 'CRITICA': forma_hotspot = True
-            elif tipo_candidato_hotspot in ['ALAGAMENTO', 'RISCO_DESLIZAMENTO', 'DESLIZAMENTO_OCORRIDO']:
-                if sev_pred_tipo in ['CRITICA', 'ALTA']: forma_hotspot = True
-                elif sev_pred_tipo == 'MEDIA' and dist_sev_tipo.get('ALTA', 0.0) >= porc_alta_em_media:
-                    forma_hotspot = True
-                    dominant_severity_final = 'MEDIA'
-
-            if not forma_hotspot: continue
-
-            hotspot_output_id_counter += 1
-            centroid_lat = alertas_deste_tipo_especifico['latitude'].mean()
-            centroid_lon = alertas_deste_tipo_especifico['longitude'].mean()
-            
-            radius_km = DEFAULT_HOTSPOT_RADIUS_KM_SINGLE_POINT
-            if len(alertas_deste_tipo_especifico) > 1:
-                points_rad = np.radians(alertas_deste_tipo_especifico[['latitude', 'longitude']].values)
-                centroid_rad = np.radians([[centroid_lat, centroid_lon]])
-                distances_km = haversine_distances(points_rad, centroid_rad) * R_TERRA_KM
-                if distances_km.size > 0: radius_km = np.max(distances_km)
-            
-            summary = f"Hotspot de {tipo_candidato_hotspot.replace('_', ' ').title()} com severidade {dominant_severity_final}. {len(alertas_deste_tipo_especifico)} alertas."
-            
-            last_ts = None
-            if 'timestampReporte' in alertas_deste_tipo_especifico.columns and not alertas_deste_tipo_especifico['timestampReporte'].dropna().empty:
-                try:
-                    last_ts = alertas_deste_tipo_especifico['timestampReporte'].dropna().max()
-                except Exception:
-                    try:
-                        timestamps_dt = pd.to_datetime(alertas_deste_tipo_especifico['timestampReporte'].dropna(), errors='coerce')
-                        if not timestamps_dt.empty:
-                             last_ts = timestamps_dt.max().isoformat() + "Z"
-                    except Exception:
-                        last_ts = datetime.now(timezone.utc).isoformat()
-            else:
-                 last_ts = datetime.now(timezone.utc).isoformat()
-
-
-            hotspots_formatados.append({
-                "clusterLabel": hotspot_output_id_counter,
-                "centroidLat": float(centroid_lat),
-                "centroidLon": float(centroid_lon),
-                "pointCount": len(alertas_deste_tipo_especifico),
-                "dominantType": str(tipo_candidato_hotspot),
-                "dominantSeverity": str(dominant_severity_final),
-                "alertIdsInCluster": sorted(alertas_deste_tipo_especifico['alertId'].tolist()),
-                "estimatedRadiusKm": float(radius_km) if radius_km is not None else None,
-                "publicSummary": summary,
-                "lastActivityTimestamp": str(last_ts) if last_ts is not None else None,
-                "distribuicaoTipos": dict(Counter(alertas_deste_tipo_especifico['typeIA'])),
-                "distribuicaoSeveridades": dict(Counter(alertas_deste_tipo_especifico['severityIA']))
-            })
-            
+    df_em_clusters = df_alertas_com_cluster_ids[df_alertas_com_cluster_ids['cluster_id_dbscan'].to_numpy() != -1]
+    if df_em_clusters.empty:
+        return []
+
+    # Clusters numerados por ordem de primeira aparição; descarta os pequenos demais.
+    codigos_cluster, _ = pd.factorize(df_em_clusters['cluster_id_dbscan'])
+    linhas_validas = np.bincount(codigos_cluster)[codigos_cluster] >= min_alertas_para_hotspot_refinado
+    df_em_clusters = df_em_clusters[linhas_validas]
+    codigos_cluster = codigos_cluster[linhas_validas]
+    if df_em_clusters.empty:
+        return []
+
+    codigos_tipo, tipos = pd.factorize(df_em_clusters['typeIA'])
+    codigos_severidade, severidades = pd.factorize(df_em_clusters['severityIA'])
+    n_tipos, n_severidades = len(tipos), len(severidades)
+
+    # Grupos (cluster, tipo) numerados por primeira aparição do par; a ordenação estável pelo
+    # cluster mantém, dentro de cada cluster, os tipos na ordem em que aparecem.
+    codigos_par, pares = pd.factorize(codigos_cluster.astype(np.int64) * n_tipos + codigos_tipo)
+    ordem_grupos = np.argsort(pares // n_tipos, kind='stable')
+    posicao_grupo = np.empty(len(pares), dtype=np.int64)
+    posicao_grupo[ordem_grupos] = np.arange(len(pares))
+    grupos = posicao_grupo[codigos_par]
+    tipo_do_grupo = tipos[pares[ordem_grupos] % n_tipos]
+    n_grupos = len(pares)
+
+    tamanho_grupo = np.bincount(grupos, minlength=n_grupos)
+    contagens_severidade = np.bincount(
+        grupos * n_severidades + codigos_severidade, minlength=n_grupos * n_severidades
+    ).reshape(n_grupos, n_severidades)
+
+    # Severidade predominante com o mesmo desempate de `value_counts`: maior contagem e, entre
+    # empatadas, a que aparece primeiro no grupo.
+    posicao_linha = np.arange(len(grupos))
+    primeira_aparicao = np.full((n_grupos, n_severidades), len(grupos), dtype=np.int64)
+    np.minimum.at(primeira_aparicao, (grupos, codigos_severidade), posicao_linha)
+    empate_maximo = contagens_severidade == contagens_severidade.max(axis=1, keepdims=True)
+    severidade_mais_comum = np.where(empate_maximo, primeira_aparicao, len(grupos)).argmin(axis=1)
+    percentual_mais_comum = contagens_severidade[np.arange(n_grupos), severidade_mais_comum] / tamanho_grupo
+    tem_predominante = percentual_mais_comum >= porc_severidade_predominante
+    severidade_predominante = np.where(tem_predominante, np.asarray(severidades, dtype=object)[severidade_mais_comum], "N/A")
+
+    codigo_alta = severidades.get_loc('ALTA') if 'ALTA' in severidades else None
+    percentual_alta = contagens_severidade[:, codigo_alta] / tamanho_grupo if codigo_alta is not None else np.zeros(n_grupos)
+
+    tipo_do_grupo = np.asarray(tipo_do_grupo, dtype=object)
+    forma_hotspot = (tamanho_grupo >= min_alertas_para_hotspot_refinado) & (
+        ((tipo_do_grupo == 'OUTRO_PERIGO') & (severidade_predominante == 'CRITICA'))
+        | (np.isin(tipo_do_grupo, TIPOS_HOTSPOT_ALTA_OU_MEDIA) & (
+            np.isin(severidade_predominante, ('CRITICA', 'ALTA'))
+            | ((severidade_predominante == 'MEDIA') & (percentual_alta >= porc_alta_em_media))
+        ))
+    )
+    grupos_hotspot = np.flatnonzero(forma_hotspot)
+    if grupos_hotspot.size == 0:
+        return []
+
+    # Linhas dos grupos que viram hotspot, contíguas por grupo e na ordem original dentro dele.
+    linhas_hotspot = np.flatnonzero(forma_hotspot[grupos])
+    linhas_hotspot = linhas_hotspot[np.argsort(grupos[linhas_hotspot], kind='stable')]
+    tamanhos_hotspot = tamanho_grupo[grupos_hotspot]
+    inicios_hotspot = np.concatenate(([0], np.cumsum(tamanhos_hotspot)[:-1]))
+
+    latitudes = df_em_clusters['latitude'].to_numpy(dtype=np.float64)[linhas_hotspot]
+    longitudes = df_em_clusters['longitude'].to_numpy(dtype=np.float64)[linhas_hotspot]
+    alert_ids = df_em_clusters['alertId'].to_numpy()[linhas_hotspot]
+    grupos_linhas_hotspot = grupos[linhas_hotspot]
+    severidades_linhas_hotspot = codigos_severidade[linhas_hotspot]
+
+    # Médias por fatia contígua: mesma soma (e portanto o mesmo valor) de `Series.mean` no grupo.
+    centroides_lat = np.array([latitudes[inicio:inicio + tamanho].mean() for inicio, tamanho in zip(inicios_hotspot, tamanhos_hotspot)])
+    centroides_lon = np.array([longitudes[inicio:inicio + tamanho].mean() for inicio, tamanho in zip(inicios_hotspot, tamanhos_hotspot)])
+    distancias_km = _distancias_haversine_km(
+        np.radians(latitudes), np.radians(longitudes),
+        np.radians(np.repeat(centroides_lat, tamanhos_hotspot)), np.radians(np.repeat(centroides_lon, tamanhos_hotspot))
+    )
+    raios_km = np.where(tamanhos_hotspot > 1, np.maximum.reduceat(distancias_km, inicios_hotspot), DEFAULT_HOTSPOT_RADIUS_KM_SINGLE_POINT)
+
+    agora_iso = datetime.now(timezone.utc).isoformat()
+    if 'timestampReporte' in df_em_clusters.columns:
+        # Máximo por grupo das strings de timestamp; ausentes viram "" (menor que qualquer timestamp).
+        timestamps = df_em_clusters['timestampReporte'].to_numpy(dtype=object)[linhas_hotspot]
+        timestamps[pd.isna(timestamps)] = ""
+        ultimos_timestamps = [ts if ts else agora_iso for ts in np.maximum.reduceat(timestamps, inicios_hotspot).tolist()]
+    else:
+        ultimos_timestamps = [agora_iso] * len(grupos_hotspot)
+
+    hotspots_formatados = []
+    for hotspot_output_id, (grupo, inicio, tamanho) in enumerate(zip(grupos_hotspot, inicios_hotspot, tamanhos_hotspot), start=1):
+        tipo_candidato_hotspot = tipo_do_grupo[grupo]
+        dominant_severity_final = severidade_predominante[grupo]
+        tamanho = int(tamanho)
+        summary = f"Hotspot de {tipo_candidato_hotspot.replace('_', ' ').title()} com severidade {dominant_severity_final}. {tamanho} alertas."
+        severidades_presentes = np.flatnonzero(contagens_severidade[grupo])
+        severidades_presentes = severidades_presentes[np.argsort(primeira_aparicao[grupo, severidades_presentes])]
+
+        hotspots_formatados.append({
+            "clusterLabel": hotspot_output_id,
+            "centroidLat": float(centroides_lat[hotspot_output_id - 1]),
+            "centroidLon": float(centroides_lon[hotspot_output_id - 1]),
+            "pointCount": tamanho,
+            "dominantType": str(tipo_candidato_hotspot),
+            "dominantSeverity": str(dominant_severity_final),
+            "alertIdsInCluster": sorted(alert_ids[inicio:inicio + tamanho].tolist()),
+            "estimatedRadiusKm": float(raios_km[hotspot_output_id - 1]),
+            "publicSummary": summary,
+            "lastActivityTimestamp": str(ultimos_timestamps[hotspot_output_id - 1]),
+            "distribuicaoTipos": {str(tipo_candidato_hotspot): tamanho},
+            "distribuicaoSeveridades": {
+                str(severidades[codigo]): int(contagens_severidade[grupo, codigo]) for codigo in severidades_presentes
+            }
+        })
+
     return hotspots_formatados
 
 
-def realizar_clustering_alertas(alertas_para_clusterizar: List[AlertItemForClustering]) -> Tuple[List[Dict], List[Dict]]:
+class PayloadClusteringInvalidoError(Exception):
+    """Corpo de `/ia/cluster_alerts` que não é JSON ou não segue `ClusteringInput`. `erros` segue o formato do pydantic."""
+
+    def __init__(self, erros: list):
+        super().__init__("Payload de clustering inválido.")
+        self.erros = erros
+
+
+def colunas_de_alertas(alertas_para_clusterizar: List[AlertItemForClustering]) -> Dict[str, object]:
+    """Colunas (na ordem de `AlertItemForClustering`) a partir de alertas já validados."""
+    return {
+        'alertId': np.array([alerta.alertId for alerta in alertas_para_clusterizar]),
+        'latitude': np.array([alerta.latitude for alerta in alertas_para_clusterizar], dtype=np.float64),
+        'longitude': np.array([alerta.longitude for alerta in alertas_para_clusterizar], dtype=np.float64),
+        'severityIA': [alerta.severityIA for alerta in alertas_para_clusterizar],
+        'typeIA': [alerta.typeIA for alerta in alertas_para_clusterizar],
+        'timestampReporte': [alerta.timestampReporte for alerta in alertas_para_clusterizar],
+        'regionKey': [alerta.regionKey for alerta in alertas_para_clusterizar],
+    }
+
+
+def _extrair_colunas_tipadas(itens: list) -> Optional[Dict[str, object]]:
     """
-    Função principal do serviço de clustering.
-    Retorna os resultados de clustering e os sumários dos hotspots.
+    Extrai as colunas direto do JSON decodificado quando todos os itens já trazem os tipos exatos
+    do schema (o caso comum). Retorna None se algum item precisar das conversões ou das mensagens
+    de erro do pydantic.
     """
-    if not alertas_para_clusterizar:
-        return [], []
+    try:
+        alert_ids = [item['alertId'] for item in itens]
+        latitudes = [item['latitude'] for item in itens]
+        longitudes = [item['longitude'] for item in itens]
+        severidades = [item['severityIA'] for item in itens]
+        tipos = [item['typeIA'] for item in itens]
+        timestamps = [item.get('timestampReporte') for item in itens]
+        regioes = [item.get('regionKey') for item in itens]
+    except (KeyError, TypeError, AttributeError):
+        return None
 
-    df_alertas = pd.DataFrame([alerta.model_dump() for alerta in alertas_para_clusterizar])
+    if not (
+        all(type(valor) is int for valor in alert_ids)
+        and all(type(valor) is float or type(valor) is int for valor in latitudes)
+        and all(type(valor) is float or type(valor) is int for valor in longitudes)
+        and all(type(valor) is str for valor in severidades)
+        and all(type(valor) is str for valor in tipos)
+        and all(valor is None or type(valor) is str for valor in timestamps)
+        and all(valor is None or type(valor) is str for valor in regioes)
+    ):
+        return None
+    try:
+        alert_ids = np.array(alert_ids, dtype=np.int64)
+    except OverflowError:
+        return None
+    return {
+        'alertId': alert_ids,
+        'latitude': np.array(latitudes, dtype=np.float64),
+        'longitude': np.array(longitudes, dtype=np.float64),
+        'severityIA': severidades,
+        'typeIA': tipos,
+        'timestampReporte': timestamps,
+        'regionKey': regioes,
+    }
 
-    if df_alertas.empty or not all(col in df_alertas.columns for col in ['latitude', 'longitude', 'alertId', 'typeIA', 'severityIA']):
-        raise ValueError("Dados de alerta inválidos ou faltando campos obrigatórios para clustering.")
 
-    coordenadas_rad = np.radians(df_alertas[['latitude', 'longitude']].values)
-    eps_rad = DBSCAN_EPS_KM / R_TERRA_KM
+def extrair_colunas_payload_clustering(corpo: bytes) -> Dict[str, object]:
+    """
+    Decodifica o corpo de `/ia/cluster_alerts` direto em colunas, sem criar um
+    `AlertItemForClustering` por alerta. Payloads fora do caso comum (tipos que exigem conversão,
+    campos ausentes) passam pela validação do `ClusteringInput`, com as mesmas conversões e erros
+    de antes; uma lista vazia gera ValueError com a mensagem específica do endpoint.
+    """
+    try:
+        dados = carregar_json(corpo)
+    except ValueError as e:
+        raise PayloadClusteringInvalidoError([{"type": "json_invalid", "loc": ("body",), "msg": str(e), "input": {}}]) from e
 
-    db = DBSCAN(eps=eps_rad, 
-                min_samples=DBSCAN_MIN_SAMPLES, 
-                metric='haversine', 
-                algorithm='ball_tree'
-               ).fit(coordenadas_rad)
-    
-    df_alertas['cluster_id_dbscan'] = db.labels_
+    itens = dados.get('alertsToCluster') if isinstance(dados, dict) else None
+    if isinstance(itens, list) and not itens:
+        raise ValueError("A lista 'alertsToCluster' é obrigatória e não pode ser vazia.")
+    colunas = _extrair_colunas_tipadas(itens) if isinstance(itens, list) and itens else None
+    if colunas is None:
+        try:
+            payload = ClusteringInput.model_validate(carregar_json(corpo, exato=True))
+        except ValidationError as e:
+            raise PayloadClusteringInvalidoError(e.errors(include_url=False)) from e
+        colunas = colunas_de_alertas(payload.alertsToCluster)
+    return colunas
+
+
+def _rotular_e_refinar(colunas: Dict[str, object], cronometro: Optional[Cronometro] = None) -> Tuple[pd.DataFrame, np.ndarray, List[Dict]]:
+    df_alertas = pd.DataFrame(colunas)
+    if cronometro is not None:
+        cronometro.marcar("clustering_input")
+
+    motor_clustering = obter_motor_clustering(DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES)
+    rotulos = rotular_particionado(
+        motor_clustering,
+        df_alertas['latitude'].to_numpy(),
+        df_alertas['longitude'].to_numpy(),
+        colunas.get('regionKey'),
+        colunas.get('timestampReporte'),
+    )
+    if cronometro is not None:
+        cronometro.marcar("dbscan_fit")
+
+    df_alertas['cluster_id_dbscan'] = rotulos
 
-    clustering_results = []
-    for idx, row in df_alertas.iterrows():
-        clustering_results.append({
-            "alertId": int(row['alertId']),
-            "clusterLabel": int(row['cluster_id_dbscan']) 
-        })
-    
     config_refinamento = {
         "MIN_ALERTAS_PARA_HOTSPOT_REFINADO": REFINEMENT_MIN_ALERTS_FOR_HOTSPOT,
         "PORCENTAGEM_PARA_SEVERIDADE_PREDOMINANTE": REFINEMENT_PORC_SEVERIDADE_PREDOMINANTE,
@@ -146,5 +289,104 @@ def realizar_clustering_alertas(alertas_para_clusterizar: List[AlertItemForClust
     }
 
     hotspot_summaries_dicts = refinar_e_caracterizar_hotspots_para_api(df_alertas, config_refinamento)
-        
+    if cronometro is not None:
+        cronometro.marcar("hotspot_refinement")
+
+    return df_alertas, rotulos, hotspot_summaries_dicts
+
+
+def realizar_clustering_colunas(colunas: Dict[str, object], cronometro: Optional[Cronometro] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Função principal do serviço de clustering, sobre as colunas dos alertas (ver
+    `colunas_de_alertas`). Os alertas são clusterizados por partição (região, janela de tempo e
+    área geográfica; ver `particionamento_clustering`). Retorna os resultados de clustering e os
+    sumários dos hotspots.
+    """
+    if len(colunas['alertId']) == 0:
+        return [], []
+    df_alertas, rotulos, hotspot_summaries_dicts = _rotular_e_refinar(colunas, cronometro)
+    clustering_results = [
+        {"alertId": alert_id, "clusterLabel": cluster_label}
+        for alert_id, cluster_label in zip(df_alertas['alertId'].tolist(), rotulos.tolist())
+    ]
     return clustering_results, hotspot_summaries_dicts
+
+
+def realizar_clustering_alertas(
+    alertas_para_clusterizar: List[AlertItemForClustering],
+    cronometro: Optional[Cronometro] = None
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Função principal do serviço de clustering.
+    Retorna os resultados de clustering e os sumários dos hotspots.
+    """
+    if not alertas_para_clusterizar:
+        return [], []
+    return realizar_clustering_colunas(colunas_de_alertas(alertas_para_clusterizar), cronometro)
+
+
+def impressao_digital_alertas(colunas: Dict[str, object]) -> Tuple[str, np.ndarray]:
+    """
+    Impressão digital (hex) do conjunto de alertas e o hash de 64 bits de cada alerta.
+
+    A impressão não depende da ordem dos alertas: é o blake2b dos hashes ordenados, precedidos
+    pelos parâmetros do DBSCAN, do refinamento e do particionamento (e pela versão da API), de
+    modo que mudar qualquer um deles também muda a impressão.
+    """
+    quantidade = len(colunas['alertId'])
+    hashes_alertas = pd.util.hash_pandas_object(
+        pd.DataFrame({campo: colunas.get(campo, [None] * quantidade) for campo in CAMPOS_IMPRESSAO_DIGITAL}), index=False
+    ).to_numpy()
+    parametros = (
+        settings.APP_VERSION, DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES, REFINEMENT_MIN_ALERTS_FOR_HOTSPOT,
+        REFINEMENT_PORC_SEVERIDADE_PREDOMINANTE, REFINEMENT_PORC_ALTA_EM_MEDIA, DEFAULT_HOTSPOT_RADIUS_KM_SINGLE_POINT,
+        settings.CLUSTERING_ENGINE, settings.CLUSTERING_TIME_WINDOW_SECONDS, settings.CLUSTERING_PARTITION_CELL_KM,
+        settings.CLUSTERING_PARTITION_TARGET_ALERTS,
+    )
+    resumo = hashlib.blake2b(repr(parametros).encode('utf-8'), digest_size=16)
+    resumo.update(np.sort(hashes_alertas).tobytes())
+    return resumo.hexdigest(), hashes_alertas
+
+
+def serializar_resultados_clustering(alert_ids, rotulos: np.ndarray) -> bytes:
+    """Lista `clusteringResults` serializada."""
+    return serializar_json([
+        {"alertId": alert_id, "clusterLabel": cluster_label}
+        for alert_id, cluster_label in zip(np.asarray(alert_ids).tolist(), rotulos.tolist())
+    ])
+
+
+def montar_resposta_clustering(json_resultados: bytes, json_hotspots: bytes) -> bytes:
+    """JSON de `ClusteringResponse` a partir das duas listas já serializadas (mesmos bytes de serializar o dict)."""
+    return b'{"clusteringResults":' + json_resultados + b',"hotspotSummaries":' + json_hotspots + b'}'
+
+
+def gerar_resposta_clustering(colunas: Dict[str, object], cronometro: Optional[Cronometro] = None) -> RespostaClustering:
+    """
+    Executa o clustering e serializa a resposta de `/ia/cluster_alerts` (JSON no formato de
+    `ClusteringResponse`) sem instanciar os modelos pydantic de saída. Roda inteira no worker,
+    então só bytes (e os rótulos, para o cache de respostas) voltam do pool de processos.
+    """
+    if len(colunas['alertId']) == 0:
+        return RespostaClustering(montar_resposta_clustering(b"[]", b"[]"), np.empty(0, dtype=np.int64), b"[]")
+    df_alertas, rotulos, hotspot_summaries_dicts = _rotular_e_refinar(colunas, cronometro)
+    json_hotspots = serializar_json([{campo: hotspot.get(campo) for campo in CAMPOS_HOTSPOT_RESPOSTA} for hotspot in hotspot_summaries_dicts])
+    resposta = RespostaClustering(
+        montar_resposta_clustering(serializar_resultados_clustering(df_alertas['alertId'].to_numpy(), rotulos), json_hotspots),
+        rotulos,
+        json_hotspots,
+    )
+    if cronometro is not None:
+        cronometro.marcar("response_serialization")
+    return resposta
+
+
+def gerar_resposta_clustering_cronometrada(colunas: Dict[str, object]) -> Tuple[RespostaClustering, Dict[str, float]]:
+    """
+    Igual a `gerar_resposta_clustering`, devolvendo também o tempo de cada etapa. Os tempos
+    voltam junto com o resultado porque o clustering pode rodar no pool de processos, onde as
+    métricas registradas não chegariam ao processo da API.
+    """
+    cronometro = Cronometro()
+    resposta = gerar_resposta_clustering(colunas, cronometro)
+    return resposta, cronometro.tempos
@@ -0,0 +1,378 @@
+"""
+Clustering incremental dos alertas ativos.
+
+Mantém em memória os alertas vivos, um índice espacial em grade e o grafo de vizinhança do
+DBSCAN (pares a até DBSCAN_EPS_KM). A cada atualização apenas a vizinhança dos alertas
+adicionados/removidos é reavaliada: os componentes de pontos core alcançáveis a partir dela
+são recalculados e os demais clusters não são tocados. Os rótulos de cluster são estáveis entre
+atualizações e a resposta traz somente o que mudou.
+
+As regras são as do DBSCAN: um ponto é core com pelo menos DBSCAN_MIN_SAMPLES vizinhos
+(incluindo ele mesmo), clusters são os componentes conexos dos pontos core, e um ponto de borda
+recebe o menor rótulo entre os clusters dos cores vizinhos (o DBSCAN do scikit-learn atribui a
+borda ao primeiro cluster que a alcança; a partição dos pontos core e o ruído são os mesmos).
+"""
+import heapq
+import itertools
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.models_schemas.schemas import AlertItemForClustering
+from app.services.clustering_service import (
+    DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES, R_TERRA_KM, REFINEMENT_MIN_ALERTS_FOR_HOTSPOT,
+    REFINEMENT_PORC_ALTA_EM_MEDIA, REFINEMENT_PORC_SEVERIDADE_PREDOMINANTE,
+    refinar_e_caracterizar_hotspots_para_api,
+)
+from app.services.particionamento_clustering import converter_timestamp_para_epoch
+
+ROTULO_RUIDO = -1
+
+# Lado das células da grade, no espaço 3D da esfera unitária: a corda correspondente a DBSCAN_EPS_KM.
+# Dois pontos a até eps de distância estão sempre em células vizinhas (27 por ponto).
+LADO_CELULA_CORDA = 2.0 * np.sin(0.5 * DBSCAN_EPS_KM / R_TERRA_KM)
+DESLOCAMENTOS_CELULAS_VIZINHAS = tuple(itertools.product((-1, 0, 1), repeat=3))
+
+CONFIG_REFINAMENTO_INCREMENTAL = {
+    "MIN_ALERTAS_PARA_HOTSPOT_REFINADO": REFINEMENT_MIN_ALERTS_FOR_HOTSPOT,
+    "PORCENTAGEM_PARA_SEVERIDADE_PREDOMINANTE": REFINEMENT_PORC_SEVERIDADE_PREDOMINANTE,
+    "PORCENTAGEM_ALTA_EM_MEDIA_PARA_HOTSPOT": REFINEMENT_PORC_ALTA_EM_MEDIA,
+}
+
+
+def _celula(xyz: np.ndarray) -> Tuple[int, int, int]:
+    return tuple(np.floor(xyz / LADO_CELULA_CORDA).astype(np.int64).tolist())
+
+
+class EstadoClusteringIncremental:
+    """Estado do clustering incremental. Todas as operações públicas são serializadas por um lock."""
+
+    def __init__(self, ttl_segundos: float, min_amostras: int = DBSCAN_MIN_SAMPLES, eps_km: float = DBSCAN_EPS_KM):
+        self.ttl_segundos = ttl_segundos
+        self.min_amostras = min_amostras
+        self.eps_rad = eps_km / R_TERRA_KM
+        self._lock = threading.RLock()
+        self._reiniciar()
+
+    def limpar(self):
+        with self._lock:
+            self._reiniciar()
+
+    def _reiniciar(self):
+        self._alertas: Dict[int, dict] = {}
+        self._coordenadas_rad: Dict[int, Tuple[float, float]] = {}
+        self._celulas: Dict[Tuple[int, int, int], Set[int]] = {}
+        self._vizinhos: Dict[int, Set[int]] = {}
+        self._rotulos: Dict[int, int] = {}
+        self._membros_cluster: Dict[int, Set[int]] = {}
+        self._hotspots: Dict[str, dict] = {}
+        self._expiracoes: List[Tuple[float, int, int]] = []
+        self._sequencia = itertools.count()
+        self._proximo_rotulo = 0
+        self.versao_estado = 0
+
+    @property
+    def quantidade_alertas(self) -> int:
+        return len(self._alertas)
+
+    def _eh_core(self, alert_id: int) -> bool:
+        return len(self._vizinhos[alert_id]) + 1 >= self.min_amostras
+
+    # --- Índice espacial e grafo de vizinhança ---------------------------------------------
+
+    def _calcular_expiracao(self, alerta: AlertItemForClustering, referencia_epoch: float) -> float:
+        """Instante de expiração: `timestampReporte` + TTL, ou o instante de chegada + TTL se não houver timestamp."""
+        instante = converter_timestamp_para_epoch(alerta.timestampReporte)
+        return (instante if instante is not None else referencia_epoch) + self.ttl_segundos
+
+    def _inserir(self, alerta: AlertItemForClustering, expira_em: float, chegada_epoch: float) -> int:
+        alert_id = alerta.alertId
+        lat_rad, lon_rad = np.radians(alerta.latitude), np.radians(alerta.longitude)
+        xyz = np.array([np.cos(lat_rad) * np.cos(lon_rad), np.cos(lat_rad) * np.sin(lon_rad), np.sin(lat_rad)])
+        celula = _celula(xyz)
+        sequencia = next(self._sequencia)
+
+        self._alertas[alert_id] = {
+            **alerta.model_dump(), "_celula": celula, "_sequencia": sequencia, "_expiraEm": expira_em, "_chegadaEm": chegada_epoch
+        }
+        self._coordenadas_rad[alert_id] = (float(lat_rad), float(lon_rad))
+        self._celulas.setdefault(celula, set()).add(alert_id)
+        self._vizinhos[alert_id] = set()
+        heapq.heappush(self._expiracoes, (expira_em, sequencia, alert_id))
+        return alert_id
+
+    def _conectar_novos(self, novos_ids: List[int]):
+        """Liga os alertas novos aos vizinhos a até eps, agrupando o cálculo de distâncias por célula."""
+        novos_por_celula: Dict[Tuple[int, int, int], List[int]] = {}
+        for alert_id in novos_ids:
+            novos_por_celula.setdefault(self._alertas[alert_id]["_celula"], []).append(alert_id)
+        novos = set(novos_ids)
+
+        for (cx, cy, cz), ids_celula in novos_por_celula.items():
+            candidatos = [
+                candidato
+                for dx, dy, dz in DESLOCAMENTOS_CELULAS_VIZINHAS
+                for candidato in self._celulas.get((cx + dx, cy + dy, cz + dz), ())
+            ]
+            coordenadas_celula = np.array([self._coordenadas_rad[alert_id] for alert_id in ids_celula])
+            coordenadas_candidatos = np.array([self._coordenadas_rad[candidato] for candidato in candidatos])
+            vizinhos = self._distancias_rad(coordenadas_celula, coordenadas_candidatos) <= self.eps_rad
+            for linha, coluna in zip(*np.nonzero(vizinhos)):
+                alert_id, candidato = ids_celula[linha], candidatos[coluna]
+                # Pares entre dois alertas novos aparecem duas vezes; a aresta é a mesma.
+                if alert_id != candidato and (candidato not in novos or alert_id < candidato):
+                    self._vizinhos[alert_id].add(candidato)
+                    self._vizinhos[candidato].add(alert_id)
+
+    @staticmethod
+    def _distancias_rad(origens: np.ndarray, destinos: np.ndarray) -> np.ndarray:
+        lat_o, lon_o = origens[:, :1], origens[:, 1:]
+        lat_d, lon_d = destinos[:, 0], destinos[:, 1]
+        sen_dlat = np.sin(0.5 * (lat_o - lat_d))
+        sen_dlon = np.sin(0.5 * (lon_o - lon_d))
+        return 2.0 * np.arcsin(np.sqrt(sen_dlat * sen_dlat + np.cos(lat_o) * np.cos(lat_d) * sen_dlon * sen_dlon))
+
+    def _remover(self, alert_id: int) -> Set[int]:
+        """Remove o alerta do índice e do grafo. Retorna os vizinhos que ele tinha."""
+        alerta = self._alertas.pop(alert_id)
+        del self._coordenadas_rad[alert_id]
+        celula = self._celulas[alerta["_celula"]]
+        celula.discard(alert_id)
+        if not celula:
+            del self._celulas[alerta["_celula"]]
+        vizinhos = self._vizinhos.pop(alert_id)
+        for vizinho in vizinhos:
+            self._vizinhos[vizinho].discard(alert_id)
+        rotulo = self._rotulos.pop(alert_id)
+        if rotulo != ROTULO_RUIDO:
+            self._membros_cluster[rotulo].discard(alert_id)
+        return vizinhos
+
+    def _expirados(self, referencia_epoch: float) -> List[int]:
+        expirados = []
+        while self._expiracoes and self._expiracoes[0][0] <= referencia_epoch:
+            _, sequencia, alert_id = heapq.heappop(self._expiracoes)
+            alerta = self._alertas.get(alert_id)
+            # Entradas de alertas já removidos ou reenviados ficam no heap e são descartadas aqui.
+            if alerta is not None and alerta["_sequencia"] == sequencia:
+                expirados.append(alert_id)
+        return expirados
+
+    # --- Atualização incremental -------------------------------------------------------------
+
+    def aplicar(
+        self,
+        alertas_adicionados: Iterable[AlertItemForClustering],
+        ids_removidos: Iterable[int] = (),
+        referencia_epoch: Optional[float] = None
+    ) -> dict:
+        """
+        Aplica adições, remoções e a expiração por `timestampReporte` (TTL contado a partir de
+        `referencia_epoch`, por padrão o instante atual) e retorna o delta resultante.
+        Um alerta reenviado com um `alertId` já ativo substitui o anterior.
+        """
+        if referencia_epoch is None:
+            referencia_epoch = datetime.now(timezone.utc).timestamp()
+        alertas_adicionados = list(alertas_adicionados)
+
+        with self._lock:
+            adicionados_por_id = {alerta.alertId: alerta for alerta in alertas_adicionados}
+            expiracoes_adicionados = {alert_id: self._calcular_expiracao(alerta, referencia_epoch) for alert_id, alerta in adicionados_por_id.items()}
+
+            # Reenvios são tratados como remoção seguida de inserção.
+            a_remover = [alert_id for alert_id in {*ids_removidos, *adicionados_por_id} if alert_id in self._alertas]
+            a_remover += [alert_id for alert_id in self._expirados(referencia_epoch) if alert_id not in a_remover]
+
+            rotulos_anteriores: Dict[int, int] = {}
+            afetados: Set[int] = set()
+            for alert_id in a_remover:
+                rotulos_anteriores[alert_id] = self._rotulos[alert_id]
+                afetados |= self._remover(alert_id)
+
+            # Alertas que chegam já expirados não entram no estado.
+            novos_ids = [
+                self._inserir(alerta, expiracoes_adicionados[alert_id], referencia_epoch)
+                for alert_id, alerta in adicionados_por_id.items()
+                if expiracoes_adicionados[alert_id] > referencia_epoch
+            ]
+            self._conectar_novos(novos_ids)
+            for alert_id in novos_ids:
+                afetados.add(alert_id)
+                afetados |= self._vizinhos[alert_id]
+            afetados &= self._alertas.keys()
+
+            rotulos_tocados = {rotulo for rotulo in rotulos_anteriores.values() if rotulo != ROTULO_RUIDO}
+            rotulos_tocados |= {self._rotulos[alert_id] for alert_id in afetados if self._rotulos.get(alert_id, ROTULO_RUIDO) != ROTULO_RUIDO}
+            alteracoes_rotulos, rotulos_recalculados = self._reclassificar(afetados, rotulos_tocados)
+
+            for alert_id in novos_ids:
+                if rotulos_anteriores.get(alert_id) != self._rotulos[alert_id]:
+                    alteracoes_rotulos[alert_id] = self._rotulos[alert_id]
+            removidos_definitivamente = [alert_id for alert_id in rotulos_anteriores if alert_id not in self._alertas]
+            hotspots_atualizados, hotspots_removidos = self._atualizar_hotspots(rotulos_recalculados | rotulos_tocados)
+            self.versao_estado += 1
+
+            return {
+                "stateVersion": self.versao_estado,
+                "activeAlerts": len(self._alertas),
+                "changedLabels": [
+                    {"alertId": alert_id, "clusterLabel": rotulo} for alert_id, rotulo in sorted(alteracoes_rotulos.items())
+                ],
+                "removedAlertIds": sorted(removidos_definitivamente),
+                "updatedHotspots": hotspots_atualizados,
+                "removedHotspotIds": hotspots_removidos,
+            }
+
+    def _reclassificar(self, afetados: Set[int], rotulos_tocados: Set[int]) -> Tuple[Dict[int, int], Set[int]]:
+        """
+        Recalcula os componentes de pontos core alcançáveis a partir dos alertas afetados e dos
+        clusters tocados, reaproveitando rótulos antigos. Retorna ({alertId: novo rótulo} dos
+        alertas cujo rótulo mudou, rótulos antigos e novos envolvidos).
+        """
+        sementes = [alert_id for alert_id in afetados if self._eh_core(alert_id)]
+        for rotulo in rotulos_tocados:
+            sementes.extend(alert_id for alert_id in self._membros_cluster.get(rotulo, ()) if self._eh_core(alert_id))
+
+        componentes: List[List[int]] = []
+        visitados: Set[int] = set()
+        for semente in sementes:
+            if semente in visitados:
+                continue
+            visitados.add(semente)
+            componente, pilha = [], [semente]
+            while pilha:
+                atual = pilha.pop()
+                componente.append(atual)
+                for vizinho in self._vizinhos[atual]:
+                    if vizinho not in visitados and self._eh_core(vizinho):
+                        visitados.add(vizinho)
+                        pilha.append(vizinho)
+            componentes.append(componente)
+
+        # Clusters antigos alcançados pela busca (ex.: fusões) também têm as bordas recalculadas.
+        rotulos_envolvidos = set(rotulos_tocados)
+        rotulos_envolvidos |= {self._rotulos[alert_id] for alert_id in visitados if self._rotulos.get(alert_id, ROTULO_RUIDO) != ROTULO_RUIDO}
+        regiao = set(afetados) | visitados
+        for rotulo in rotulos_envolvidos:
+            regiao |= self._membros_cluster.get(rotulo, set())
+        for alert_id in visitados:
+            regiao.update(self._vizinhos[alert_id])
+
+        # Rótulos estáveis: o maior componente herda o rótulo antigo mais frequente entre seus cores.
+        novos_rotulos: Dict[int, int] = {}
+        rotulos_usados: Set[int] = set()
+        for componente in sorted(componentes, key=len, reverse=True):
+            contagem_rotulos: Dict[int, int] = {}
+            for alert_id in componente:
+                rotulo = self._rotulos.get(alert_id, ROTULO_RUIDO)
+                if rotulo != ROTULO_RUIDO and rotulo not in rotulos_usados:
+                    contagem_rotulos[rotulo] = contagem_rotulos.get(rotulo, 0) + 1
+            if contagem_rotulos:
+                rotulo_componente = min(contagem_rotulos, key=lambda rotulo: (-contagem_rotulos[rotulo], rotulo))
+            else:
+                rotulo_componente = self._proximo_rotulo
+                self._proximo_rotulo += 1
+            rotulos_usados.add(rotulo_componente)
+            for alert_id in componente:
+                novos_rotulos[alert_id] = rotulo_componente
+
+        for alert_id in regiao:
+            if alert_id in novos_rotulos:
+                continue
+            rotulos_cores_vizinhos = [
+                novos_rotulos.get(vizinho, self._rotulos.get(vizinho, ROTULO_RUIDO))
+                for vizinho in self._vizinhos[alert_id] if self._eh_core(vizinho)
+            ]
+            novos_rotulos[alert_id] = min(rotulos_cores_vizinhos) if rotulos_cores_vizinhos else ROTULO_RUIDO
+
+        alteracoes = {}
+        for alert_id, rotulo in novos_rotulos.items():
+            rotulo_anterior = self._rotulos.get(alert_id)
+            if rotulo_anterior == rotulo:
+                continue
+            if rotulo_anterior is not None and rotulo_anterior != ROTULO_RUIDO:
+                self._membros_cluster[rotulo_anterior].discard(alert_id)
+                rotulos_envolvidos.add(rotulo_anterior)
+            if rotulo != ROTULO_RUIDO:
+                self._membros_cluster.setdefault(rotulo, set()).add(alert_id)
+                rotulos_envolvidos.add(rotulo)
+            self._rotulos[alert_id] = rotulo
+            if rotulo_anterior is not None:
+                alteracoes[alert_id] = rotulo
+        for rotulo in rotulos_envolvidos:
+            if not self._membros_cluster.get(rotulo, True):
+                del self._membros_cluster[rotulo]
+
+        return alteracoes, rotulos_envolvidos | rotulos_usados
+
+    # --- Hotspots ----------------------------------------------------------------------------
+
+    def _atualizar_hotspots(self, rotulos: Set[int]) -> Tuple[List[dict], List[str]]:
+        """Recalcula os hotspots dos clusters indicados. Retorna (hotspots novos ou alterados, ids removidos)."""
+        rotulos = {rotulo for rotulo in rotulos if rotulo != ROTULO_RUIDO}
+        anteriores = {
+            hotspot_id: hotspot for hotspot_id, hotspot in self._hotspots.items() if hotspot["clusterLabel"] in rotulos
+        }
+        for hotspot_id in anteriores:
+            del self._hotspots[hotspot_id]
+
+        recalculados = self._calcular_hotspots([rotulo for rotulo in rotulos if rotulo in self._membros_cluster])
+        atualizados = []
+        for hotspot in recalculados:
+            self._hotspots[hotspot["hotspotId"]] = hotspot
+            if anteriores.get(hotspot["hotspotId"]) != hotspot:
+                atualizados.append(hotspot)
+        removidos = sorted(hotspot_id for hotspot_id in anteriores if hotspot_id not in self._hotspots)
+        return atualizados, removidos
+
+    def _calcular_hotspots(self, rotulos: List[int]) -> List[dict]:
+        if not rotulos:
+            return []
+        ids = sorted(
+            (alert_id for rotulo in rotulos for alert_id in self._membros_cluster[rotulo]),
+            key=lambda alert_id: self._alertas[alert_id]["_sequencia"]
+        )
+        colunas = ("alertId", "latitude", "longitude", "severityIA", "typeIA", "timestampReporte")
+        df_alertas = pd.DataFrame({coluna: [self._alertas[alert_id][coluna] for alert_id in ids] for coluna in colunas})
+        df_alertas['cluster_id_dbscan'] = [self._rotulos[alert_id] for alert_id in ids]
+
+        hotspots = refinar_e_caracterizar_hotspots_para_api(df_alertas, CONFIG_REFINAMENTO_INCREMENTAL)
+        for hotspot in hotspots:
+            # O refinamento numera os hotspots sequencialmente; aqui o rótulo é o do cluster, estável entre atualizações.
+            hotspot["clusterLabel"] = self._rotulos[hotspot["alertIdsInCluster"][0]]
+            hotspot["hotspotId"] = f"{hotspot['clusterLabel']}:{hotspot['dominantType']}"
+            # Sem nenhum `timestampReporte`, o refinamento usaria o instante do cálculo, e o hotspot
+            # apareceria como alterado em todo delta; aqui vale a última chegada dos seus alertas.
+            alertas_hotspot = [self._alertas[alert_id] for alert_id in hotspot["alertIdsInCluster"]]
+            if not any(alerta["timestampReporte"] for alerta in alertas_hotspot):
+                ultima_chegada = max(alerta["_chegadaEm"] for alerta in alertas_hotspot)
+                hotspot["lastActivityTimestamp"] = datetime.fromtimestamp(ultima_chegada, timezone.utc).isoformat()
+        return hotspots
+
+    # --- Consulta ----------------------------------------------------------------------------
+
+    def instantaneo(self, referencia_epoch: Optional[float] = None) -> dict:
+        """
+        Estado completo (todos os rótulos e hotspots), para ressincronização do cliente. Antes,
+        expira os alertas vencidos em `referencia_epoch` (por padrão o instante atual), como `aplicar`.
+        """
+        if referencia_epoch is None:
+            referencia_epoch = datetime.now(timezone.utc).timestamp()
+        with self._lock:
+            if self._expiracoes and self._expiracoes[0][0] <= referencia_epoch:
+                self.aplicar((), (), referencia_epoch)
+            return {
+                "stateVersion": self.versao_estado,
+                "activeAlerts": len(self._alertas),
+                "clusteringResults": [
+                    {"alertId": alert_id, "clusterLabel": rotulo} for alert_id, rotulo in sorted(self._rotulos.items())
+                ],
+                "hotspots": sorted(self._hotspots.values(), key=lambda hotspot: hotspot["hotspotId"]),
+            }
+
+
+estado_clustering_incremental = EstadoClusteringIncremental(ttl_segundos=settings.INCREMENTAL_CLUSTERING_TTL_SECONDS)
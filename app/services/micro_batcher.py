@@ -0,0 +1,132 @@
+import asyncio
+from typing import Callable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.executor import PoolLimitado, ServicoSobrecarregadoError, pool_inferencia
+from app.core.metrics import observar_tamanho_lote, registro_metricas
+from app.services.classification_service import obter_predicoes_classificacao_lote
+
+
+class MicroBatcherClassificacao:
+    """
+    Agrupa requisições concorrentes de classificação de um único texto em lotes.
+    O primeiro texto que chega a uma fila vazia abre uma janela de `janela_ms`; o lote é
+    despachado quando a janela expira ou quando `max_lote` textos foram acumulados.
+    Cada lote passa uma única vez pelos vetorizadores e modelos e o futuro de cada
+    chamador é resolvido com a sua própria predição.
+    """
+
+    def __init__(
+        self,
+        funcao_lote: Callable[[List[str]], List[dict]],
+        pool: PoolLimitado,
+        janela_ms: float,
+        max_lote: int,
+        max_fila: int
+    ):
+        self.funcao_lote = funcao_lote
+        self.pool = pool
+        self.janela_s = janela_ms / 1000.0
+        self.max_lote = max(1, max_lote)
+        self.max_fila = max_fila
+        self._fila: List[Tuple[str, asyncio.Future]] = []
+        self._tem_itens: Optional[asyncio.Event] = None
+        self._lote_cheio: Optional[asyncio.Event] = None
+        self._tarefa_coletora: Optional[asyncio.Task] = None
+        self._tarefas_lote: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def tamanho_fila(self) -> int:
+        return len(self._fila)
+
+    def iniciar(self):
+        loop = asyncio.get_running_loop()
+        if self._tarefa_coletora is not None and self._loop is loop and not self._tarefa_coletora.done():
+            return
+        self._loop = loop
+        self._tem_itens = asyncio.Event()
+        self._lote_cheio = asyncio.Event()
+        if self._fila:
+            self._tem_itens.set()
+        self._tarefa_coletora = loop.create_task(self._coletar_lotes())
+
+    async def encerrar(self):
+        if self._tarefa_coletora is not None:
+            self._tarefa_coletora.cancel()
+            try:
+                await self._tarefa_coletora
+            except asyncio.CancelledError:
+                pass
+            self._tarefa_coletora = None
+        if self._tarefas_lote:
+            await asyncio.gather(*self._tarefas_lote, return_exceptions=True)
+        for _, futuro in self._fila:
+            if not futuro.done():
+                futuro.set_exception(ServicoSobrecarregadoError("Aplicativo encerrando."))
+        self._fila.clear()
+
+    async def classificar(self, texto: str) -> dict:
+        if len(self._fila) >= self.max_fila:
+            raise ServicoSobrecarregadoError(
+                f"Fila de micro-batching saturada ({len(self._fila)} textos aguardando). Tente novamente em instantes."
+            )
+        self.iniciar()
+        futuro = self._loop.create_future()
+        self._fila.append((texto, futuro))
+        self._tem_itens.set()
+        if len(self._fila) >= self.max_lote:
+            self._lote_cheio.set()
+        return await futuro
+
+    async def _coletar_lotes(self):
+        while True:
+            await self._tem_itens.wait()
+            if len(self._fila) < self.max_lote:
+                try:
+                    await asyncio.wait_for(self._lote_cheio.wait(), timeout=self.janela_s)
+                except asyncio.TimeoutError:
+                    pass
+
+            lote = self._fila[:self.max_lote]
+            del self._fila[:self.max_lote]
+            if not self._fila:
+                self._tem_itens.clear()
+            if len(self._fila) < self.max_lote:
+                self._lote_cheio.clear()
+
+            lote = [(texto, futuro) for texto, futuro in lote if not futuro.done()]
+            if not lote:
+                continue
+            tarefa = asyncio.create_task(self._processar_lote(lote))
+            self._tarefas_lote.add(tarefa)
+            tarefa.add_done_callback(self._tarefas_lote.discard)
+
+    async def _processar_lote(self, lote: List[Tuple[str, asyncio.Future]]):
+        observar_tamanho_lote("micro_batch", len(lote))
+        try:
+            resultados = await self.pool.executar(self.funcao_lote, [texto for texto, _ in lote])
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+
+micro_batcher_classificacao = MicroBatcherClassificacao(
+    obter_predicoes_classificacao_lote,
+    pool_inferencia,
+    janela_ms=settings.MICRO_BATCH_WINDOW_MS,
+    max_lote=settings.MICRO_BATCH_MAX_SIZE,
+    max_fila=settings.MICRO_BATCH_MAX_QUEUE
+)
+
+registro_metricas.coletada(
+    "redalert_micro_batch_queue_size",
+    "Textos aguardando a janela do micro-batcher.",
+    "gauge",
+    lambda: [({}, micro_batcher_classificacao.tamanho_fila)]
+)
@@ -0,0 +1,220 @@
+"""
+Particionamento do clustering de `/ia/cluster_alerts`.
+
+Os alertas são divididos em partições clusterizadas de forma independente (e em paralelo, num
+pool de threads) pelo motor de `settings.CLUSTERING_ENGINE`:
+
+* `regionKey`: alertas de regiões diferentes (cidades, clientes) nunca formam o mesmo cluster.
+  Alertas sem `regionKey` ficam juntos, numa região própria.
+* Janela de tempo (`CLUSTERING_TIME_WINDOW_SECONDS`, 0 desliga): janelas fixas alinhadas à epoch
+  (UTC), pelo `timestampReporte`. Alertas sem timestamp válido ficam numa janela própria.
+* Áreas geográficas separadas: células grossas (`CLUSTERING_PARTITION_CELL_KM`) ocupadas e
+  vizinhas são unidas em componentes. Dois alertas a até eps estão sempre na mesma célula ou em
+  células vizinhas, então essa divisão não muda nenhum cluster; ela só separa áreas distantes
+  (ex.: cidades diferentes) para serem processadas em paralelo. Componentes pequenos da mesma
+  região e janela são reagrupados em partições de cerca de `CLUSTERING_PARTITION_TARGET_ALERTS`.
+
+As partições rodam num pool de threads (`CLUSTERING_PARTITION_THREADS`; ver
+`quantidade_threads_particoes`). O BallTree libera o GIL na consulta de vizinhos, mas o restante
+do DBSCAN (numpy/pandas sobre os vizinhos) não, então o ganho com threads é parcial.
+
+Os rótulos de cada partição são deslocados para serem únicos no resultado: as partições são
+percorridas pela ordem de primeira aparição e cada uma numera seus clusters a partir do fim da
+anterior. Com uma única partição, o resultado é exatamente o do motor sobre todos os alertas.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from app.core import workers
+from app.core.config import settings
+from app.services.clustering_engines import R_TERRA_KM, MotorClustering
+
+# Margem sobre o lado mínimo das células (como em `MotorGradeProjetada.FOLGA_CELULA`).
+FOLGA_CELULA = 1.01
+# Acima desta latitude as células de longitude ficam largas demais; não há divisão geográfica.
+LATITUDE_MAXIMA_DIVISAO = 80.0
+# Células vizinhas "para frente" (linha, coluna): cada par de células é ligado uma única vez.
+DESLOCAMENTOS_CELULAS = ((0, 1), (1, -1), (1, 0), (1, 1))
+# Limite de threads do modo automático (`CLUSTERING_PARTITION_THREADS=0`).
+MAXIMO_THREADS_AUTOMATICO = 4
+
+_pool_particoes: Optional[ThreadPoolExecutor] = None
+_lock_pool = threading.Lock()
+
+
+def converter_timestamp_para_epoch(timestamp: Optional[str]) -> Optional[float]:
+    """Converte um timestamp ISO 8601 (sem fuso = UTC) em segundos desde a epoch; None se ausente ou inválido."""
+    if not timestamp:
+        return None
+    try:
+        instante = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    if instante.tzinfo is None:
+        instante = instante.replace(tzinfo=timezone.utc)
+    return instante.timestamp()
+
+
+def quantidade_threads_particoes() -> int:
+    """
+    `settings.CLUSTERING_PARTITION_THREADS`, ou, se for 0, os núcleos divididos entre os workers do
+    lançador (até `MAXIMO_THREADS_AUTOMATICO`). Num processo do pool de clustering
+    (`CLUSTERING_PROCESS_WORKERS`), que já roda em paralelo com os outros, o automático é 1.
+    """
+    if settings.CLUSTERING_PARTITION_THREADS > 0:
+        return settings.CLUSTERING_PARTITION_THREADS
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return max(1, min(MAXIMO_THREADS_AUTOMATICO, workers.nucleos_disponiveis() // workers.QUANTIDADE_WORKERS))
+
+
+def _obter_pool_particoes() -> ThreadPoolExecutor:
+    global _pool_particoes
+    with _lock_pool:
+        if _pool_particoes is None:
+            _pool_particoes = ThreadPoolExecutor(max_workers=quantidade_threads_particoes(), thread_name_prefix="particao_clustering")
+        return _pool_particoes
+
+
+def encerrar_pools_particoes():
+    global _pool_particoes
+    with _lock_pool:
+        if _pool_particoes is not None:
+            _pool_particoes.shutdown(wait=True, cancel_futures=True)
+        _pool_particoes = None
+
+
+def componentes_geograficos(latitudes: np.ndarray, longitudes: np.ndarray, lado_km: float) -> np.ndarray:
+    """
+    Componente (0, 1, ...) de cada alerta: células de lado >= `lado_km` ocupadas e vizinhas
+    (8 vizinhas, com a volta do antimeridiano) pertencem ao mesmo componente. Alertas a até
+    `lado_km` de distância estão sempre no mesmo componente.
+    """
+    n_pontos = len(latitudes)
+    latitude_maxima = float(np.abs(latitudes).max())
+    angulo = lado_km / R_TERRA_KM
+    # Diferença máxima de longitude entre dois pontos a até `lado_km`, com |lat| <= latitude_maxima:
+    # pela fórmula haversine, sen(dlon/2) <= sen(angulo/2) / cos(lat).
+    seno_lon = np.sin(0.5 * angulo) / np.cos(np.radians(latitude_maxima))
+    if latitude_maxima > LATITUDE_MAXIMA_DIVISAO or seno_lon >= 1.0:
+        return np.zeros(n_pontos, dtype=np.int64)
+    largura_lat = np.degrees(angulo) * FOLGA_CELULA
+    # Colunas de largura igual (>= o mínimo) cobrindo os 360°, para a vizinhança dar a volta.
+    n_colunas = int(360.0 // (np.degrees(2.0 * np.arcsin(seno_lon)) * FOLGA_CELULA))
+    if n_colunas < 3:
+        return np.zeros(n_pontos, dtype=np.int64)
+    largura_lon = 360.0 / n_colunas
+
+    celulas_y = np.floor((np.asarray(latitudes, dtype=np.float64) + 90.0) / largura_lat).astype(np.int64)
+    celulas_x = np.floor((np.asarray(longitudes, dtype=np.float64) + 180.0) / largura_lon).astype(np.int64) % n_colunas
+    chaves_celulas, celula_do_ponto = np.unique(celulas_y * n_colunas + celulas_x, return_inverse=True)
+    n_celulas = len(chaves_celulas)
+    if n_celulas == 1:
+        return np.zeros(n_pontos, dtype=np.int64)
+
+    linhas, colunas = chaves_celulas // n_colunas, chaves_celulas % n_colunas
+    origens, destinos = [], []
+    for dy, dx in DESLOCAMENTOS_CELULAS:
+        alvos = (linhas + dy) * n_colunas + (colunas + dx) % n_colunas
+        posicoes = np.minimum(np.searchsorted(chaves_celulas, alvos), n_celulas - 1)
+        existe = chaves_celulas[posicoes] == alvos
+        origens.append(np.flatnonzero(existe))
+        destinos.append(posicoes[existe])
+    origens, destinos = np.concatenate(origens), np.concatenate(destinos)
+    grafo = coo_matrix((np.ones(len(origens), dtype=np.int8), (origens, destinos)), shape=(n_celulas, n_celulas)).tocsr()
+    _, componente_da_celula = connected_components(grafo, directed=False)
+    return componente_da_celula[celula_do_ponto].astype(np.int64)
+
+
+def _combinar_codigos(codigos: np.ndarray, outros: np.ndarray) -> np.ndarray:
+    """Códigos (0, 1, ... por primeira aparição) dos pares (codigos, outros)."""
+    return pd.factorize(codigos * (int(outros.max()) + 1) + outros)[0]
+
+
+def codigos_particoes(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    eps_km: float,
+    regioes: Optional[Sequence[Optional[str]]] = None,
+    timestamps: Optional[Sequence[Optional[str]]] = None,
+) -> np.ndarray:
+    """Partição (0, 1, ... por ordem de primeira aparição) de cada alerta."""
+    n_pontos = len(latitudes)
+    grupos = np.zeros(n_pontos, dtype=np.int64)
+    if regioes is not None and any(regiao is not None for regiao in regioes):
+        grupos = pd.factorize(pd.Series(regioes, dtype=object), use_na_sentinel=False)[0]
+    janela = settings.CLUSTERING_TIME_WINDOW_SECONDS
+    if janela > 0 and timestamps is not None:
+        epochs = np.array([converter_timestamp_para_epoch(timestamp) for timestamp in timestamps], dtype=np.float64)
+        grupos = _combinar_codigos(grupos, pd.factorize(np.floor(epochs / janela), use_na_sentinel=False)[0])
+
+    alvo = settings.CLUSTERING_PARTITION_TARGET_ALERTS
+    lado_km = settings.CLUSTERING_PARTITION_CELL_KM
+    if lado_km <= 0 or n_pontos <= alvo:
+        return pd.factorize(grupos)[0]
+
+    # Pedaços = (grupo, componente geográfico); os de um mesmo grupo são reagrupados em blocos
+    # consecutivos de ~`alvo` alertas (um pedaço nunca é dividido).
+    pedaco_do_ponto = _combinar_codigos(grupos, componentes_geograficos(latitudes, longitudes, max(lado_km, eps_km)))
+    tamanho_pedaco = np.bincount(pedaco_do_ponto)
+    _, primeiro_ponto_pedaco = np.unique(pedaco_do_ponto, return_index=True)
+    grupo_do_pedaco = grupos[primeiro_ponto_pedaco]
+    ordem = np.argsort(grupo_do_pedaco, kind='stable')
+    tamanhos_ordenados, grupos_ordenados = tamanho_pedaco[ordem], grupo_do_pedaco[ordem]
+    alertas_antes = np.cumsum(tamanhos_ordenados) - tamanhos_ordenados
+    inicio_grupo = np.flatnonzero(np.r_[True, grupos_ordenados[1:] != grupos_ordenados[:-1]])
+    alertas_antes -= np.repeat(alertas_antes[inicio_grupo], np.diff(np.r_[inicio_grupo, len(ordem)]))
+    bloco_do_pedaco = np.empty(len(ordem), dtype=np.int64)
+    bloco_do_pedaco[ordem] = alertas_antes // alvo
+    return _combinar_codigos(grupos, bloco_do_pedaco[pedaco_do_ponto])
+
+
+def rotular_particionado(
+    motor: MotorClustering,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    regioes: Optional[Sequence[Optional[str]]] = None,
+    timestamps: Optional[Sequence[Optional[str]]] = None,
+) -> np.ndarray:
+    """Rótulos de cluster de todos os alertas (-1 para ruído), clusterizando cada partição à parte."""
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    particoes = codigos_particoes(latitudes, longitudes, motor.eps_km, regioes, timestamps)
+    n_particoes = int(particoes.max()) + 1 if len(particoes) else 0
+    if n_particoes <= 1:
+        return motor.rotular(latitudes, longitudes)
+
+    ordem = np.argsort(particoes, kind='stable')
+    indices_particoes: List[np.ndarray] = np.split(ordem, np.cumsum(np.bincount(particoes))[:-1])
+    # Partições com menos de min_amostras alertas não têm pontos core: são só ruído.
+    indices_particoes = [indices for indices in indices_particoes if len(indices) >= motor.min_amostras]
+
+    rotular = lambda indices: motor.rotular(latitudes[indices], longitudes[indices])
+    if quantidade_threads_particoes() > 1 and len(indices_particoes) > 1:
+        pool = _obter_pool_particoes()
+        # As maiores primeiro, para equilibrar as threads.
+        futuros = {
+            posicao: pool.submit(rotular, indices_particoes[posicao])
+            for posicao in sorted(range(len(indices_particoes)), key=lambda posicao: -len(indices_particoes[posicao]))
+        }
+        rotulos_particoes = [futuros[posicao].result() for posicao in range(len(indices_particoes))]
+    else:
+        rotulos_particoes = [rotular(indices) for indices in indices_particoes]
+
+    rotulos = np.full(len(latitudes), -1, dtype=np.int64)
+    deslocamento = 0
+    for posicao, indices in enumerate(indices_particoes):
+        rotulos_particao = rotulos_particoes[posicao]
+        em_cluster = rotulos_particao >= 0
+        if em_cluster.any():
+            rotulos[indices[em_cluster]] = rotulos_particao[em_cluster] + deslocamento
+            deslocamento += int(rotulos_particao.max()) + 1
+    return rotulos
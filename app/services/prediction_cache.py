@@ -0,0 +1,213 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registro_metricas
+from app.ml.model_loader import registrar_callback_troca_modelos
+
+# Apenas espaços em branco ASCII são colapsados: eles sobrevivem intactos ao pré-processamento
+# e sempre separam tokens, então textos que diferem só nesses espaços têm a mesma predição.
+_REGEX_ESPACOS_ASCII = re.compile(r'[ \t\n\r\f\v]+')
+
+
+def normalizar_texto_para_cache(texto: str) -> str:
+    return _REGEX_ESPACOS_ASCII.sub(' ', texto.lower()).strip()
+
+
+def gerar_chave_cache(texto: str, versao_modelos: Optional[str]) -> str:
+    conteudo = f"{versao_modelos}\x00{normalizar_texto_para_cache(texto)}"
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+class BackendCacheCompartilhado(ABC):
+    """Interface de um cache compartilhado entre workers (ex.: Redis)."""
+
+    @abstractmethod
+    def obter(self, chave: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def gravar(self, chave: str, valor: dict, ttl_segundos: float):
+        ...
+
+
+class BackendCacheMemoria(BackendCacheCompartilhado):
+    """Implementação em memória do backend compartilhado, para testes e execução local."""
+
+    def __init__(self, relogio: Callable[[], float] = time.monotonic):
+        self._relogio = relogio
+        self._dados: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[dict]:
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None:
+                return None
+            expira_em, valor_serializado = entrada
+            if expira_em <= self._relogio():
+                del self._dados[chave]
+                return None
+        return json.loads(valor_serializado)
+
+    def gravar(self, chave: str, valor: dict, ttl_segundos: float):
+        with self._lock:
+            self._dados[chave] = (self._relogio() + ttl_segundos, json.dumps(valor))
+
+
+class BackendCacheRedis(BackendCacheCompartilhado):
+    """Backend Redis (dependência opcional: `pip install redis`)."""
+
+    def __init__(self, url: str, prefixo: str = "redalert:predicao:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("O backend 'redis' do cache de predições requer o pacote 'redis'.") from e
+        self._cliente = redis.Redis.from_url(url)
+        self._prefixo = prefixo
+
+    def obter(self, chave: str) -> Optional[dict]:
+        valor_serializado = self._cliente.get(self._prefixo + chave)
+        return json.loads(valor_serializado) if valor_serializado is not None else None
+
+    def gravar(self, chave: str, valor: dict, ttl_segundos: float):
+        self._cliente.set(self._prefixo + chave, json.dumps(valor), px=max(1, int(ttl_segundos * 1000)))
+
+
+class CachePredicoes:
+    """
+    Cache LRU com TTL das predições de classificação, indexado por `gerar_chave_cache`.
+    Opcionalmente consulta um backend compartilhado quando a entrada não está no cache local.
+    """
+
+    def __init__(
+        self,
+        max_itens: int,
+        ttl_segundos: float,
+        backend_compartilhado: Optional[BackendCacheCompartilhado] = None,
+        relogio: Callable[[], float] = time.monotonic
+    ):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self.backend_compartilhado = backend_compartilhado
+        self._relogio = relogio
+        self._entradas: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._contadores = {"hits": 0, "hitsCompartilhados": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def obter(self, chave: str) -> Optional[dict]:
+        agora = self._relogio()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                expira_em, valor = entrada
+                if expira_em > agora:
+                    self._entradas.move_to_end(chave)
+                    self._contadores["hits"] += 1
+                    return dict(valor)
+                del self._entradas[chave]
+                self._contadores["expirations"] += 1
+
+        if self.backend_compartilhado is not None:
+            try:
+                valor = self.backend_compartilhado.obter(chave)
+            except Exception as e:
+                print(f"Aviso: falha ao consultar o cache compartilhado de predições: {e}")
+                valor = None
+            if valor is not None:
+                self._gravar_local(chave, valor, agora)
+                with self._lock:
+                    self._contadores["hitsCompartilhados"] += 1
+                return dict(valor)
+
+        with self._lock:
+            self._contadores["misses"] += 1
+        return None
+
+    def gravar(self, chave: str, valor: dict):
+        self._gravar_local(chave, valor, self._relogio())
+        if self.backend_compartilhado is not None:
+            try:
+                self.backend_compartilhado.gravar(chave, valor, self.ttl_segundos)
+            except Exception as e:
+                print(f"Aviso: falha ao gravar no cache compartilhado de predições: {e}")
+
+    def _gravar_local(self, chave: str, valor: dict, agora: float):
+        with self._lock:
+            self._entradas[chave] = (agora + self.ttl_segundos, dict(valor))
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_itens:
+                self._entradas.popitem(last=False)
+                self._contadores["evictions"] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            estatisticas = dict(self._contadores)
+            estatisticas["tamanho"] = len(self._entradas)
+        consultas = estatisticas["hits"] + estatisticas["hitsCompartilhados"] + estatisticas["misses"]
+        estatisticas["hitRate"] = (estatisticas["hits"] + estatisticas["hitsCompartilhados"]) / consultas if consultas else 0.0
+        return estatisticas
+
+
+def criar_backend_compartilhado(nome_backend: str) -> Optional[BackendCacheCompartilhado]:
+    if not nome_backend:
+        return None
+    if nome_backend == "memory":
+        return BackendCacheMemoria()
+    if nome_backend == "redis":
+        return BackendCacheRedis(settings.PREDICTION_CACHE_REDIS_URL)
+    raise ValueError(f"Backend de cache de predições desconhecido: '{nome_backend}'.")
+
+
+cache_predicoes = CachePredicoes(
+    max_itens=settings.PREDICTION_CACHE_MAX_ITEMS,
+    ttl_segundos=settings.PREDICTION_CACHE_TTL_SECONDS,
+    backend_compartilhado=criar_backend_compartilhado(settings.PREDICTION_CACHE_SHARED_BACKEND)
+)
+
+registrar_callback_troca_modelos(lambda versao_anterior, versao_nova: cache_predicoes.limpar())
+
+def _amostras_hits_cache():
+    estatisticas = cache_predicoes.estatisticas()
+    return [({"tier": "local"}, estatisticas["hits"]), ({"tier": "shared"}, estatisticas["hitsCompartilhados"])]
+
+registro_metricas.coletada(
+    "redalert_prediction_cache_hits_total",
+    "Consultas ao cache de predições respondidas pelo cache local ou pelo compartilhado.",
+    "counter",
+    _amostras_hits_cache
+)
+registro_metricas.coletada(
+    "redalert_prediction_cache_misses_total",
+    "Consultas ao cache de predições sem resultado.",
+    "counter",
+    lambda: [({}, cache_predicoes.estatisticas()["misses"])]
+)
+registro_metricas.coletada(
+    "redalert_prediction_cache_evictions_total",
+    "Entradas removidas do cache local por falta de espaço.",
+    "counter",
+    lambda: [({}, cache_predicoes.estatisticas()["evictions"])]
+)
+registro_metricas.coletada(
+    "redalert_prediction_cache_entries",
+    "Entradas no cache local de predições.",
+    "gauge",
+    lambda: [({}, cache_predicoes.estatisticas()["tamanho"])]
+)
+registro_metricas.coletada(
+    "redalert_prediction_cache_hit_ratio",
+    "Fração das consultas ao cache de predições respondidas pelo cache, desde o início do processo.",
+    "gauge",
+    lambda: [({}, cache_predicoes.estatisticas()["hitRate"])]
+)
@@ -0,0 +1,49 @@
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # dependência opcional: sem ela, usa o json da biblioteca padrão
+    orjson = None
+
+
+def carregar_json(conteudo: bytes, exato: bool = False) -> Any:
+    """
+    Decodifica JSON com orjson, se instalado. Lança ValueError para JSON inválido.
+
+    O orjson lê inteiros acima de 64 bits como float e recusa NaN/Infinity; nesses casos (e com
+    `exato=True`) o resultado é o mesmo do json da biblioteca padrão, usado pelo FastAPI.
+    """
+    if orjson is not None and not exato:
+        try:
+            return orjson.loads(conteudo)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(conteudo)
+
+
+def serializar_json(objeto: Any) -> bytes:
+    """
+    Codifica em JSON compacto UTF-8. Sem orjson, produz os mesmos bytes da JSONResponse do
+    Starlette; com orjson, o mesmo JSON (só a grafia de alguns floats muda, ex.: 1e-05 -> 1e-5).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(objeto)
+        except TypeError:
+            # Inteiros acima de 64 bits (ex.: um alertId enorme) só são serializados pelo json.
+            pass
+    return json.dumps(objeto, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class RespostaJsonRapida(Response):
+    """Resposta JSON para conteúdo já em tipos nativos, sem passar pelo jsonable_encoder."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return serializar_json(content)
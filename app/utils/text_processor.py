@@ -1,35 +1,146 @@
-import nltk
 import unicodedata
 import re
-from nltk.corpus import stopwords
-from nltk.stem import RSLPStemmer
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
 
-try:
-    stopwords.words('portuguese')
-    RSLPStemmer()
-except LookupError:
-    nltk.download('stopwords', quiet=True)
-    nltk.download('rslp', quiet=True)
+from app.core.config import settings
 
-STOP_WORDS_PT = set(stopwords.words('portuguese'))
-STEMMER_PT = RSLPStemmer()
+# Recursos carregados no startup (ver inicializar_recursos_texto), e não na importação do módulo.
+# Com o dicionário de radicais (app/ml/dicionario_radicais.py), o stemmer RSLP só é usado para
+# palavras fora dele, mas é carregado e conferido no startup: nada é baixado durante requisições.
+STOP_WORDS_PT: Set[str] = set()
+STEMMER_PT = None
+DICIONARIO_RADICAIS = None
+_recursos_inicializados = False
+AMOSTRA_CONFERENCIA_DICIONARIO = 500
 
-def preprocessar_texto(texto: str) -> str:
-    if not isinstance(texto, str):
-        return ""
+def obter_stemmer_rslp(baixar: bool = True):
+    """Stemmer RSLP do NLTK, carregado (e, com `baixar`, baixado se necessário) na primeira chamada."""
+    global STEMMER_PT
+    if STEMMER_PT is None:
+        import nltk
+        from nltk.stem import RSLPStemmer
+
+        try:
+            STEMMER_PT = RSLPStemmer()
+        except LookupError:
+            if not baixar:
+                raise
+            nltk.download('rslp', quiet=True)
+            STEMMER_PT = RSLPStemmer()
+    return STEMMER_PT
+
+def carregar_stopwords_nltk() -> Set[str]:
+    import nltk
+    from nltk.corpus import stopwords
+
+    try:
+        return set(stopwords.words('portuguese'))
+    except LookupError:
+        nltk.download('stopwords', quiet=True)
+        return set(stopwords.words('portuguese'))
+
+def dicionario_confere_com_stemmer(dicionario, stemmer) -> bool:
+    """Confere uma amostra espaçada do dicionário com o stemmer (ex.: artefato gerado com outra versão do NLTK)."""
+    passo = max(1, len(dicionario) // AMOSTRA_CONFERENCIA_DICIONARIO)
+    return all(
+        stemmer.stem(palavra.decode('ascii')) == radical.decode('utf-8')
+        for palavra, radical in zip(dicionario.palavras[::passo].tolist(), dicionario.radicais[::passo].tolist())
+    )
+
+def inicializar_recursos_texto():
+    """
+    Carrega o stemmer RSLP, as stopwords e o dicionário de radicais, se existir
+    (`settings.STEM_DICTIONARY_FILENAME`). Com o dicionário, as stopwords vêm dele e o RSLP
+    precisa estar instalado (ex.: `NLTK_DATA` da imagem Docker); sem ele, stopwords e RSLP são
+    baixados se necessário. Um dicionário que diverge do RSLP é descartado.
+    """
+    global STOP_WORDS_PT, DICIONARIO_RADICAIS, _recursos_inicializados
+    if _recursos_inicializados:
+        return
+    from app.ml.dicionario_radicais import carregar_dicionario_radicais
+
+    dicionario = carregar_dicionario_radicais() if settings.STEM_DICTIONARY_ENABLED else None
+    stemmer = obter_stemmer_rslp(baixar=dicionario is None)
+    if dicionario is not None and not dicionario_confere_com_stemmer(dicionario, stemmer):
+        print("Aviso: o dicionário de radicais diverge do stemmer RSLP instalado. Usando apenas o stemmer RSLP.")
+        dicionario = None
+    if dicionario is not None:
+        STOP_WORDS_PT = set(dicionario.stopwords.tolist())
+    else:
+        STOP_WORDS_PT = carregar_stopwords_nltk()
+    DICIONARIO_RADICAIS = dicionario
+    _recursos_inicializados = True
+
+# Equivalente a re.sub(r'[^a-z0-9\s]', '', texto) para textos ASCII: remove todo caractere
+# ASCII que não seja letra minúscula, dígito ou espaço em branco.
+_REGEX_CARACTERES_REMOVIDOS = re.compile(r'[^a-z0-9\s]')
+_TABELA_REMOCAO_ASCII = str.maketrans('', '', ''.join(
+    caractere for caractere in map(chr, range(128)) if _REGEX_CARACTERES_REMOVIDOS.match(caractere)
+))
+
+@lru_cache(maxsize=settings.STEM_CACHE_SIZE)
+def stem_memoizado(palavra: str) -> str:
+    if DICIONARIO_RADICAIS is not None:
+        radical = DICIONARIO_RADICAIS.radical(palavra)
+        if radical is not None:
+            return radical
+    return STEMMER_PT.stem(palavra)
+
+def normalizar_palavras(texto: str) -> List[str]:
+    """Palavras do texto após lower, NFKD, remoção de não-ASCII e de pontuação (antes das stopwords e do RSLP)."""
     texto = texto.lower()
-    texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
-    texto = re.sub(r'[^a-z0-9\s]', '', texto)
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    tokens = texto.split()
-    tokens_processados = [STEMMER_PT.stem(palavra) for palavra in tokens if palavra not in STOP_WORDS_PT]
-    return " ".join(tokens_processados)
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
+    return texto.translate(_TABELA_REMOCAO_ASCII).split()
+
+def preprocessar_tokens(texto: str) -> List[str]:
+    """
+    Versão em passada única do pré-processamento: retorna os radicais na ordem do texto.
+    Produz exatamente os mesmos tokens que o pipeline original (lower, NFKD, remoção de
+    não-ASCII, regex de caracteres, colapso de espaços, stopwords e RSLP).
+    """
+    if not isinstance(texto, str):
+        return []
+    if not _recursos_inicializados:
+        raise RuntimeError("Recursos de texto não inicializados: chame inicializar_recursos_texto no startup.")
+    return [stem_memoizado(palavra) for palavra in normalizar_palavras(texto) if palavra not in STOP_WORDS_PT]
+
+def preprocessar_texto(texto: str) -> str:
+    return " ".join(preprocessar_tokens(texto))
 
 def contar_palavras_lexico(texto_processado: str, lexico_palavras: list) -> int:
     contador = 0
     if isinstance(texto_processado, str):
-        palavras_texto = texto_processado.split()
+        palavras_texto = set(texto_processado.split())
         for palavra_lexico in lexico_palavras:
             if palavra_lexico in palavras_texto:
                 contador += 1
     return contador
+
+def construir_indice_lexicos(lexicos: Dict[str, list], ordem_lexicos: List[str]) -> Dict[str, Tuple[int, ...]]:
+    """
+    Indexa os léxicos por palavra: cada entrada aponta para quantas vezes a palavra aparece
+    em cada léxico (na ordem de `ordem_lexicos`), preservando a contagem de entradas repetidas.
+    """
+    indice = {}
+    for posicao, nome_lexico in enumerate(ordem_lexicos):
+        for palavra_lexico in lexicos[nome_lexico]:
+            contagens = list(indice.get(palavra_lexico, (0,) * len(ordem_lexicos)))
+            contagens[posicao] += 1
+            indice[palavra_lexico] = tuple(contagens)
+    return indice
+
+def contar_lexicos(texto_processado: str, indice_lexicos: Dict[str, Tuple[int, ...]], quantidade_lexicos: int) -> List[int]:
+    """
+    Calcula, em uma única passada sobre os tokens, o mesmo resultado de chamar
+    `contar_palavras_lexico` para cada léxico indexado por `construir_indice_lexicos`.
+    """
+    contagens = [0] * quantidade_lexicos
+    if isinstance(texto_processado, str):
+        for palavra in set(texto_processado.split()):
+            contagens_palavra = indice_lexicos.get(palavra)
+            if contagens_palavra is not None:
+                for posicao, quantidade in enumerate(contagens_palavra):
+                    contagens[posicao] += quantidade
+    return contagens
@@ -0,0 +1,115 @@
+"""
+Mede o clustering particionado (`app/services/particionamento_clustering.py`) em alertas de
+várias cidades e confere que a divisão por áreas geográficas não muda os clusters:
+
+* inteiro: o motor configurado sobre todos os alertas, numa chamada;
+* particionado: uma chamada por partição, em sequência e no pool de threads (`--threads`).
+
+Os rótulos podem ser numerados de outra forma, mas os grupos de alertas, o ruído e os hotspots
+têm de ser os mesmos. Depois mostra o efeito de `regionKey` (uma região por cidade) e de uma
+janela de tempo de 1 hora sobre o número de clusters e hotspots.
+
+Uso: python -m benchmarks.bench_clustering_particionado [--cidades 8] [--tamanhos 10000 50000 200000] [--repeticoes 3] [--threads 4]
+"""
+import argparse
+import os
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.clustering_engines import MOTORES_CLUSTERING, criar_motor_clustering
+from app.services.clustering_service import DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES, realizar_clustering_colunas
+from app.services.particionamento_clustering import codigos_particoes, rotular_particionado
+from benchmarks.dados_sinteticos import gerar_alertas_clustering
+
+# Centros de capitais brasileiras (lat, lon).
+CENTROS_CIDADES = [
+    (-23.5505, -46.6333), (-22.9068, -43.1729), (-19.9167, -43.9345), (-25.4284, -49.2733),
+    (-30.0346, -51.2177), (-12.9714, -38.5014), (-8.0476, -34.8770), (-3.7319, -38.5267),
+]
+
+
+def gerar_colunas(quantidade: int, quantidade_cidades: int) -> dict:
+    alertas = []
+    for indice, centro in enumerate(CENTROS_CIDADES[:quantidade_cidades]):
+        quantidade_cidade = quantidade // quantidade_cidades
+        quantidade_isolados = quantidade_cidade // 10
+        alertas_cidade = gerar_alertas_clustering((quantidade_cidade - quantidade_isolados) // 12, quantidade_isolados, semente=indice, centro=centro)
+        for alerta in alertas_cidade:
+            alerta["regionKey"] = f"cidade-{indice}"
+        alertas += alertas_cidade
+    ordem = np.random.default_rng(quantidade).permutation(len(alertas))
+    alertas = [dict(alertas[i], alertId=alert_id) for alert_id, i in enumerate(ordem.tolist(), start=1)]
+    return {campo: [alerta[campo] for alerta in alertas] for campo in alertas[0]}
+
+
+def mesma_particao(rotulos_a: np.ndarray, rotulos_b: np.ndarray) -> bool:
+    """True se os dois rotulamentos formam os mesmos grupos e o mesmo ruído."""
+    return np.array_equal(rotulos_a < 0, rotulos_b < 0) and np.array_equal(pd.factorize(rotulos_a)[0], pd.factorize(rotulos_b)[0])
+
+
+def sem_horario_atual(hotspots):
+    # `lastActivityTimestamp` de grupos sem timestamp é o instante da chamada.
+    return [{campo: valor for campo, valor in hotspot.items() if campo != "lastActivityTimestamp"} for hotspot in hotspots]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cidades", type=int, default=8)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    threads = args.threads
+    print(f"{os.cpu_count()} núcleos")
+    settings.CLUSTERING_TIME_WINDOW_SECONDS = 0.0
+    for quantidade in args.tamanhos:
+        colunas = gerar_colunas(quantidade, args.cidades)
+        latitudes, longitudes = np.asarray(colunas["latitude"]), np.asarray(colunas["longitude"])
+        n_particoes = int(codigos_particoes(latitudes, longitudes, DBSCAN_EPS_KM).max()) + 1
+        print(f"N={len(latitudes):>8}: {n_particoes} partições geográficas")
+
+        for nome in MOTORES_CLUSTERING:
+            motor = criar_motor_clustering(nome, DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES)
+            rotulos_inteiro = motor.rotular(latitudes, longitudes)
+            rotulos_particionado = rotular_particionado(motor, latitudes, longitudes)
+            if not mesma_particao(rotulos_inteiro, rotulos_particionado):
+                raise SystemExit(f"ERRO: {nome}: o particionamento mudou os clusters.")
+
+            medir = lambda funcao: min(timeit.repeat(funcao, number=1, repeat=args.repeticoes)) * 1000
+            tempo_inteiro = medir(lambda: motor.rotular(latitudes, longitudes))
+            settings.CLUSTERING_PARTITION_THREADS = 1
+            tempo_sequencial = medir(lambda: rotular_particionado(motor, latitudes, longitudes))
+            settings.CLUSTERING_PARTITION_THREADS = threads
+            tempo_threads = medir(lambda: rotular_particionado(motor, latitudes, longitudes))
+            print(
+                f"    {nome:<20} inteiro {tempo_inteiro:9.1f} ms | particionado: sequencial {tempo_sequencial:9.1f} ms, "
+                f"{threads} threads {tempo_threads:9.1f} ms ({tempo_inteiro / tempo_threads:.1f}x)  [clusters idênticos]"
+            )
+
+        colunas_sem_regiao = dict(colunas, regionKey=[None] * len(latitudes))
+        resultados_base, hotspots_base = realizar_clustering_colunas(colunas_sem_regiao)
+        settings.CLUSTERING_PARTITION_CELL_KM = 0.0
+        resultados_inteiro, hotspots_inteiro = realizar_clustering_colunas(colunas_sem_regiao)
+        settings.CLUSTERING_PARTITION_CELL_KM = type(settings)().CLUSTERING_PARTITION_CELL_KM
+        rotulos_base = np.array([item["clusterLabel"] for item in resultados_base])
+        rotulos_sem_divisao = np.array([item["clusterLabel"] for item in resultados_inteiro])
+        if not mesma_particao(rotulos_base, rotulos_sem_divisao) or sem_horario_atual(hotspots_base) != sem_horario_atual(hotspots_inteiro):
+            raise SystemExit("ERRO: os hotspots mudaram com a divisão geográfica.")
+
+        _, hotspots_regioes = realizar_clustering_colunas(colunas)
+        settings.CLUSTERING_TIME_WINDOW_SECONDS = 3600.0
+        resultados_janela, hotspots_janela = realizar_clustering_colunas(colunas)
+        settings.CLUSTERING_TIME_WINDOW_SECONDS = 0.0
+        n_clusters = lambda resultados: len({item["clusterLabel"] for item in resultados} - {-1})
+        print(
+            f"    hotspots: sem divisão {len(hotspots_inteiro)} (idênticos), por regionKey {len(hotspots_regioes)}, "
+            f"por regionKey + janela de 1 h {len(hotspots_janela)} ({n_clusters(resultados_base)} -> {n_clusters(resultados_janela)} clusters)"
+        )
+
+
+if __name__ == "__main__":
+    main()
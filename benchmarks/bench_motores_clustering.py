@@ -0,0 +1,61 @@
+"""
+Compara os motores de clustering (`app/services/clustering_engines.py`) em conjuntos sintéticos
+no formato do notebook 03_Alerts_Clustering, de 1 mil a 1 milhão de alertas: verifica que os
+rótulos são idênticos e mede tempo e pico de memória alocada (tracemalloc) de cada motor.
+
+Uso: python -m benchmarks.bench_motores_clustering [--tamanhos 1000 10000 100000 1000000] [--max-haversine 1000000]
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.services.clustering_engines import MOTORES_CLUSTERING, criar_motor_clustering
+from app.services.clustering_service import DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES
+from benchmarks.dados_sinteticos import gerar_alertas_clustering
+
+
+def gerar_coordenadas(quantidade: int, semente: int = 42):
+    # ~90% dos alertas em hotspots de 9 a 15 alertas, o resto isolado.
+    quantidade_isolados = quantidade // 10
+    alertas = gerar_alertas_clustering((quantidade - quantidade_isolados) // 12, quantidade_isolados, semente)
+    return np.array([a["latitude"] for a in alertas]), np.array([a["longitude"] for a in alertas])
+
+
+def medir(motor, latitudes, longitudes):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    rotulos = motor.rotular(latitudes, longitudes)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rotulos, segundos, pico / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--max-haversine", type=int, default=1000000, help="Maior N em que o motor haversine (lento) é executado.")
+    args = parser.parse_args()
+
+    for quantidade in args.tamanhos:
+        latitudes, longitudes = gerar_coordenadas(quantidade)
+        resultados = {}
+        for nome in MOTORES_CLUSTERING:
+            if nome == "haversine_balltree" and len(latitudes) > args.max_haversine:
+                continue
+            resultados[nome] = medir(criar_motor_clustering(nome, DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES), latitudes, longitudes)
+
+        rotulos_referencia = next(iter(resultados.values()))[0]
+        iguais = all(np.array_equal(rotulos_referencia, rotulos) for rotulos, _, _ in resultados.values())
+        n_clusters = int(rotulos_referencia.max()) + 1
+        print(f"N={len(latitudes):>8} ({n_clusters} clusters, rótulos {'idênticos' if iguais else 'DIVERGENTES'})")
+        for nome, (_, segundos, pico_mb) in resultados.items():
+            print(f"    {nome:<20} {segundos * 1000:10.1f} ms   pico {pico_mb:8.1f} MB")
+        if not iguais:
+            raise SystemExit("ERRO: os motores produziram rótulos diferentes.")
+
+
+if __name__ == "__main__":
+    main()
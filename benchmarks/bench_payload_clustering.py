@@ -0,0 +1,86 @@
+"""
+Compara o custo de entrada/saída de `/ia/cluster_alerts` (sem o DBSCAN) no caminho original e
+no caminho colunar:
+
+* original: JSON -> `ClusteringInput` (um modelo por alerta) -> `model_dump` -> DataFrame; e na
+  saída dicts -> `ClusteringResultItem`/`HotspotSummaryOutput` -> `ClusteringResponse` ->
+  validação do response_model -> jsonable_encoder -> JSONResponse;
+* colunar: JSON -> colunas numpy -> DataFrame; e na saída dicts -> JSON (orjson, se instalado).
+
+Verifica antes que os DataFrames e os JSONs de resposta são equivalentes.
+
+Uso: python -m benchmarks.bench_payload_clustering [--tamanhos 1000 10000 50000] [--repeticoes 5]
+"""
+import argparse
+import json
+import timeit
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models_schemas.schemas import ClusteringInput, ClusteringResponse, ClusteringResultItem, HotspotSummaryOutput
+from app.services.clustering_service import CAMPOS_HOTSPOT_RESPOSTA, extrair_colunas_payload_clustering, realizar_clustering_colunas
+from app.utils.serializacao_json import orjson, serializar_json
+from benchmarks.dados_sinteticos import gerar_alertas_clustering
+
+
+def entrada_original(corpo: bytes) -> pd.DataFrame:
+    payload = ClusteringInput.model_validate(json.loads(corpo))
+    return pd.DataFrame([alerta.model_dump() for alerta in payload.alertsToCluster])
+
+
+def entrada_colunar(corpo: bytes) -> pd.DataFrame:
+    return pd.DataFrame(extrair_colunas_payload_clustering(corpo))
+
+
+def saida_original(clustering_results, hotspots) -> bytes:
+    resposta = ClusteringResponse(
+        clusteringResults=[ClusteringResultItem(**item) for item in clustering_results],
+        hotspotSummaries=[HotspotSummaryOutput(**dados) for dados in hotspots]
+    )
+    # O FastAPI revalida o objeto retornado contra o response_model antes de serializar.
+    resposta = ClusteringResponse.model_validate(resposta.model_dump())
+    return JSONResponse(content=jsonable_encoder(resposta)).body
+
+
+def saida_colunar(clustering_results, hotspots) -> bytes:
+    return serializar_json({
+        "clusteringResults": clustering_results,
+        "hotspotSummaries": [{campo: hotspot.get(campo) for campo in CAMPOS_HOTSPOT_RESPOSTA} for hotspot in hotspots],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Codificador JSON: {'orjson' if orjson is not None else 'json (biblioteca padrão)'}")
+    for quantidade in args.tamanhos:
+        quantidade_isolados = quantidade // 10
+        alertas = gerar_alertas_clustering((quantidade - quantidade_isolados) // 12, quantidade_isolados, semente=quantidade)
+        corpo = json.dumps({"alertsToCluster": alertas}).encode("utf-8")
+
+        df_original, df_colunar = entrada_original(corpo), entrada_colunar(corpo)
+        pd.testing.assert_frame_equal(df_original, df_colunar)
+        clustering_results, hotspots = realizar_clustering_colunas(extrair_colunas_payload_clustering(corpo))
+        if json.loads(saida_original(clustering_results, hotspots)) != json.loads(saida_colunar(clustering_results, hotspots)):
+            raise SystemExit("ERRO: as respostas divergem.")
+
+        medir = lambda funcao: min(timeit.repeat(funcao, number=1, repeat=args.repeticoes)) * 1000
+        tempos = {
+            "entrada original": medir(lambda: entrada_original(corpo)),
+            "entrada colunar": medir(lambda: entrada_colunar(corpo)),
+            "saída original": medir(lambda: saida_original(clustering_results, hotspots)),
+            "saída colunar": medir(lambda: saida_colunar(clustering_results, hotspots)),
+        }
+        print(f"{len(alertas)} alertas ({len(hotspots)} hotspots, {len(corpo) / 1024:.0f} KiB): DataFrames e respostas equivalentes")
+        for etapa, ms in tempos.items():
+            print(f"  {etapa:<18}{ms:10.2f} ms")
+        print(f"  ganho: entrada {tempos['entrada original'] / tempos['entrada colunar']:.1f}x, saída {tempos['saída original'] / tempos['saída colunar']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmark do pré-processamento de texto e da extração das features de léxico.
+
+Compara o pipeline original (reproduzido abaixo) com o pipeline compilado de
+`app.utils.text_processor`, verificando antes que ambos produzem saídas idênticas.
+
+Uso: python -m benchmarks.bench_text_processor [--quantidade 5000] [--repeticoes 5]
+"""
+import argparse
+import re
+import timeit
+import unicodedata
+
+from app.ml.lexicons import LEXICOS_SEVERIDADE
+from app.services.classification_service import ORDEM_LEXICOS_SEVERIDADE, INDICE_LEXICOS_SEVERIDADE
+from app.utils import text_processor
+from benchmarks.dados_sinteticos import gerar_textos_alerta
+
+# Recursos do pipeline original, carregados uma vez em `main` (como os globais do módulo original).
+STEMMER_ORIGINAL = None
+STOPWORDS_ORIGINAL: set = set()
+
+
+def preprocessar_texto_original(texto: str) -> str:
+    if not isinstance(texto, str):
+        return ""
+    texto = texto.lower()
+    texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
+    texto = re.sub(r'[^a-z0-9\s]', '', texto)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    tokens = texto.split()
+    tokens_processados = [STEMMER_ORIGINAL.stem(palavra) for palavra in tokens if palavra not in STOPWORDS_ORIGINAL]
+    return " ".join(tokens_processados)
+
+
+def contar_palavras_lexico_original(texto_processado: str, lexico_palavras: list) -> int:
+    contador = 0
+    if isinstance(texto_processado, str):
+        palavras_texto = texto_processado.split()
+        for palavra_lexico in lexico_palavras:
+            if palavra_lexico in palavras_texto:
+                contador += 1
+    return contador
+
+
+def features_original(textos):
+    resultado = []
+    for texto in textos:
+        processado = preprocessar_texto_original(texto)
+        resultado.append((processado, [contar_palavras_lexico_original(processado, LEXICOS_SEVERIDADE[nome]) for nome in ORDEM_LEXICOS_SEVERIDADE]))
+    return resultado
+
+
+def features_compilado(textos):
+    resultado = []
+    for texto in textos:
+        processado = text_processor.preprocessar_texto(texto)
+        resultado.append((processado, text_processor.contar_lexicos(processado, INDICE_LEXICOS_SEVERIDADE, len(ORDEM_LEXICOS_SEVERIDADE))))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantidade", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    global STEMMER_ORIGINAL, STOPWORDS_ORIGINAL
+    text_processor.inicializar_recursos_texto()
+    STEMMER_ORIGINAL, STOPWORDS_ORIGINAL = text_processor.obter_stemmer_rslp(), text_processor.carregar_stopwords_nltk()
+
+    textos = gerar_textos_alerta(args.quantidade)
+    textos_verificacao = textos + ["", "   ", "ÇÃÕ ção nbsp", "a\x1cb", "tab\tquebra\nlinha", "!!!", "resgate catastrofe"]
+
+    if features_original(textos_verificacao) != features_compilado(textos_verificacao):
+        raise SystemExit("ERRO: o pipeline compilado diverge do original.")
+    print(f"Saídas idênticas para {len(textos_verificacao)} textos.")
+
+    tempo_original = min(timeit.repeat(lambda: features_original(textos), number=1, repeat=args.repeticoes))
+    text_processor.stem_memoizado.cache_clear()
+    tempo_compilado_frio = timeit.timeit(lambda: features_compilado(textos), number=1)
+    tempo_compilado = min(timeit.repeat(lambda: features_compilado(textos), number=1, repeat=args.repeticoes))
+
+    por_texto = lambda segundos: segundos / len(textos) * 1e6
+    print(f"{'Original':<24}{por_texto(tempo_original):8.2f} us/texto")
+    print(f"{'Compilado (cache frio)':<24}{por_texto(tempo_compilado_frio):8.2f} us/texto")
+    print(f"{'Compilado':<24}{por_texto(tempo_compilado):8.2f} us/texto  ({tempo_original / tempo_compilado:.1f}x)")
+
+    # Palavras distintas, sem o cache LRU: o que o dicionário de radicais economiza em cada palavra nova.
+    dicionario = text_processor.DICIONARIO_RADICAIS
+    if dicionario is not None:
+        palavras = sorted({palavra for texto in textos for palavra in text_processor.normalizar_palavras(texto)} - STOPWORDS_ORIGINAL)
+        cobertas = [palavra for palavra in palavras if dicionario.radical(palavra) is not None]
+        tempo_rslp = min(timeit.repeat(lambda: [STEMMER_ORIGINAL.stem(palavra) for palavra in cobertas], number=1, repeat=args.repeticoes))
+        tempo_dicionario = min(timeit.repeat(lambda: [dicionario.radical(palavra) for palavra in cobertas], number=1, repeat=args.repeticoes))
+        por_palavra = lambda segundos: segundos / max(len(cobertas), 1) * 1e6
+        print(f"Dicionário: {len(cobertas)} de {len(palavras)} palavras distintas; "
+              f"RSLP {por_palavra(tempo_rslp):.2f} us/palavra, dicionário {por_palavra(tempo_dicionario):.3f} us/palavra")
+
+
+if __name__ == "__main__":
+    main()
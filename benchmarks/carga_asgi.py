@@ -0,0 +1,179 @@
+"""
+Gerador de carga em processo: envia requisições à aplicação FastAPI pelo transporte ASGI do
+httpx (sem rede nem servidor), com N clientes concorrentes em laço fechado, e mede latência
+(p50/p95/p99) e vazão de cada cenário. O lifespan da aplicação é executado, então modelos,
+pools e micro-batcher funcionam como em produção.
+
+Uso isolado: python -m benchmarks.carga_asgi [--concorrencia 1 16] [--rapido]
+(a suíte completa, com resultados em JSON, é `python -m benchmarks.suite_desempenho`).
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+import numpy as np
+
+from app.core.config import PROJECT_ROOT_DIR, settings
+from benchmarks.dados_sinteticos import gerar_alertas_clustering, gerar_textos_alerta
+
+ARQUIVO_RELATOS_PADRAO = os.path.join(PROJECT_ROOT_DIR, "requests.jsonl")
+
+
+class CenarioCarga(NamedTuple):
+    nome: str
+    caminho: str
+    corpos: List[bytes]
+    requisicoes: int
+    # Acima disso o pool responde 503 (load-shedding) e a latência medida deixa de ser a do endpoint.
+    concorrencia_maxima: Optional[int] = None
+
+
+def _serializar(corpo: dict) -> bytes:
+    return json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+
+
+def carregar_textos_relatos(caminho: str, campo_texto: str) -> List[str]:
+    """Textos de um arquivo NDJSON (ex.: requests.jsonl), ignorando linhas sem o campo."""
+    textos = []
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            if linha.strip():
+                texto = json.loads(linha).get(campo_texto)
+                if isinstance(texto, str) and texto.strip():
+                    textos.append(texto)
+    return textos
+
+
+def cenarios_padrao(
+    arquivo_relatos: str = ARQUIVO_RELATOS_PADRAO,
+    campo_texto: str = "body",
+    escala: float = 1.0
+) -> List[CenarioCarga]:
+    """
+    Cenários de `/ia/classify_text` (replay do arquivo de relatos, se existir, e textos sintéticos)
+    e de `/ia/cluster_alerts` (payloads sintéticos de 500 e 5000 alertas; o de 5000 vai para o
+    pool de processos com o CLUSTERING_PROCESS_MIN_ALERTS padrão).
+    """
+    requisicoes = lambda quantidade: max(10, int(quantidade * escala))
+    cenarios = []
+    if os.path.exists(arquivo_relatos):
+        textos_relatos = carregar_textos_relatos(arquivo_relatos, campo_texto)
+        if textos_relatos:
+            cenarios.append(CenarioCarga(
+                "classify_text_relatos",
+                "/ia/classify_text",
+                [_serializar({"alertId": indice, "text": texto}) for indice, texto in enumerate(textos_relatos, start=1)],
+                requisicoes(2000)
+            ))
+    cenarios.append(CenarioCarga(
+        "classify_text_sinteticos",
+        "/ia/classify_text",
+        [_serializar({"alertId": indice, "text": texto}) for indice, texto in enumerate(gerar_textos_alerta(1000), start=1)],
+        requisicoes(2000)
+    ))
+    for quantidade_hotspots, quantidade_isolados, quantidade_requisicoes in ((40, 20, 200), (400, 200, 30)):
+        alertas = gerar_alertas_clustering(quantidade_hotspots, quantidade_isolados, semente=quantidade_hotspots)
+        cenarios.append(CenarioCarga(
+            f"cluster_alerts_{len(alertas)}",
+            "/ia/cluster_alerts",
+            [_serializar({"alertsToCluster": alertas})],
+            requisicoes(quantidade_requisicoes),
+            concorrencia_maxima=settings.CLUSTERING_MAX_PENDING
+        ))
+    return cenarios
+
+
+def resumir_latencias(latencias_s: List[float], duracao_s: float, status: Counter) -> Dict:
+    latencias_ms = np.asarray(latencias_s) * 1000.0
+    p50, p95, p99 = np.percentile(latencias_ms, [50, 95, 99]) if latencias_ms.size else (0.0, 0.0, 0.0)
+    return {
+        "requisicoes": int(latencias_ms.size),
+        "duracao_s": duracao_s,
+        "req_por_s": latencias_ms.size / duracao_s if duracao_s > 0 else 0.0,
+        "latencia_ms": {
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "media": float(latencias_ms.mean()) if latencias_ms.size else 0.0,
+            "max": float(latencias_ms.max()) if latencias_ms.size else 0.0,
+        },
+        "status": {str(codigo): quantidade for codigo, quantidade in sorted(status.items())},
+    }
+
+
+async def _disparar(cliente: httpx.AsyncClient, cenario: CenarioCarga, concorrencia: int, total: int, latencias: Optional[List[float]], status: Counter):
+    proxima = iter(range(total))
+    cabecalhos = {"content-type": "application/json"}
+
+    async def cliente_sequencial():
+        for indice in proxima:
+            inicio = time.perf_counter()
+            resposta = await cliente.post(cenario.caminho, content=cenario.corpos[indice % len(cenario.corpos)], headers=cabecalhos)
+            if latencias is not None:
+                latencias.append(time.perf_counter() - inicio)
+            status[resposta.status_code] += 1
+
+    await asyncio.gather(*(cliente_sequencial() for _ in range(concorrencia)))
+
+
+async def executar_cenario(cliente: httpx.AsyncClient, cenario: CenarioCarga, concorrencia: int) -> Dict:
+    """Aquece o cenário (sem medir) e executa `cenario.requisicoes` requisições com `concorrencia` clientes."""
+    await _disparar(cliente, cenario, concorrencia, min(cenario.requisicoes, max(2 * concorrencia, 10)), None, Counter())
+    latencias: List[float] = []
+    status: Counter = Counter()
+    inicio = time.perf_counter()
+    await _disparar(cliente, cenario, concorrencia, cenario.requisicoes, latencias, status)
+    resultado = resumir_latencias(latencias, time.perf_counter() - inicio, status)
+    return {"cenario": cenario.nome, "endpoint": cenario.caminho, "concorrencia": concorrencia, **resultado}
+
+
+async def executar_carga(cenarios: List[CenarioCarga], niveis_concorrencia: List[int], ao_concluir=None) -> List[Dict]:
+    from app.main import app
+
+    resultados = []
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://carga", timeout=None) as cliente:
+            for cenario in cenarios:
+                niveis_cenario = sorted({min(concorrencia, cenario.concorrencia_maxima or concorrencia) for concorrencia in niveis_concorrencia})
+                for concorrencia in niveis_cenario:
+                    resultado = await executar_cenario(cliente, cenario, concorrencia)
+                    resultados.append(resultado)
+                    if ao_concluir is not None:
+                        ao_concluir(resultado)
+    return resultados
+
+
+def imprimir_resultado_carga(resultado: Dict):
+    latencia = resultado["latencia_ms"]
+    erros = sum(quantidade for codigo, quantidade in resultado["status"].items() if codigo != "200")
+    print(
+        f"{resultado['cenario']:<28} c={resultado['concorrencia']:<4}{resultado['req_por_s']:9.1f} req/s  "
+        f"p50 {latencia['p50']:8.2f} ms  p95 {latencia['p95']:8.2f} ms  p99 {latencia['p99']:8.2f} ms"
+        + (f"  ({erros} respostas != 200: {resultado['status']})" if erros else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--arquivo-relatos", default=ARQUIVO_RELATOS_PADRAO)
+    parser.add_argument("--campo-texto", default="body", help="Campo com o texto em cada linha do arquivo de relatos.")
+    parser.add_argument("--rapido", action="store_true", help="Executa 10%% das requisições de cada cenário.")
+    parser.add_argument("--com-cache", action="store_true", help="Mantém os caches de predições e de clustering (por padrão são desligados para medir os modelos).")
+    args = parser.parse_args()
+
+    settings.PREDICTION_CACHE_ENABLED = args.com_cache
+    settings.CLUSTERING_CACHE_ENABLED = args.com_cache
+
+    cenarios = cenarios_padrao(args.arquivo_relatos, args.campo_texto, 0.1 if args.rapido else 1.0)
+    asyncio.run(executar_carga(cenarios, args.concorrencia, imprimir_resultado_carga))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compara dois arquivos de resultados da `benchmarks.suite_desempenho` (ex.: antes e depois de um
+commit). Para cada microbenchmark compara a mediana por chamada; para cada cenário de carga,
+req/s e p50/p95/p99. Variações piores que `--limite` são marcadas como regressão e fazem o
+comando terminar com código 1.
+
+Uso: python -m benchmarks.comparar_resultados base.json novo.json [--limite 0.10]
+"""
+import argparse
+import json
+from typing import Dict, Iterator, Tuple
+
+# (métrica, True se maior é melhor)
+METRICAS_CARGA = (("req_por_s", True), ("p50", False), ("p95", False), ("p99", False))
+
+
+def _chave_micro(resultado: Dict) -> str:
+    parametros = ", ".join(f"{chave}={valor}" for chave, valor in sorted(resultado["parametros"].items()))
+    return f"{resultado['nome']} ({parametros})"
+
+
+def _chave_carga(resultado: Dict) -> str:
+    return f"{resultado['cenario']} c={resultado['concorrencia']}"
+
+
+def comparacoes(base: Dict, novo: Dict) -> Iterator[Tuple[str, str, float, float, bool]]:
+    """(item, métrica, valor base, valor novo, maior_melhor) para os itens presentes nos dois arquivos."""
+    micro_base = {_chave_micro(resultado): resultado for resultado in base.get("microbenchmarks", [])}
+    for resultado in novo.get("microbenchmarks", []):
+        anterior = micro_base.get(_chave_micro(resultado))
+        if anterior is not None:
+            yield _chave_micro(resultado), "ms/chamada", anterior["s_por_chamada_mediana"] * 1000, resultado["s_por_chamada_mediana"] * 1000, False
+
+    carga_base = {_chave_carga(resultado): resultado for resultado in base.get("carga", [])}
+    for resultado in novo.get("carga", []):
+        anterior = carga_base.get(_chave_carga(resultado))
+        if anterior is None:
+            continue
+        for metrica, maior_melhor in METRICAS_CARGA:
+            if metrica == "req_por_s":
+                valor_base, valor_novo = anterior[metrica], resultado[metrica]
+            else:
+                valor_base, valor_novo = anterior["latencia_ms"][metrica], resultado["latencia_ms"][metrica]
+            yield _chave_carga(resultado), metrica if metrica == "req_por_s" else f"{metrica} ms", valor_base, valor_novo, maior_melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    parser.add_argument("--limite", type=float, default=0.10, help="Piora relativa a partir da qual um item é regressão (padrão 10%%).")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as arquivo:
+        base = json.load(arquivo)
+    with open(args.novo, encoding="utf-8") as arquivo:
+        novo = json.load(arquivo)
+
+    print(f"Base: {base['metadados'].get('commit')} ({base['metadados'].get('data')})")
+    print(f"Novo: {novo['metadados'].get('commit')} ({novo['metadados'].get('data')})")
+    for nome, valor in novo["metadados"].get("configuracoes", {}).items():
+        valor_base = base["metadados"].get("configuracoes", {}).get(nome)
+        if valor_base != valor:
+            print(f"Aviso: {nome} mudou de {valor_base!r} para {valor!r}.")
+
+    regressoes = 0
+    for item, metrica, valor_base, valor_novo, maior_melhor in comparacoes(base, novo):
+        variacao = (valor_novo - valor_base) / valor_base if valor_base else 0.0
+        piora = -variacao if maior_melhor else variacao
+        marcador = "REGRESSÃO" if piora > args.limite else ("melhora" if piora < -args.limite else "")
+        regressoes += marcador == "REGRESSÃO"
+        print(f"{item:<64}{metrica:<12}{valor_base:12.3f} -> {valor_novo:12.3f}  {variacao:+8.1%}  {marcador}")
+
+    print(f"{regressoes} regressões acima de {args.limite:.0%}.")
+    if regressoes:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
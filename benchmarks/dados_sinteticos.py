@@ -0,0 +1,91 @@
+import random
+from typing import List
+
+FRASES_BASE = [
+    "Grande deslizamento de terra bloqueou a via principal no Morro da Esperança. Risco de novas ocorrências.",
+    "Alagamento na Marginal Tietê causa lentidão.",
+    "Rua completamente alagada perto da escola, a água está subindo rápido!",
+    "Árvore caiu sobre a fiação elétrica, há risco de incêndio e a rua está interditada.",
+    "Pequeno acúmulo de água na calçada, sem risco para os pedestres.",
+    "Casa desabou após a chuva forte, vítimas soterradas, precisamos de resgate urgente!!!",
+    "Rachaduras na encosta atrás do condomínio, moradores preocupados com possível deslizamento.",
+    "Córrego transbordou e invadiu as casas da rua de baixo, situação grave.",
+    "Galhos quebrados na praça, apenas precaução, nada sério.",
+    "Muro com inclinação perigosa na Av. São João, nº 1500 — atenção!",
+    "Erosão na beira do barranco aumentou depois da tempestade de ontem à noite.",
+    "Fumaça densa saindo de um galpão abandonado, bombeiros a caminho.",
+]
+
+COMPLEMENTOS = [
+    "", " Por favor, enviem ajuda.", " Moradores evacuando.", " Situação sob controle.",
+    " Trânsito interrompido nos dois sentidos.", " A Defesa Civil já foi avisada.", " 😟",
+]
+
+
+def gerar_textos_alerta(quantidade: int, semente: int = 42) -> List[str]:
+    """Gera textos de alerta variados a partir de frases base, para benchmarks reprodutíveis."""
+    gerador = random.Random(semente)
+    textos = []
+    for _ in range(quantidade):
+        texto = gerador.choice(FRASES_BASE) + gerador.choice(COMPLEMENTOS)
+        if gerador.random() < 0.3:
+            texto = texto.upper()
+        textos.append(texto)
+    return textos
+
+
+TIPOS_ALERTA = ["ALAGAMENTO", "RISCO_DESLIZAMENTO", "DESLIZAMENTO_OCORRIDO", "OUTRO_PERIGO"]
+SEVERIDADES_ALERTA = ["BAIXA", "MEDIA", "ALTA", "CRITICA"]
+
+
+def gerar_alertas_clustering(
+    quantidade_hotspots: int,
+    quantidade_isolados: int,
+    semente: int = 42,
+    centro: tuple = (-23.5505, -46.6333),
+    alertas_por_hotspot: tuple = (9, 15),
+    dispersao_hotspot_graus: tuple = (0.0015, 0.0020),
+) -> List[dict]:
+    """
+    Gera alertas para o clustering no formato de `AlertItemForClustering`, seguindo o notebook
+    03_Alerts_Clustering: hotspots de 9 a 15 alertas dispersos em ±0,0015–0,002° em torno de um
+    centro, mais alertas isolados. A área cresce com a quantidade de hotspots para manter a densidade.
+    """
+    import numpy as np
+
+    gerador = np.random.default_rng(semente)
+    meia_extensao = 0.01 * max(1.0, np.sqrt(quantidade_hotspots + quantidade_isolados / 10))
+
+    tamanhos = gerador.integers(alertas_por_hotspot[0], alertas_por_hotspot[1] + 1, size=quantidade_hotspots)
+    centros = gerador.uniform(-meia_extensao, meia_extensao, size=(quantidade_hotspots, 2)) + np.asarray(centro)
+    dispersoes = gerador.uniform(*dispersao_hotspot_graus, size=quantidade_hotspots)
+    tipos_hotspot = gerador.integers(0, len(TIPOS_ALERTA), size=quantidade_hotspots)
+    severidades_hotspot = gerador.integers(1, len(SEVERIDADES_ALERTA), size=quantidade_hotspots)
+
+    hotspot_do_alerta = np.repeat(np.arange(quantidade_hotspots), tamanhos)
+    coordenadas = np.concatenate((
+        centros[hotspot_do_alerta] + gerador.uniform(-1, 1, size=(len(hotspot_do_alerta), 2)) * dispersoes[hotspot_do_alerta, None],
+        gerador.uniform(-meia_extensao, meia_extensao, size=(quantidade_isolados, 2)) + np.asarray(centro),
+    ))
+    # Cerca de 80% dos alertas de um hotspot seguem o tipo e a severidade do hotspot; o resto é ruído.
+    total = len(coordenadas)
+    tipos = gerador.integers(0, len(TIPOS_ALERTA), size=total)
+    severidades = gerador.integers(0, len(SEVERIDADES_ALERTA), size=total)
+    segue_hotspot = gerador.random(len(hotspot_do_alerta)) < 0.8
+    tipos[:len(hotspot_do_alerta)][segue_hotspot] = tipos_hotspot[hotspot_do_alerta][segue_hotspot]
+    severidades[:len(hotspot_do_alerta)][segue_hotspot] = severidades_hotspot[hotspot_do_alerta][segue_hotspot]
+    minutos = gerador.integers(0, 24 * 60, size=total)
+    sem_timestamp = gerador.random(total) < 0.05
+
+    embaralhamento = gerador.permutation(total)
+    return [
+        {
+            "alertId": int(alert_id),
+            "latitude": float(coordenadas[i, 0]),
+            "longitude": float(coordenadas[i, 1]),
+            "severityIA": SEVERIDADES_ALERTA[severidades[i]],
+            "typeIA": TIPOS_ALERTA[tipos[i]],
+            "timestampReporte": None if sem_timestamp[i] else f"2024-01-01T{minutos[i] // 60:02d}:{minutos[i] % 60:02d}:00Z",
+        }
+        for alert_id, i in enumerate(embaralhamento.tolist(), start=1)
+    ]
@@ -0,0 +1,196 @@
+"""
+Suíte de desempenho reprodutível: microbenchmarks das funções do caminho quente e carga em
+processo nos endpoints `/ia/classify_text` e `/ia/cluster_alerts` (ver `benchmarks.carga_asgi`).
+Os resultados são gravados em JSON, com o commit e o ambiente, para comparação entre commits
+com `python -m benchmarks.comparar_resultados`.
+
+Os dados de entrada são gerados com sementes fixas e o cache de predições fica desligado, para
+que cada execução meça o mesmo trabalho.
+
+Uso: python -m benchmarks.suite_desempenho [--saida resultados.json] [--rapido] [--somente micro|carga]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import sklearn
+
+from app.core.config import PROJECT_ROOT_DIR, settings
+from benchmarks.carga_asgi import ARQUIVO_RELATOS_PADRAO, cenarios_padrao, executar_carga, imprimir_resultado_carga
+from benchmarks.dados_sinteticos import FRASES_BASE, gerar_alertas_clustering, gerar_textos_alerta
+
+PASTA_RESULTADOS = os.path.join(PROJECT_ROOT_DIR, "benchmarks", "resultados")
+
+CONFIGURACOES_REGISTRADAS = (
+    "CLUSTERING_ENGINE", "MICRO_BATCH_ENABLED", "MICRO_BATCH_WINDOW_MS", "MICRO_BATCH_MAX_SIZE",
+    "INFERENCE_THREAD_WORKERS", "CLUSTERING_PROCESS_WORKERS", "CLUSTERING_PROCESS_MIN_ALERTS",
+    "MODELS_MMAP_MODE", "MODELS_USE_COMPACT", "PREDICTION_CACHE_ENABLED", "METRICS_SAMPLE_RATE",
+    "CLUSTERING_CACHE_ENABLED", "CLUSTERING_PARTITION_THREADS",
+)
+
+
+def medir(funcao: Callable[[], object], repeticoes: int, itens: int = 1) -> Dict:
+    """
+    Executa `funcao` em `repeticoes` rodadas de pelo menos ~0,2 s cada (`Timer.autorange`) e
+    devolve o mínimo e a mediana por chamada, além da mediana por item processado.
+    """
+    cronometro = timeit.Timer(funcao)
+    execucoes, _ = cronometro.autorange()
+    tempos = [tempo / execucoes for tempo in cronometro.repeat(repeat=repeticoes, number=execucoes)]
+    mediana = statistics.median(tempos)
+    return {
+        "itens": itens,
+        "execucoes_por_rodada": execucoes,
+        "s_por_chamada_min": min(tempos),
+        "s_por_chamada_mediana": mediana,
+        "us_por_item": mediana / itens * 1e6,
+    }
+
+
+def _textos_com_frases(quantidade: int, frases_por_texto: int, semente: int = 7) -> List[str]:
+    """Textos com `frases_por_texto` frases base cada, para variar o comprimento da entrada."""
+    textos = gerar_textos_alerta(quantidade * frases_por_texto, semente)
+    return [" ".join(textos[indice:indice + frases_por_texto]) for indice in range(0, len(textos), frases_por_texto)]
+
+
+def microbenchmarks(rapido: bool, repeticoes: int, ao_concluir: Callable[[Dict], None]) -> List[Dict]:
+    from app.ml.lexicons import LEXICOS_SEVERIDADE
+    from app.ml.model_loader import load_all_models
+    from app.models_schemas.schemas import AlertItemForClustering
+    from app.services.classification_service import (
+        ORDEM_LEXICOS_SEVERIDADE, obter_predicoes_classificacao, obter_predicoes_classificacao_lote
+    )
+    from app.services.clustering_service import realizar_clustering_alertas
+    from app.utils.text_processor import contar_palavras_lexico, inicializar_recursos_texto, preprocessar_texto
+
+    inicializar_recursos_texto()
+    load_all_models()
+
+    resultados = []
+
+    def registrar(nome: str, parametros: Dict, funcao: Callable[[], object], itens: int = 1):
+        resultado = {"nome": nome, "parametros": parametros, **medir(funcao, repeticoes, itens)}
+        resultados.append(resultado)
+        ao_concluir(resultado)
+
+    # Pré-processamento e léxicos: 200 textos de 1, 4 e 16 frases (stems já memoizados após o aquecimento).
+    for frases_por_texto in (1, 4, 16):
+        textos = _textos_com_frases(200, frases_por_texto)
+        for texto in textos:
+            preprocessar_texto(texto)
+        registrar("preprocessar_texto", {"frases_por_texto": frases_por_texto}, lambda: [preprocessar_texto(texto) for texto in textos], len(textos))
+
+        processados = [preprocessar_texto(texto) for texto in textos]
+        lexicos = [LEXICOS_SEVERIDADE[nome] for nome in ORDEM_LEXICOS_SEVERIDADE]
+        registrar(
+            "contar_palavras_lexico",
+            {"frases_por_texto": frases_por_texto, "lexicos": len(lexicos)},
+            lambda: [contar_palavras_lexico(processado, lexico) for processado in processados for lexico in lexicos],
+            len(processados)
+        )
+
+    # Classificação sem cache: um texto por chamada e lotes pelo caminho vetorizado.
+    texto_unico = FRASES_BASE[0]
+    registrar("obter_predicoes_classificacao", {"textos": 1}, lambda: obter_predicoes_classificacao(texto_unico))
+    for tamanho_lote in ((1, 10, 100) if rapido else (1, 10, 100, 1000)):
+        textos = gerar_textos_alerta(tamanho_lote, semente=tamanho_lote)
+        registrar(
+            "obter_predicoes_classificacao_lote",
+            {"textos": tamanho_lote},
+            lambda: obter_predicoes_classificacao_lote(textos, usar_cache=False),
+            tamanho_lote
+        )
+
+    # Clustering completo (DataFrame, DBSCAN e refinamento), com ~90% dos alertas em hotspots.
+    for quantidade in ((100, 1000, 10000) if rapido else (100, 1000, 10000, 50000)):
+        quantidade_isolados = quantidade // 10
+        alertas = [
+            AlertItemForClustering(**alerta)
+            for alerta in gerar_alertas_clustering((quantidade - quantidade_isolados) // 12, quantidade_isolados, semente=quantidade)
+        ]
+        registrar(
+            "realizar_clustering_alertas",
+            {"alertas": len(alertas), "motor": settings.CLUSTERING_ENGINE},
+            lambda: realizar_clustering_alertas(alertas),
+            len(alertas)
+        )
+
+    return resultados
+
+
+def imprimir_resultado_micro(resultado: Dict):
+    parametros = ", ".join(f"{chave}={valor}" for chave, valor in resultado["parametros"].items())
+    print(
+        f"{resultado['nome']:<36}{parametros:<36}{resultado['s_por_chamada_mediana'] * 1000:10.3f} ms/chamada"
+        f"{resultado['us_por_item']:12.2f} us/item"
+    )
+
+
+def _executar_git(*argumentos: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *argumentos], cwd=PROJECT_ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadados_execucao(args: argparse.Namespace) -> Dict:
+    return {
+        "data": datetime.now(timezone.utc).isoformat(),
+        "commit": _executar_git("rev-parse", "--short", "HEAD"),
+        "alteracoes_locais": bool(_executar_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scikit_learn": sklearn.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "rapido": args.rapido,
+        "configuracoes": {nome: getattr(settings, nome) for nome in CONFIGURACOES_REGISTRADAS},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--saida", help="Arquivo JSON de resultados (padrão: benchmarks/resultados/<data>_<commit>.json).")
+    parser.add_argument("--rapido", action="store_true", help="Menos tamanhos de entrada e 10%% das requisições de carga.")
+    parser.add_argument("--somente", choices=["micro", "carga"])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--arquivo-relatos", default=ARQUIVO_RELATOS_PADRAO)
+    parser.add_argument("--campo-texto", default="body")
+    args = parser.parse_args()
+
+    settings.PREDICTION_CACHE_ENABLED = False
+    settings.CLUSTERING_CACHE_ENABLED = False
+
+    resultados = {"metadados": metadados_execucao(args), "microbenchmarks": [], "carga": []}
+    if args.somente in (None, "micro"):
+        print("== Microbenchmarks ==")
+        resultados["microbenchmarks"] = microbenchmarks(args.rapido, args.repeticoes, imprimir_resultado_micro)
+    if args.somente in (None, "carga"):
+        print("== Carga (ASGI em processo) ==")
+        cenarios = cenarios_padrao(args.arquivo_relatos, args.campo_texto, 0.1 if args.rapido else 1.0)
+        resultados["carga"] = asyncio.run(executar_carga(cenarios, args.concorrencia, imprimir_resultado_carga))
+
+    caminho_saida = args.saida
+    if caminho_saida is None:
+        metadados = resultados["metadados"]
+        data = datetime.fromisoformat(metadados["data"]).strftime("%Y%m%dT%H%M%S")
+        caminho_saida = os.path.join(PASTA_RESULTADOS, f"{data}_{metadados['commit'] or 'sem-commit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(caminho_saida)), exist_ok=True)
+    with open(caminho_saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {caminho_saida}")
+
+
+if __name__ == "__main__":
+    main()
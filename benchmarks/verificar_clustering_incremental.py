@@ -0,0 +1,117 @@
+"""
+Alimenta o clustering incremental com alertas em lotes (com remoções e expirações) e, a cada
+passo, compara o estado com um DBSCAN completo sobre os alertas ativos: o ruído e a partição dos
+pontos core devem ser idênticos, e cada ponto de borda deve estar em um dos clusters vizinhos.
+Também compara o tempo de uma atualização incremental com o de recalcular tudo.
+
+Uso: python -m benchmarks.verificar_clustering_incremental [--hotspots 2000] [--lote 200]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import BallTree
+
+from app.models_schemas.schemas import AlertItemForClustering
+from app.services.clustering_service import DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES, R_TERRA_KM, realizar_clustering_alertas
+from app.services.incremental_clustering import EstadoClusteringIncremental, converter_timestamp_para_epoch
+from benchmarks.dados_sinteticos import gerar_alertas_clustering
+
+
+def verificar_contra_dbscan(estado: EstadoClusteringIncremental):
+    ids = sorted(estado._rotulos)
+    if not ids:
+        return
+    coordenadas = np.array([estado._coordenadas_rad[alert_id] for alert_id in ids])
+    eps_rad = DBSCAN_EPS_KM / R_TERRA_KM
+    dbscan = DBSCAN(eps=eps_rad, min_samples=DBSCAN_MIN_SAMPLES, metric='haversine', algorithm='ball_tree').fit(coordenadas)
+    rotulos_incrementais = np.array([estado._rotulos[alert_id] for alert_id in ids])
+
+    if not np.array_equal(dbscan.labels_ == -1, rotulos_incrementais == -1):
+        raise SystemExit("ERRO: o conjunto de ruído diverge do DBSCAN.")
+    cores = np.zeros(len(ids), dtype=bool)
+    cores[dbscan.core_sample_indices_] = True
+    # Partições iguais: a correspondência entre rótulos dos cores é uma bijeção.
+    pares = set(zip(dbscan.labels_[cores].tolist(), rotulos_incrementais[cores].tolist()))
+    if len(pares) != len({a for a, _ in pares}) or len(pares) != len({b for _, b in pares}):
+        raise SystemExit("ERRO: a partição dos pontos core diverge do DBSCAN.")
+    rotulo_incremental_de = dict(pares)
+
+    arvore = BallTree(coordenadas, metric='haversine')
+    bordas = np.flatnonzero(~cores & (dbscan.labels_ != -1))
+    for indice, vizinhos in zip(bordas, arvore.query_radius(coordenadas[bordas], eps_rad) if len(bordas) else []):
+        clusters_vizinhos = {rotulo_incremental_de[dbscan.labels_[v]] for v in vizinhos if cores[v]}
+        if rotulos_incrementais[indice] not in clusters_vizinhos:
+            raise SystemExit(f"ERRO: ponto de borda {ids[indice]} fora dos clusters vizinhos.")
+
+    esperados = {h["hotspotId"]: h for h in estado._calcular_hotspots(list(estado._membros_cluster))}
+    divergentes = sorted(
+        hotspot_id for hotspot_id in esperados.keys() | estado._hotspots.keys()
+        if hotspot_id not in esperados or hotspot_id not in estado._hotspots
+        or {**esperados[hotspot_id], "lastActivityTimestamp": None} != {**estado._hotspots[hotspot_id], "lastActivityTimestamp": None}
+    )
+    if divergentes:
+        raise SystemExit(f"ERRO: hotspots mantidos incrementalmente divergem do recálculo: {divergentes[:10]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotspots", type=int, default=2000)
+    parser.add_argument("--lote", type=int, default=200)
+    parser.add_argument("--verificar-a-cada", type=int, default=10, help="Compara com o DBSCAN completo a cada N lotes.")
+    args = parser.parse_args()
+
+    alertas = [AlertItemForClustering(**alerta) for alerta in gerar_alertas_clustering(args.hotspots, args.hotspots * 2)]
+    gerador = random.Random(7)
+    # TTL de 4 horas com o relógio avançando junto com os timestamps sintéticos (ordenados).
+    alertas.sort(key=lambda alerta: alerta.timestampReporte or "2024-01-01T00:00:00Z")
+    estado = EstadoClusteringIncremental(ttl_segundos=4 * 3600)
+
+    # Cliente que só aplica os deltas: deve terminar com o mesmo estado do servidor.
+    rotulos_cliente, hotspots_cliente = {}, {}
+    tempos_incrementais, tempos_completos = [], []
+    for numero_lote, inicio in enumerate(range(0, len(alertas), args.lote), start=1):
+        lote = alertas[inicio:inicio + args.lote]
+        referencia = max(converter_timestamp_para_epoch(a.timestampReporte) or 0 for a in lote) or None
+        ativos = list(estado._alertas)
+        removidos = gerador.sample(ativos, min(len(ativos), args.lote // 20))
+
+        inicio_tempo = time.perf_counter()
+        delta = estado.aplicar(lote, removidos, referencia)
+        tempos_incrementais.append(time.perf_counter() - inicio_tempo)
+        for alert_id in delta["removedAlertIds"]:
+            rotulos_cliente.pop(alert_id)
+        rotulos_cliente.update((item["alertId"], item["clusterLabel"]) for item in delta["changedLabels"])
+        for hotspot_id in delta["removedHotspotIds"]:
+            hotspots_cliente.pop(hotspot_id)
+        hotspots_cliente.update((hotspot["hotspotId"], hotspot) for hotspot in delta["updatedHotspots"])
+
+        if numero_lote % args.verificar_a_cada == 0:
+            verificar_contra_dbscan(estado)
+            ativos = [AlertItemForClustering(**{k: v for k, v in a.items() if not k.startswith("_")}) for a in estado._alertas.values()]
+            inicio_tempo = time.perf_counter()
+            realizar_clustering_alertas(ativos)
+            tempos_completos.append(time.perf_counter() - inicio_tempo)
+            print(
+                f"lote {numero_lote:>4}: {estado.quantidade_alertas:>6} alertas ativos, {len(estado._membros_cluster):>5} clusters, "
+                f"{len(estado._hotspots):>5} hotspots | incremental {tempos_incrementais[-1] * 1000:7.1f} ms, "
+                f"completo {tempos_completos[-1] * 1000:8.1f} ms"
+            )
+
+    verificar_contra_dbscan(estado)
+    # Mesmo instante de referência do último lote: com o relógio atual, o instantâneo expiraria os alertas sintéticos.
+    instantaneo = estado.instantaneo(referencia)
+    if rotulos_cliente != {item["alertId"]: item["clusterLabel"] for item in instantaneo["clusteringResults"]}:
+        raise SystemExit("ERRO: os deltas de rótulos não reproduzem o estado do servidor.")
+    if hotspots_cliente != {hotspot["hotspotId"]: hotspot for hotspot in instantaneo["hotspots"]}:
+        raise SystemExit("ERRO: os deltas de hotspots não reproduzem o estado do servidor.")
+    print(
+        f"Estado consistente com o DBSCAN. Atualização de {args.lote} alertas: incremental mediana "
+        f"{np.median(tempos_incrementais) * 1000:.1f} ms, recálculo completo mediana {np.median(tempos_completos) * 1000:.1f} ms."
+    )
+
+
+if __name__ == "__main__":
+    main()
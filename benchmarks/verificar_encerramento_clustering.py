@@ -0,0 +1,56 @@
+"""
+Verifica que a API encerra depois de um clustering grande em `/ia/cluster_alerts`.
+
+O payload (duas cidades, acima de `CLUSTERING_PROCESS_MIN_ALERTS`) vai para um processo do pool
+de clustering, que clusteriza as partições no seu pool de threads. Depois da resposta, o
+encerramento do lifespan tem de terminar dentro do prazo, sem deixar processos filhos: se travar,
+as pilhas das threads são impressas e o script sai com erro.
+
+Uso: python -m benchmarks.verificar_encerramento_clustering [--alertas 44000] [--prazo 120]
+"""
+import argparse
+import faulthandler
+import multiprocessing
+import os
+import time
+
+# Também nos processos do pool de clustering (spawn), que leem a configuração do ambiente.
+os.environ.setdefault("CLUSTERING_PARTITION_THREADS", "2")
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from benchmarks.bench_clustering_particionado import gerar_colunas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alertas", type=int, default=44000)
+    parser.add_argument("--prazo", type=float, default=120.0, help="Segundos para a requisição e o encerramento.")
+    args = parser.parse_args()
+
+    colunas = gerar_colunas(args.alertas, 2)
+    alertas = [dict(zip(colunas, valores)) for valores in zip(*colunas.values())]
+    if len(alertas) < settings.CLUSTERING_PROCESS_MIN_ALERTS:
+        raise SystemExit(f"ERRO: {len(alertas)} alertas não chegam ao pool de processos (CLUSTERING_PROCESS_MIN_ALERTS={settings.CLUSTERING_PROCESS_MIN_ALERTS}).")
+
+    faulthandler.dump_traceback_later(args.prazo, exit=True)
+    with TestClient(app) as cliente:
+        inicio = time.perf_counter()
+        resposta = cliente.post("/ia/cluster_alerts", json={"alertsToCluster": alertas})
+        if resposta.status_code != 200:
+            raise SystemExit(f"ERRO: POST /ia/cluster_alerts respondeu {resposta.status_code}: {resposta.text[:200]}")
+        print(f"POST /ia/cluster_alerts com {len(alertas)} alertas: 200 em {time.perf_counter() - inicio:.1f} s")
+        inicio = time.perf_counter()
+    faulthandler.cancel_dump_traceback_later()
+    print(f"Encerramento do lifespan em {time.perf_counter() - inicio:.1f} s")
+
+    filhos = multiprocessing.active_children()
+    if filhos:
+        raise SystemExit(f"ERRO: processos filhos ainda ativos após o encerramento: {[filho.pid for filho in filhos]}")
+    print("Encerramento concluído sem processos filhos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Verifica, contra os modelos salvos, que o MotorFeatures produz exatamente as mesmas matrizes
+e predições que o caminho original (dois `transform` independentes + `hstack` dos léxicos),
+e compara o tempo dos dois caminhos.
+
+Uso: python -m benchmarks.verificar_motor_features [--quantidade 5000] [--arquivo textos.txt]
+"""
+import argparse
+import timeit
+
+import numpy as np
+from scipy.sparse import csr_matrix, hstack
+
+from app.ml.model_loader import load_all_models, registro_modelos
+from app.services.classification_service import ORDEM_LEXICOS_SEVERIDADE, _obter_motor_features
+from app.ml.lexicons import LEXICOS_SEVERIDADE
+from app.utils.text_processor import contar_palavras_lexico, preprocessar_texto
+from benchmarks.dados_sinteticos import gerar_textos_alerta
+
+
+def features_caminho_original(textos_processados, ml_models):
+    features_tipo = ml_models['vetorizador_tipo'].transform(textos_processados)
+    features_tfidf_severidade = ml_models['vetorizador_severidade'].transform(textos_processados)
+    features_lexico = np.array([
+        [contar_palavras_lexico(texto, LEXICOS_SEVERIDADE[nome]) for nome in ORDEM_LEXICOS_SEVERIDADE]
+        for texto in textos_processados
+    ]).reshape(len(textos_processados), len(ORDEM_LEXICOS_SEVERIDADE))
+    return features_tipo, hstack([features_tfidf_severidade, csr_matrix(features_lexico)], format='csr')
+
+
+def matrizes_identicas(a: csr_matrix, b: csr_matrix) -> bool:
+    a, b = a.tocsr(), b.tocsr()
+    return (
+        a.shape == b.shape
+        and np.array_equal(a.indptr, b.indptr)
+        and np.array_equal(a.indices, b.indices)
+        and np.array_equal(a.data, b.data)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantidade", type=int, default=5000)
+    parser.add_argument("--arquivo", help="Arquivo com um texto por linha (ex.: corpus de treino) usado no lugar dos textos sintéticos.")
+    args = parser.parse_args()
+
+    ml_models = load_all_models()
+    if args.arquivo:
+        with open(args.arquivo, encoding="utf-8") as arquivo:
+            textos = [linha.rstrip("\n") for linha in arquivo]
+    else:
+        textos = gerar_textos_alerta(args.quantidade)
+    textos += ["", "!!!", "resgate", "deslizamento pequeno sem risco"]
+    textos_processados = [preprocessar_texto(texto) for texto in textos]
+
+    motor = _obter_motor_features(registro_modelos.atual)
+    print(f"Análise compartilhada entre os vetorizadores: {motor.analise_compartilhada}")
+
+    tipo_original, severidade_original = features_caminho_original(textos_processados, ml_models)
+    tipo_motor, severidade_motor = motor.transformar(textos_processados)
+
+    if not matrizes_identicas(tipo_original, tipo_motor):
+        raise SystemExit("ERRO: features de tipo divergem do caminho original.")
+    if not matrizes_identicas(severidade_original, severidade_motor):
+        raise SystemExit("ERRO: features de severidade divergem do caminho original.")
+    for chave_modelo, original, motor_features in (
+        ('modelo_tipo', tipo_original, tipo_motor),
+        ('modelo_severidade', severidade_original, severidade_motor),
+    ):
+        if not np.array_equal(ml_models[chave_modelo].predict(original), ml_models[chave_modelo].predict(motor_features)):
+            raise SystemExit(f"ERRO: predições de '{chave_modelo}' divergem do caminho original.")
+    print(f"Matrizes e predições idênticas para {len(textos)} textos.")
+
+    for tamanho_lote in (1, 64, len(textos_processados)):
+        lotes = [textos_processados[i:i + tamanho_lote] for i in range(0, len(textos_processados), tamanho_lote)]
+        tempo_original = min(timeit.repeat(lambda: [features_caminho_original(lote, ml_models) for lote in lotes], number=1, repeat=3))
+        tempo_motor = min(timeit.repeat(lambda: [motor.transformar(lote) for lote in lotes], number=1, repeat=3))
+        print(
+            f"Lote {tamanho_lote:>6}: original {tempo_original / len(textos) * 1e6:8.2f} us/texto, "
+            f"motor {tempo_motor / len(textos) * 1e6:8.2f} us/texto ({tempo_original / tempo_motor:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
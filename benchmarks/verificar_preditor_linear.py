@@ -0,0 +1,81 @@
+"""
+Verifica e mede o caminho linear da classificação (`app/ml/preditor_linear.py`).
+
+Compara, para os mesmos textos pré-processados:
+* atual: CSR de severidade combinada (TF-IDF + léxicos) + `model.predict` do scikit-learn;
+* linear: `X @ coef_.T + intercept_` direto, com os léxicos somados sem montar a CSR combinada.
+
+Antes de medir, confere que as funções de decisão são idênticas bit a bit às de
+`model.decision_function` e que as predições são as mesmas.
+
+Uso: python -m benchmarks.verificar_preditor_linear [--quantidade 20000] [--repeticoes 5]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from app.ml.model_loader import load_all_models, registro_modelos
+from app.ml.preditor_linear import PreditorLinear
+from app.services.classification_service import _obter_motor_features
+from app.utils.text_processor import inicializar_recursos_texto, preprocessar_texto
+from benchmarks.dados_sinteticos import gerar_textos_alerta
+
+
+def predicoes_atuais(versao_modelos, motor, textos_processados):
+    features_tipo, features_severidade = motor.transformar(textos_processados)
+    return versao_modelos.modelos['modelo_tipo'].predict(features_tipo), versao_modelos.modelos['modelo_severidade'].predict(features_severidade)
+
+
+def predicoes_lineares(motor, preditor_tipo, preditor_severidade, textos_processados):
+    features_tipo, features_tfidf_severidade, features_lexico = motor.transformar_partes(textos_processados)
+    return preditor_tipo.prever(features_tipo), preditor_severidade.prever(features_tfidf_severidade, features_lexico)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantidade", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    inicializar_recursos_texto()
+    load_all_models()
+    versao_modelos = registro_modelos.atual
+    motor = _obter_motor_features(versao_modelos)
+    modelo_tipo, modelo_severidade = versao_modelos.modelos['modelo_tipo'], versao_modelos.modelos['modelo_severidade']
+    preditor_tipo = PreditorLinear.para_modelo(modelo_tipo, motor.n_features_tipo)
+    preditor_severidade = PreditorLinear.para_modelo(modelo_severidade, motor.n_features_severidade, motor.quantidade_lexicos)
+    if preditor_tipo is None or preditor_severidade is None:
+        raise SystemExit("Os modelos salvos não são lineares; o caminho rápido não se aplica.")
+
+    # Textos sintéticos com palavras embaralhadas, para cobrir mais combinações de termos e léxicos.
+    gerador = np.random.default_rng(0)
+    textos = gerar_textos_alerta(args.quantidade)
+    textos = [" ".join(gerador.permutation(texto.split()).tolist()) if indice % 2 else texto for indice, texto in enumerate(textos)]
+    textos += ["", "resgate urgente vítimas soterradas", "sem risco nada sério"]
+    textos_processados = [preprocessar_texto(texto) for texto in textos]
+
+    features_tipo, features_tfidf_severidade, features_lexico = motor.transformar_partes(textos_processados)
+    features_severidade = motor.anexar_colunas_lexico(features_tfidf_severidade, features_lexico)
+    if not np.array_equal(preditor_tipo.decisao(features_tipo), modelo_tipo.decision_function(features_tipo)):
+        raise SystemExit("ERRO: função de decisão do tipo diverge.")
+    if not np.array_equal(preditor_severidade.decisao(features_tfidf_severidade, features_lexico), modelo_severidade.decision_function(features_severidade)):
+        raise SystemExit("ERRO: função de decisão da severidade diverge.")
+    for atual, linear in zip(predicoes_atuais(versao_modelos, motor, textos_processados), predicoes_lineares(motor, preditor_tipo, preditor_severidade, textos_processados)):
+        if not np.array_equal(atual, linear):
+            raise SystemExit("ERRO: predições divergem.")
+    print(f"Funções de decisão idênticas e predições iguais para {len(textos)} textos.")
+
+    for tamanho_lote in (1, 10, 50, 100, 250, 500, 1000):
+        lote = textos_processados[:tamanho_lote]
+        medir = lambda funcao: min(timeit.repeat(funcao, number=max(1, 2000 // tamanho_lote), repeat=args.repeticoes)) / max(1, 2000 // tamanho_lote)
+        tempo_atual = medir(lambda: predicoes_atuais(versao_modelos, motor, lote))
+        tempo_linear = medir(lambda: predicoes_lineares(motor, preditor_tipo, preditor_severidade, lote))
+        print(
+            f"lote {tamanho_lote:>5}: atual {tempo_atual * 1e6:9.1f} us, linear {tempo_linear * 1e6:9.1f} us "
+            f"({tempo_atual / tempo_linear:.1f}x)  [features + predição, sem pré-processamento]"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Verifica que o refinamento vetorizado de hotspots produz exatamente a mesma saída que a
+implementação original (um filtro do DataFrame por cluster e por tipo) e compara os tempos.
+
+Uso: python -m benchmarks.verificar_refinamento_hotspots [--hotspots 50 200 1000] [--isolados-por-hotspot 2]
+"""
+import argparse
+import timeit
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN
+from sklearn.metrics.pairwise import haversine_distances
+
+from app.services.clustering_service import (
+    DBSCAN_EPS_KM, DBSCAN_MIN_SAMPLES, DEFAULT_HOTSPOT_RADIUS_KM_SINGLE_POINT, R_TERRA_KM,
+    REFINEMENT_MIN_ALERTS_FOR_HOTSPOT, REFINEMENT_PORC_ALTA_EM_MEDIA, REFINEMENT_PORC_SEVERIDADE_PREDOMINANTE,
+    refinar_e_caracterizar_hotspots_para_api,
+)
+from app.utils.cluster_utils import calcular_distribuicao_percentual, obter_item_predominante
+from benchmarks.dados_sinteticos import gerar_alertas_clustering
+
+CONFIG_REFINAMENTO = {
+    "MIN_ALERTAS_PARA_HOTSPOT_REFINADO": REFINEMENT_MIN_ALERTS_FOR_HOTSPOT,
+    "PORCENTAGEM_PARA_SEVERIDADE_PREDOMINANTE": REFINEMENT_PORC_SEVERIDADE_PREDOMINANTE,
+    "PORCENTAGEM_ALTA_EM_MEDIA_PARA_HOTSPOT": REFINEMENT_PORC_ALTA_EM_MEDIA,
+}
+
+
+# Implementação original, mantida aqui como referência.
+def refinar_hotspots_legado(
+    df_alertas_com_cluster_ids: pd.DataFrame,
+    config_refinamento: dict
+) -> List[Dict]:
+    
+    hotspots_formatados = []
+    ids_clusters_unicos = df_alertas_com_cluster_ids['cluster_id_dbscan'].unique()
+    hotspot_output_id_counter = 0
+
+    min_alertas_para_hotspot_refinado = config_refinamento.get("MIN_ALERTAS_PARA_HOTSPOT_REFINADO", 3)
+    porc_severidade_predominante = config_refinamento.get("PORCENTAGEM_PARA_SEVERIDADE_PREDOMINANTE", 0.50)
+    porc_alta_em_media = config_refinamento.get("PORCENTAGEM_ALTA_EM_MEDIA_PARA_HOTSPOT", 0.25)
+
+    for id_cluster_dbscan_bruto in ids_clusters_unicos:
+        if id_cluster_dbscan_bruto == -1: continue
+
+        alertas_do_geocluster_bruto = df_alertas_com_cluster_ids[df_alertas_com_cluster_ids['cluster_id_dbscan'] == id_cluster_dbscan_bruto]
+        
+        if len(alertas_do_geocluster_bruto) < min_alertas_para_hotspot_refinado: continue
+
+        tipos_presentes_no_geocluster = alertas_do_geocluster_bruto['typeIA'].unique()
+
+        for tipo_candidato_hotspot in tipos_presentes_no_geocluster:
+            alertas_deste_tipo_especifico = alertas_do_geocluster_bruto[alertas_do_geocluster_bruto['typeIA'] == tipo_candidato_hotspot]
+
+            if len(alertas_deste_tipo_especifico) < min_alertas_para_hotspot_refinado: continue
+            
+            dist_sev_tipo = calcular_distribuicao_percentual(alertas_deste_tipo_especifico['severityIA'])
+            sev_pred_tipo_tupla = obter_item_predominante(alertas_deste_tipo_especifico['severityIA'], porc_severidade_predominante)
+            sev_pred_tipo = sev_pred_tipo_tupla[0] if sev_pred_tipo_tupla else "N/A"
+
+            forma_hotspot = False
+            dominant_severity_final = sev_pred_tipo
+
+            if tipo_candidato_hotspot == 'OUTRO_PERIGO':
+                if sev_pred_tipo == 'CRITICA': forma_hotspot = True
+            elif tipo_candidato_hotspot in ['ALAGAMENTO', 'RISCO_DESLIZAMENTO', 'DESLIZAMENTO_OCORRIDO']:
+                if sev_pred_tipo in ['CRITICA', 'ALTA']: forma_hotspot = True
+                elif sev_pred_tipo == 'MEDIA' and dist_sev_tipo.get('ALTA', 0.0) >= porc_alta_em_media:
+                    forma_hotspot = True
+                    dominant_severity_final = 'MEDIA'
+
+            if not forma_hotspot: continue
+
+            hotspot_output_id_counter += 1
+            centroid_lat = alertas_deste_tipo_especifico['latitude'].mean()
+            centroid_lon = alertas_deste_tipo_especifico['longitude'].mean()
+            
+            radius_km = DEFAULT_HOTSPOT_RADIUS_KM_SINGLE_POINT
+            if len(alertas_deste_tipo_especifico) > 1:
+                points_rad = np.radians(alertas_deste_tipo_especifico[['latitude', 'longitude']].values)
+                centroid_rad = np.radians([[centroid_lat, centroid_lon]])
+                distances_km = haversine_distances(points_rad, centroid_rad) * R_TERRA_KM
+                if distances_km.size > 0: radius_km = np.max(distances_km)
+            
+            summary = f"Hotspot de {tipo_candidato_hotspot.replace('_', ' ').title()} com severidade {dominant_severity_final}. {len(alertas_deste_tipo_especifico)} alertas."
+            
+            last_ts = None
+            if 'timestampReporte' in alertas_deste_tipo_especifico.columns and not alertas_deste_tipo_especifico['timestampReporte'].dropna().empty:
+                try:
+                    last_ts = alertas_deste_tipo_especifico['timestampReporte'].dropna().max()
+                except Exception:
+                    try:
+                        timestamps_dt = pd.to_datetime(alertas_deste_tipo_especifico['timestampReporte'].dropna(), errors='coerce')
+                        if not timestamps_dt.empty:
+                             last_ts = timestamps_dt.max().isoformat() + "Z"
+                    except Exception:
+                        last_ts = datetime.now(timezone.utc).isoformat()
+            else:
+                 last_ts = datetime.now(timezone.utc).isoformat()
+
+
+            hotspots_formatados.append({
+                "clusterLabel": hotspot_output_id_counter,
+                "centroidLat": float(centroid_lat),
+                "centroidLon": float(centroid_lon),
+                "pointCount": len(alertas_deste_tipo_especifico),
+                "dominantType": str(tipo_candidato_hotspot),
+                "dominantSeverity": str(dominant_severity_final),
+                "alertIdsInCluster": sorted(alertas_deste_tipo_especifico['alertId'].tolist()),
+                "estimatedRadiusKm": float(radius_km) if radius_km is not None else None,
+                "publicSummary": summary,
+                "lastActivityTimestamp": str(last_ts) if last_ts is not None else None,
+                "distribuicaoTipos": dict(Counter(alertas_deste_tipo_especifico['typeIA'])),
+                "distribuicaoSeveridades": dict(Counter(alertas_deste_tipo_especifico['severityIA']))
+            })
+            
+    return hotspots_formatados
+
+
+
+def preparar_dataframe(alertas: List[dict]) -> pd.DataFrame:
+    df_alertas = pd.DataFrame(alertas)
+    coordenadas_rad = np.radians(df_alertas[['latitude', 'longitude']].values)
+    df_alertas['cluster_id_dbscan'] = DBSCAN(
+        eps=DBSCAN_EPS_KM / R_TERRA_KM, min_samples=DBSCAN_MIN_SAMPLES, metric='haversine', algorithm='ball_tree'
+    ).fit(coordenadas_rad).labels_
+    return df_alertas
+
+
+def comparar_hotspots(legado: List[Dict], vetorizado: List[Dict]) -> List[str]:
+    """Lista as divergências; `lastActivityTimestamp` gerado com now() só é comparado quanto à presença."""
+    divergencias = []
+    if len(legado) != len(vetorizado):
+        return [f"quantidade de hotspots: {len(legado)} != {len(vetorizado)}"]
+    for posicao, (esperado, obtido) in enumerate(zip(legado, vetorizado)):
+        for campo in esperado:
+            valor_esperado, valor_obtido = esperado[campo], obtido.get(campo)
+            if campo == "estimatedRadiusKm":
+                iguais = np.isclose(valor_esperado, valor_obtido, rtol=1e-12, atol=1e-12)
+            elif campo == "distribuicaoSeveridades":
+                iguais = list(valor_esperado.items()) == list(valor_obtido.items())
+            else:
+                iguais = valor_esperado == valor_obtido
+            if not iguais:
+                divergencias.append(f"hotspot {posicao} campo {campo}: {valor_esperado!r} != {valor_obtido!r}")
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotspots", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--isolados-por-hotspot", type=int, default=2)
+    args = parser.parse_args()
+
+    for quantidade_hotspots in args.hotspots:
+        df_alertas = preparar_dataframe(gerar_alertas_clustering(quantidade_hotspots, quantidade_hotspots * args.isolados_por_hotspot))
+        legado = refinar_hotspots_legado(df_alertas, CONFIG_REFINAMENTO)
+        vetorizado = refinar_e_caracterizar_hotspots_para_api(df_alertas, CONFIG_REFINAMENTO)
+        divergencias = comparar_hotspots(legado, vetorizado)
+        if divergencias:
+            raise SystemExit("ERRO: saídas divergentes:\n  " + "\n  ".join(divergencias[:20]))
+
+        repeticoes = 3
+        tempo_legado = min(timeit.repeat(lambda: refinar_hotspots_legado(df_alertas, CONFIG_REFINAMENTO), number=1, repeat=repeticoes))
+        tempo_vetorizado = min(timeit.repeat(lambda: refinar_e_caracterizar_hotspots_para_api(df_alertas, CONFIG_REFINAMENTO), number=1, repeat=repeticoes))
+        n_clusters = len(set(df_alertas['cluster_id_dbscan'].tolist()) - {-1})
+        print(
+            f"{len(df_alertas):>7} alertas, {n_clusters:>5} clusters, {len(vetorizado):>5} hotspots idênticos: "
+            f"original {tempo_legado * 1000:9.1f} ms, vetorizado {tempo_vetorizado * 1000:7.1f} ms ({tempo_legado / tempo_vetorizado:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()